@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
     # tg для связи и сотрудничества https://t.me/leavemea1oneee @leavemea1oneee
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -7,4 +8,6 @@ import ttkbootstrap as ttk
 from src.ui.ui import UI
 
 if __name__ == "__main__":
+    # Процессы пакетной печати в собранном exe запускают этот же файл
+    multiprocessing.freeze_support()
     app = UI()
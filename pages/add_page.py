@@ -4,43 +4,41 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from datetime import datetime
 from tkinter import messagebox
-import os
 from src.db.database import (
-    add_print_history, get_works, get_materials,
-    get_materials_and_works, get_vehicle_by_id, save_vehicle
+    get_catalog_field_values, load_order, save_vehicle, save_vehicle_changes, transaction
+)
+from src.models.order import (
+    OrderModel, WORKS, MATERIALS, COLUMNS, DEFAULT_COEFFICIENT
 )
 from src.ui.suggestion_mixin import SuggestionMixin
-from src.pdf.report_generator import generate_pdf
+from src.ui.row_table import RowTable
 from src.utils.utils import (
     validate_date, validate_phone, bind_hotkeys, create_context_menu
 )
 import src.utils.table_settings as tbl
 
 def extract_unique_field_from_work(field):
-    items = get_works()
-    return sorted(set(str(item.get(field, '')).strip() for item in items if item.get(field, '')).union({''}))
+    return get_catalog_field_values("works", field)
 
 def extract_unique_field_from_material(field):
-    items = get_materials()
-    return sorted(set(str(item.get(field, '')).strip() for item in items if item.get(field, '')).union({''}))
-
-def get_suggestions_for_field(field_type, text):
-    text = text.lower()
-    if field_type == "work_name":
-        return [w["name"] for w in get_works() if not text or text in w["name"].lower()]
-    elif field_type == "material_name":
-        return [m["name"] for m in get_materials() if not text or text in m["name"].lower()]
-    elif field_type in ("unit", "quantity", "price"):
-        extractor = {
-            "unit": "unit",
-            "quantity": "quantity",
-            "price": "price",
-        }[field_type]
-        works = extract_unique_field_from_work(extractor)
-        materials = extract_unique_field_from_material(extractor)
-        values = set(works + materials)
-        return [v for v in values if not text or text in str(v).lower()]
-    return []
+    return get_catalog_field_values("materials", field)
+
+def save_order(vehicle_data, changed_fields, lines, deleted_ids):
+    """
+    Сохранение заказа в одной транзакции (выполняется в потоке БД).
+    Новое ТС (без id) сначала создаётся; возвращает (id ТС, id строк в порядке lines).
+    """
+    with transaction():
+        if not vehicle_data.get("id"):
+            save_vehicle(vehicle_data, [], [])
+            changed_fields = ()
+        line_ids = save_vehicle_changes(vehicle_data, changed_fields, lines, deleted_ids)
+    return vehicle_data["id"], line_ids
+
+# Поля строк таблиц с подсказками: номер колонки -> тип подсказки
+WORK_SUGGESTION_FIELDS = {1: "work_name", 2: "unit", 3: "quantity", 4: "price", 5: "amount"}
+PARTS_SUGGESTION_FIELDS = {1: "material_name", 2: "unit", 3: "quantity", 4: "price", 5: "amount"}
+NUMBER_COLUMNS = (3, 4)  # Кол-во и Цена за ед. — с проверкой ввода и пересчётом суммы
 
 class AddPage(SuggestionMixin):
     def __init__(self, main_window):
@@ -49,10 +47,15 @@ class AddPage(SuggestionMixin):
         self.add_frame = main_window.add_frame
         self.vehicle_images = main_window.vehicle_images
         self.vehicle_id = None
+        self._saved_vehicle_data = {}   # поля ТС на момент загрузки/сохранения (для поиска изменений)
+        self._form_version = 0   # меняется при очистке формы: результаты старых загрузок и сохранений не применяются к новой
+        self._saving = False
+        self.db = main_window.db
         self.suggestion_toplevel = None
         self.suggestion_listbox = None
         self._suppress_suggestions = False
         self.init_add_page()
+        self.refresh_suggestion_indexes()   # индексы подсказок строятся в потоке БД заранее
 
     def bind_suggestion_events(self, entry, field_type, row, table_type):
         super().bind_suggestion_events(entry, field_type, row, table_type)
@@ -79,10 +82,12 @@ class AddPage(SuggestionMixin):
     # ----------- Инициализация формы -----------
     def init_add_page(self):
         self.add_entries = {}
-        self.work_entries = []
-        self.parts_entries = []
-        self.work_delete_buttons = []
-        self.parts_delete_buttons = []
+        # Проверка числовых полей регистрируется один раз и общая для всех строк таблиц
+        self.vcmd_number = (self.root.register(self.validate_number), "%P")
+        # Данные строк и итоги хранит модель заказа; поля формы связаны с ней через StringVar
+        self.order = OrderModel()
+        self._entry_vars = []
+        self._syncing_order = False
 
         # Frame для характеристик ТС
         characteristics_frame = ttk.Frame(self.add_frame, style="Custom.TFrame")
@@ -180,6 +185,11 @@ class AddPage(SuggestionMixin):
                 relief="solid",
                 padding=5,
             ).grid(row=0, column=col, sticky="nsew")
+        self.work_table = RowTable(
+            self.work_frame, [15, 10, 10, 10, 10, 10, 10], self._setup_work_entry,
+            lambda row: self.delete_work_row(row.index),
+        )
+        self.work_entries = self.work_table.entries
         self.create_work_rows()
 
         # --- Суммы по работам ---
@@ -198,12 +208,14 @@ class AddPage(SuggestionMixin):
         ttk.Label(total_frame, text="Коэффициент", font=("Arial", 10, "bold"), borderwidth=1, relief="solid", padding=5).grid(row=2, column=1, sticky="nsew")
         self.coefficient_entry = ttk.Entry(total_frame, width=10)
         self.coefficient_entry.grid(row=2, column=5, sticky="nsew", padx=1, pady=1)
-        self.coefficient_entry.insert(0, "1.2")
+        coefficient_var = tk.StringVar(self.coefficient_entry, value=DEFAULT_COEFFICIENT)
+        self.coefficient_entry.configure(textvariable=coefficient_var)
+        coefficient_var.trace_add("write", lambda *args: self.order.set_coefficient(coefficient_var.get()))
+        self._entry_vars.append(coefficient_var)
         bind_hotkeys(self.coefficient_entry)
         create_context_menu(self.coefficient_entry)
         vcmd_coeff = (self.root.register(self.validate_coefficient), "%P")
         self.coefficient_entry.configure(validate="key", validatecommand=vcmd_coeff)
-        self.coefficient_entry.bind("<KeyRelease>", self.calculate_work_total)
 
         # --- Таблица материалов ---
         ttk.Label(act_scrollable_frame, text="Накладная на запасные части и расходные материалы", font=("Arial", 14, "bold")).pack(anchor="w", padx=20, pady=10)
@@ -222,6 +234,11 @@ class AddPage(SuggestionMixin):
                 relief="solid",
                 padding=5,
             ).grid(row=0, column=col, sticky="nsew")
+        self.parts_table = RowTable(
+            self.parts_frame, [40, 10, 10, 10, 10], self._setup_parts_entry,
+            lambda row: self.delete_parts_row(row.index),
+        )
+        self.parts_entries = self.parts_table.entries
         self.create_parts_rows()
 
         # --- Суммы по материалам ---
@@ -244,231 +261,111 @@ class AddPage(SuggestionMixin):
         ttk.Button(button_frame, text="Очистить", style="Print.TButton", command=self.clear_form).pack(side=LEFT, padx=5)
         ttk.Button(button_frame, text="Сохранить", style="Print.TButton", command=self.save_vehicle).pack(side=LEFT, padx=5)
         ttk.Button(button_frame, text="Печать", style="Print.TButton", command=self.save_and_print_vehicle).pack(side=LEFT, padx=5)
+        self.order.subscribe(on_line=self._on_order_line, on_totals=self._on_order_totals)
         self.clear_form()
 
-    # === Динамическое создание строк ===
+    # === Строки таблиц (виджеты переиспользуются через RowTable) ===
     def create_work_rows(self):
-        self.work_entries = []
-        self.work_delete_buttons = []
-        for _ in range(tbl.WORK_ROWS):
+        for _ in range(tbl.WORK_ROWS - len(self.work_entries)):
             self.add_work_row(add_to_global=False)
 
     def create_parts_rows(self):
-        self.parts_entries = []
-        self.parts_delete_buttons = []
-        for _ in range(tbl.MATERIAL_ROWS):
+        for _ in range(tbl.MATERIAL_ROWS - len(self.parts_entries)):
             self.add_parts_row(add_to_global=False)
 
+    def _setup_work_entry(self, row, col, entry):
+        bind_hotkeys(entry)
+        create_context_menu(entry)
+        # Обработчики получают объект строки: её индекс меняется при удалении строк выше
+        if col in WORK_SUGGESTION_FIELDS:
+            self.bind_suggestion_events(entry, WORK_SUGGESTION_FIELDS[col], row=row, table_type="vehicle_works")
+        if col in NUMBER_COLUMNS:
+            entry.configure(validate="key", validatecommand=self.vcmd_number)
+        self._link_entry(WORKS, row, col, entry)
+
+    def _setup_parts_entry(self, row, col, entry):
+        bind_hotkeys(entry)
+        create_context_menu(entry)
+        if col in PARTS_SUGGESTION_FIELDS:
+            self.bind_suggestion_events(entry, PARTS_SUGGESTION_FIELDS[col], row=row, table_type="vehicle_materials")
+        if col in NUMBER_COLUMNS:
+            entry.configure(validate="key", validatecommand=self.vcmd_number)
+        self._link_entry(MATERIALS, row, col, entry)
+
+    def _link_entry(self, kind, row, col, entry):
+        """
+        Любое изменение текста поля (ввод, вставка подсказки, очистка) передаётся в модель.
+        Скрытые строки пула (index -1) и заполнение формы из модели игнорируются.
+        """
+        var = tk.StringVar(entry)
+        entry.configure(textvariable=var)
+        field = COLUMNS[kind][col - 1]
+
+        def on_write(*args):
+            if not self._syncing_order and row.index >= 0:
+                self.order.set_field(kind, row.index, field, var.get())
+
+        var.trace_add("write", on_write)
+        self._entry_vars.append(var)
+
     def add_work_row(self, add_to_global=True):
         if add_to_global:
             tbl.WORK_ROWS += 1
-        row = len(self.work_entries)
-        vcmd_number = (self.root.register(self.validate_number), "%P")
-        row_entries = []
-        ttk.Label(self.work_frame, text=str(row + 1), borderwidth=1, relief="solid", padding=5).grid(row=row + 1, column=0, sticky="nsew")
-        for col in range(1, 8):
-            entry = ttk.Entry(self.work_frame, width=15 if col == 1 else 10)
-            entry.grid(row=row + 1, column=col, sticky="nsew", padx=1, pady=1)
-            entry.insert(0, "")
-            row_entries.append(entry)
-            bind_hotkeys(entry)
-            create_context_menu(entry)
-            # ВАЖНО: всегда захватываем row по умолчанию!
-            if col == 1:
-                self.bind_suggestion_events(entry, "work_name", row=row, table_type="vehicle_works")
-            elif col == 2:
-                self.bind_suggestion_events(entry, "unit", row=row, table_type="vehicle_works")
-            elif col == 3:
-                self.bind_suggestion_events(entry, "quantity", row=row, table_type="vehicle_works")
-                entry.configure(validate="key", validatecommand=vcmd_number)
-                entry.bind("<KeyRelease>", lambda e, ent=entry: self._calculate_work_row_by_entry(ent))
-            elif col == 4:
-                self.bind_suggestion_events(entry, "price", row=row, table_type="vehicle_works")
-                entry.configure(validate="key", validatecommand=vcmd_number)
-                entry.bind("<KeyRelease>", lambda e, ent=entry: self._calculate_work_row_by_entry(ent))
-            elif col == 5:
-                self.bind_suggestion_events(entry, "amount", row=row, table_type="vehicle_works")
-        self.work_entries.append(row_entries)
-        delete_button = ttk.Button(
-            self.work_frame,
-            text="X",
-            style="Delete.TButton",
-            width=2,
-            command=lambda row_entries=row_entries: self._delete_work_row_by_button(row_entries),
-        )
-        delete_button.grid(row=row + 1, column=8, sticky="nsew", padx=1, pady=1)
-        self.work_delete_buttons.append(delete_button)
-        self.act_canvas.configure(scrollregion=self.act_canvas.bbox("all"))
+        self.work_table.add()
+        self.order.add_line(WORKS)
+        self._update_act_scrollregion()
 
     def add_parts_row(self, add_to_global=True):
         if add_to_global:
             tbl.MATERIAL_ROWS += 1
-        row = len(self.parts_entries)
-        vcmd_number = (self.root.register(self.validate_number), "%P")
-        row_entries = []
-        ttk.Label(self.parts_frame, text=str(row + 1), borderwidth=1, relief="solid", padding=5).grid(row=row + 1, column=0, sticky="nsew")
-        for col in range(1, 6):
-            entry = ttk.Entry(self.parts_frame, width=40 if col == 1 else 10)
-            entry.grid(row=row + 1, column=col, sticky="nsew", padx=1, pady=1)
-            entry.insert(0, "")
-            row_entries.append(entry)
-            bind_hotkeys(entry)
-            create_context_menu(entry)
-            # ВАЖНО: всегда захватываем row по умолчанию!
-            if col == 1:
-                self.bind_suggestion_events(entry, "material_name", row=row, table_type="vehicle_materials")
-            elif col == 2:
-                self.bind_suggestion_events(entry, "unit", row=row, table_type="vehicle_materials")
-            elif col == 3:
-                self.bind_suggestion_events(entry, "quantity", row=row, table_type="vehicle_materials")
-                entry.configure(validate="key", validatecommand=vcmd_number)
-                entry.bind("<KeyRelease>", lambda e, ent=entry: self._calculate_parts_row_by_entry(ent))
-            elif col == 4:
-                self.bind_suggestion_events(entry, "price", row=row, table_type="vehicle_materials")
-                entry.configure(validate="key", validatecommand=vcmd_number)
-                entry.bind("<KeyRelease>", lambda e, ent=entry: self._calculate_parts_row_by_entry(ent))
-            elif col == 5:
-                self.bind_suggestion_events(entry, "amount", row=row, table_type="vehicle_materials")
-        self.parts_entries.append(row_entries)
-        delete_button = ttk.Button(
-            self.parts_frame,
-            text="X",
-            style="Delete.TButton",
-            width=2,
-            command=lambda row_entries=row_entries: self._delete_parts_row_by_button(row_entries),
-        )
-        delete_button.grid(row=row + 1, column=6, sticky="nsew", padx=1, pady=1)
-        self.parts_delete_buttons.append(delete_button)
+        self.parts_table.add()
+        self.order.add_line(MATERIALS)
+        self._update_act_scrollregion()
+
+    def _update_act_scrollregion(self):
         self.act_canvas.configure(scrollregion=self.act_canvas.bbox("all"))
 
-    # ----------- Расчёты -----------
-    def calculate_work_row(self, row):
-        quantity = self.work_entries[row][2].get().replace(",", ".")
-        price = self.work_entries[row][3].get().replace(",", ".")
-        try:
-            quantity = float(quantity) if quantity else 0
-            price = float(price) if price else 0
-            total = quantity * price
-            self.work_entries[row][4].delete(0, tk.END)
-            self.work_entries[row][4].insert(0, f"{total:.2f}")
-        except ValueError:
-            self.work_entries[row][4].delete(0, tk.END)
-            self.work_entries[row][4].insert(0, "0.00")
-        self.calculate_work_total()
-
-    def _calculate_work_row_by_entry(self, entry):
-        for i, row in enumerate(self.work_entries):
-            if entry in row:
-                self.calculate_work_row(i)
-                break
-
-    def calculate_work_total(self, event=None):
-        total = 0
-        for row in self.work_entries:
-            try:
-                total += float(row[4].get().replace(",", "."))
-            except Exception:
-                continue
-        self.work_total_sum.delete(0, tk.END)
-        self.work_total_sum.insert(0, f"{total:.2f}")
-        try:
-            coeff = float(self.coefficient_entry.get().replace(",", "."))
-        except Exception:
-            coeff = 1
-        total_with_coeff = total * coeff
-        self.work_total_with_coeff.delete(0, tk.END)
-        self.work_total_with_coeff.insert(0, f"{total_with_coeff:.2f}")
-        self.calculate_order_total()
-
-    def calculate_parts_row(self, row):
-        quantity = self.parts_entries[row][2].get().replace(",", ".")
-        price = self.parts_entries[row][3].get().replace(",", ".")
-        try:
-            quantity = float(quantity) if quantity else 0
-            price = float(price) if price else 0
-            total = quantity * price
-            self.parts_entries[row][4].delete(0, tk.END)
-            self.parts_entries[row][4].insert(0, f"{total:.2f}")
-        except ValueError:
-            self.parts_entries[row][4].delete(0, tk.END)
-            self.parts_entries[row][4].insert(0, "0.00")
-        self.calculate_parts_total()
-
-    def _calculate_parts_row_by_entry(self, entry):
-        for i, row in enumerate(self.parts_entries):
-            if entry in row:
-                self.calculate_parts_row(i)
-                break
-
-    def calculate_parts_total(self):
-        total = 0
-        for row in self.parts_entries:
-            try:
-                total += float(row[4].get().replace(",", "."))
-            except Exception:
-                continue
-        self.parts_total_sum.delete(0, tk.END)
-        self.parts_total_sum.insert(0, f"{total:.2f}")
-        self.calculate_order_total()
-
-    def calculate_order_total(self):
-        try:
-            work_total = float(self.work_total_with_coeff.get().replace(",", "."))
-        except Exception:
-            work_total = 0
+    # ----------- Отображение модели заказа -----------
+    def _order_table(self, kind):
+        return self.work_table if kind == WORKS else self.parts_table
+
+    def _on_order_line(self, kind, index, field):
+        """Строка модели изменилась: обновляется только её сумма; index None — вся таблица"""
+        if field == "amount":
+            return  # сумму ввели вручную — поле уже содержит этот текст
+        table = self._order_table(kind)
+        self._syncing_order = True
         try:
-            parts_total = float(self.parts_total_sum.get().replace(",", "."))
-        except Exception:
-            parts_total = 0
-        order_total = work_total + parts_total
-        self.order_total_sum.delete(0, tk.END)
-        self.order_total_sum.insert(0, f"{order_total:.2f}")
+            if index is None:
+                lines = self.order.lines[kind]
+                table.load([[line.text(field) for field in COLUMNS[kind]] for line in lines])
+                self._update_act_scrollregion()
+            else:
+                line = self.order.lines[kind][index]
+                RowTable.set_entry(table.entries[index][4], line.text("amount"))
+        finally:
+            self._syncing_order = False
+
+    def _on_order_totals(self, order):
+        totals = order.totals()
+        for entry, key in (
+            (self.work_total_sum, "work_total"),
+            (self.work_total_with_coeff, "work_total_with_coeff"),
+            (self.parts_total_sum, "parts_total"),
+            (self.order_total_sum, "order_total"),
+        ):
+            RowTable.set_entry(entry, totals[key])
 
     # --- удаление строк ---
-    def _delete_work_row_by_button(self, row_entries):
-        for i, row in enumerate(self.work_entries):
-            if row is row_entries:
-                self.delete_work_row(i)
-                break
-
     def delete_work_row(self, row):
         if len(self.work_entries) <= 1:
             return
         tbl.WORK_ROWS -= 1
         if not (0 <= row < len(self.work_entries)):
             return
-        
-        for widget in self.work_frame.grid_slaves(row=row + 1):
-            widget.grid_forget()
-            widget.destroy()
-        
-        self.work_delete_buttons[row].destroy()
-        
-        del self.work_entries[row]
-        del self.work_delete_buttons[row]
-        
-        for widget in self.work_frame.grid_slaves(column=0):
-            if int(widget.grid_info()["row"]) == 0: continue
-            widget.grid_forget()
-            widget.destroy()
-            
-        for i, (entries, btn) in enumerate(zip(self.work_entries, self.work_delete_buttons)):
-            for col, entry in enumerate(entries):
-                entry.grid(row=i + 1, column=col + 1, sticky="nsew", padx=1, pady=1)
-            btn.grid(row=i + 1, column=8, sticky="nsew", padx=1, pady=1)
-            ttk.Label(
-                self.work_frame, text=str(i + 1), borderwidth=1, relief="solid", padding=5
-            ).grid(row=i + 1, column=0, sticky="nsew")
-            
-        self.calculate_work_total()
-        self.calculate_order_total()
-        self.act_canvas.configure(scrollregion=self.act_canvas.bbox("all"))
-
-    def _delete_parts_row_by_button(self, row_entries):
-        for i, row in enumerate(self.parts_entries):
-            if row is row_entries:
-                self.delete_parts_row(i)
-                break
+        self.work_table.delete(row)
+        self.order.remove_line(WORKS, row)
+        self._update_act_scrollregion()
 
     def delete_parts_row(self, row):
         if len(self.parts_entries) <= 1:
@@ -476,62 +373,22 @@ class AddPage(SuggestionMixin):
         tbl.MATERIAL_ROWS -= 1
         if not (0 <= row < len(self.parts_entries)):
             return
-        
-        # Удаляем строку
-        for widget in self.parts_frame.grid_slaves(row=row + 1):
-            widget.grid_forget()
-            widget.destroy()
-            
-        self.parts_delete_buttons[row].destroy()
-        
-        del self.parts_entries[row]
-        del self.parts_delete_buttons[row]
-
-        # Очищаем всю колонку нумерации (чтобы не было дублей)
-        for widget in self.parts_frame.grid_slaves(column=0):
-            if int(widget.grid_info()["row"]) == 0: continue
-            widget.grid_forget()
-            widget.destroy()
-        
-        # Перерисовываем все строки
-        for i, (entries, btn) in enumerate(zip(self.parts_entries, self.parts_delete_buttons)):
-            for col, entry in enumerate(entries):
-                entry.grid(row=i + 1, column=col + 1, sticky="nsew", padx=1, pady=1)
-            btn.grid(row=i + 1, column=6, sticky="nsew", padx=1, pady=1)
-            # Создаём новый номер строки
-            ttk.Label(
-                self.parts_frame, text=str(i + 1), borderwidth=1, relief="solid", padding=5
-            ).grid(row=i + 1, column=0, sticky="nsew")
-        
-        self.calculate_parts_total()
-        self.calculate_order_total()
-        self.act_canvas.configure(scrollregion=self.act_canvas.bbox("all"))
+        self.parts_table.delete(row)
+        self.order.remove_line(MATERIALS, row)
+        self._update_act_scrollregion()
 
     # --- очистка и заполнение ---
     def clear_form(self):
         for entry in self.add_entries.values():
             entry.delete(0, tk.END)
-        while len(self.work_entries) > 1:
-            self.delete_work_row(len(self.work_entries) - 1)
-        if self.work_entries:
-            for entry in self.work_entries[0]:
-                entry.delete(0, tk.END)
-        while len(self.parts_entries) > 1:
-            self.delete_parts_row(len(self.parts_entries) - 1)
-        if self.parts_entries:
-            for entry in self.parts_entries[0]:
-                entry.delete(0, tk.END)
-        self.work_total_sum.delete(0, tk.END)
-        self.work_total_sum.insert(0, "0.00")
-        self.work_total_with_coeff.delete(0, tk.END)
-        self.work_total_with_coeff.insert(0, "0.00")
-        self.parts_total_sum.delete(0, tk.END)
-        self.parts_total_sum.insert(0, "0.00")
-        self.order_total_sum.delete(0, tk.END)
-        self.order_total_sum.insert(0, "0.00")
-        self.coefficient_entry.delete(0, tk.END)
-        self.coefficient_entry.insert(0, "1.2")
+        # Таблицы сокращаются до одной пустой строки; счётчики строк уменьшаются, как при удалении
+        tbl.WORK_ROWS -= max(0, len(self.work_entries) - 1)
+        tbl.MATERIAL_ROWS -= max(0, len(self.parts_entries) - 1)
+        self.order.clear(min_lines=1)
+        RowTable.set_entry(self.coefficient_entry, DEFAULT_COEFFICIENT)
         self.vehicle_id = None
+        self._saved_vehicle_data = {}
+        self._form_version += 1
 
     # ----------- Сбор данных -----------
     def collect_vehicle_data(self):
@@ -561,9 +418,10 @@ class AddPage(SuggestionMixin):
         vehicle_data = {}
         for field_name, db_field in field_mapping.items():
             vehicle_data[db_field] = self.add_entries[field_name].get()
-        vehicle_data["work_total"] = self.work_total_sum.get()
-        vehicle_data["work_total_with_coeff"] = self.work_total_with_coeff.get()
-        vehicle_data["parts_total"] = self.parts_total_sum.get()
+        totals = self.order.totals()
+        vehicle_data["work_total"] = totals["work_total"]
+        vehicle_data["work_total_with_coeff"] = totals["work_total_with_coeff"]
+        vehicle_data["parts_total"] = totals["parts_total"]
         required_fields = [
             "Договор-Заявка №",
             "Дата",
@@ -583,7 +441,17 @@ class AddPage(SuggestionMixin):
     def load_vehicle(self, vehicle_id):
         self.clear_form()
         self.vehicle_id = vehicle_id
-        vehicle_data = get_vehicle_by_id(vehicle_id)
+        version = self._form_version
+        self.db.submit(
+            load_order, vehicle_id,
+            on_done=lambda result: self._on_vehicle_loaded(version, *result),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить данные ТС: {e}"),
+            key="add_page_load",
+        )
+
+    def _on_vehicle_loaded(self, version, vehicle_data, materials_and_works):
+        if version != self._form_version:
+            return  # форму уже очистили или открыли другое ТС
         if not vehicle_data:
             messagebox.showerror("Ошибка", "Не удалось загрузить данные ТС!")
             return
@@ -614,126 +482,66 @@ class AddPage(SuggestionMixin):
         for db_field, field_name in field_mapping.items():
             self.add_entries[field_name].delete(0, tk.END)
             self.add_entries[field_name].insert(0, vehicle_data.get(db_field, ""))
-        self.work_total_sum.delete(0, tk.END)
-        self.work_total_sum.insert(0, vehicle_data.get("work_total", "0.00"))
-        self.work_total_with_coeff.delete(0, tk.END)
-        self.work_total_with_coeff.insert(
-            0, vehicle_data.get("work_total_with_coeff", "0.00")
-        )
-        self.parts_total_sum.delete(0, tk.END)
-        self.parts_total_sum.insert(0, vehicle_data.get("parts_total", "0.00"))
-        materials_and_works = get_materials_and_works(vehicle_id)
-        while len(self.work_entries) > 1:
-            self.delete_work_row(len(self.work_entries) - 1)
-        while len(self.parts_entries) > 1:
-            self.delete_parts_row(len(self.parts_entries) - 1)
-        work_index = 0
-        parts_index = 0
-        for item in materials_and_works:
-            if item["work"]:
-                if work_index >= len(self.work_entries):
-                    self.add_work_row()
-                row = self.work_entries[work_index]
-                row[0].delete(0, tk.END)
-                row[0].insert(0, item["work"])
-                row[1].delete(0, tk.END)
-                row[1].insert(0, item["unit"])
-                row[2].delete(0, tk.END)
-                row[2].insert(0, item["quantity"])
-                row[3].delete(0, tk.END)
-                row[3].insert(0, item["price_per_unit"])
-                row[5].delete(0, tk.END)
-                row[5].insert(0, item.get("equipment_param1", ""))
-                row[6].delete(0, tk.END)
-                row[6].insert(0, item.get("equipment_param2", ""))
-                self.calculate_work_row(work_index)
-                work_index += 1
-            elif item["material"]:
-                if parts_index >= len(self.parts_entries):
-                    self.add_parts_row()
-                row = self.parts_entries[parts_index]
-                row[0].delete(0, tk.END)
-                row[0].insert(0, item["material"])
-                row[1].delete(0, tk.END)
-                row[1].insert(0, item["unit"])
-                row[2].delete(0, tk.END)
-                row[2].insert(0, item["quantity"])
-                row[3].delete(0, tk.END)
-                row[3].insert(0, item["price_per_unit"])
-                self.calculate_parts_row(parts_index)
-                parts_index += 1
-        self.calculate_work_total()
-        self.calculate_parts_total()
-        self.calculate_order_total()
+        self._saved_vehicle_data = vehicle_data
+        # Модель заполняется за один проход, таблицы и итоги перерисовываются по одному разу
+        lines_before = {WORKS: len(self.work_entries), MATERIALS: len(self.parts_entries)}
+        self.order.load(materials_and_works, min_lines=1)
+        tbl.WORK_ROWS += max(0, len(self.order.lines[WORKS]) - lines_before[WORKS])
+        tbl.MATERIAL_ROWS += max(0, len(self.order.lines[MATERIALS]) - lines_before[MATERIALS])
 
     # ----------- Сохранение данных -----------
-    def save_vehicle(self):
+    def save_vehicle(self, on_saved=None):
+        """Сохранение в потоке БД; on_saved() вызывается после успешного сохранения"""
+        if self._saving:
+            return  # повторное нажатие во время сохранения не создаёт второй записи
         vehicle_data = self.collect_vehicle_data()
         if vehicle_data is None:
             return
 
+        # Сохраняются только изменения: поля ТС, отличные от загруженных, новые и
+        # изменённые строки, удалённые строки. Id строк между сохранениями не меняются.
+        lines, deleted_ids = self.order.pending_changes()
+        line_dicts = [line.to_dict(kind) for kind, line in lines]
+        changed_fields = ()
         if self.vehicle_id:
             vehicle_data["id"] = self.vehicle_id
+            changed_fields = self._changed_vehicle_fields(vehicle_data)
+        self._saving = True
+        version = self._form_version
+        self.db.submit(
+            save_order, vehicle_data, changed_fields, line_dicts, deleted_ids,
+            on_done=lambda result: self._on_vehicle_saved(
+                version, vehicle_data, lines, line_dicts, deleted_ids, *result, on_saved=on_saved
+            ),
+            on_error=self._on_save_error,
+        )
 
-        # Сбор работ
-        works = []
-        for row in self.work_entries:
-            work_name = row[0].get().strip()
-            if work_name:
-                works.append({
-                    "work": work_name,
-                    "unit": row[1].get().strip(),
-                    "quantity": row[2].get().strip(),
-                    "price_per_unit": row[3].get().strip(),
-                    "equipment_param1": row[5].get().strip() if len(row) > 5 else "",
-                    "equipment_param2": row[6].get().strip() if len(row) > 6 else "",
-                })
-
-        # Сбор материалов
-        materials = []
-        for row in self.parts_entries:
-            material_name = row[0].get().strip()
-            if material_name:
-                materials.append({
-                    "material": material_name,
-                    "unit": row[1].get().strip(),
-                    "quantity": row[2].get().strip(),
-                    "price_per_unit": row[3].get().strip(),
-                })
-
-        try:
-            self.vehicle_id = save_vehicle(vehicle_data, works, materials)
+    def _on_vehicle_saved(self, version, vehicle_data, lines, line_dicts, deleted_ids,
+                          vehicle_id, line_ids, on_saved=None):
+        self._saving = False
+        if version == self._form_version:
+            self.vehicle_id = vehicle_id
+            self.order.mark_saved(lines, line_ids, deleted_ids, line_dicts)
+            self._saved_vehicle_data = dict(vehicle_data)
+        results_page = getattr(self.main_window, "results_page", None)
+        if results_page is not None:
+            results_page.refresh_vehicle(vehicle_id)
+        if on_saved is not None:
+            on_saved(vehicle_id)
+        else:
             messagebox.showinfo("Успех", "Данные успешно сохранены.")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка при сохранении: {str(e)}")
+
+    def _on_save_error(self, error):
+        self._saving = False
+        messagebox.showerror("Ошибка", f"Ошибка при сохранении: {str(error)}")
+
+    def _changed_vehicle_fields(self, vehicle_data):
+        return [
+            field for field, value in vehicle_data.items()
+            if field != "id" and (self._saved_vehicle_data.get(field) or "") != (value or "")
+        ]
 
     # ----------- Печать -----------
     def save_and_print_vehicle(self):
-        self.save_vehicle()
-        if not self.vehicle_id:
-            return
-        vehicle_data = get_vehicle_by_id(self.vehicle_id)
-        if not vehicle_data:
-            messagebox.showerror("Ошибка", "Не удалось загрузить данные для печати!")
-            return
-        materials_and_works = get_materials_and_works(self.vehicle_id)
-        pdf_path = generate_pdf(vehicle_data, materials_and_works)
-        if pdf_path:
-            add_print_history(vehicle_data, pdf_path)
-            try:
-                os.startfile(pdf_path, "open")
-            except Exception:
-                os.system(f'xdg-open "{pdf_path}"')
-                
-    # ----- Получение данных -----
-    def get_works(self):
-        from src.db.database import get_works
-        return get_works()
-
-    def get_materials(self):
-        from src.db.database import get_materials
-        return get_materials()
-
-    def get_suggestions_for_field(self, field_type, text):
-        from pages.add_page import get_suggestions_for_field
-        return get_suggestions_for_field(field_type, text)
\ No newline at end of file
+        # Печать — после записи: данные для PDF читаются уже сохранёнными
+        self.save_vehicle(on_saved=self.main_window.print_vehicle)
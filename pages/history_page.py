@@ -1,186 +1,233 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from src.db.database import get_print_history, delete_print_history_entry
+from src.db.database import get_print_history, delete_print_history_entry, PRINT_HISTORY_PAGE_SIZE
+from src.pdf.print_queue import open_pdf
+from src.utils.utils import validate_date, bind_hotkeys, create_context_menu
 from tkinter import messagebox
 import os
 
+# Следующая страница истории загружается при прокрутке к концу списка
+LOAD_MORE_THRESHOLD = 0.9  # доля прокрутки, после которой догружается следующая страница
+
+# Колонки таблицы: (ключ записи, заголовок, ширина)
+HISTORY_COLUMNS = [
+    ("row", "№ п/п", 60),
+    ("contract_number", "Договор-Заявка №", 140),
+    ("date", "Дата", 150),
+    ("type", "Тип машины", 120),
+    ("customer", "Заказчик", 220),
+    ("number", "Гос. номер", 110),
+    ("pdf_path", "Путь к файлу", 360),
+]
+
 class HistoryPage:
     def __init__(self, main_window):
         self.main_window = main_window
         self.root = main_window.root
+        self.db = main_window.db
         self.history_frame = main_window.history_frame
+        self._entries = {}     # iid строки Treeview -> запись истории
+        self._next_key = None  # ключ (printed_at, id) последней загруженной записи
+        self._has_more = False
+        self._loading = False
         self.init_history_page()
 
     def init_history_page(self):
         """Инициализация страницы 'История'"""
-        self.history_canvas = ttk.Canvas(self.history_frame)
-        scrollbar = ttk.Scrollbar(
-            self.history_frame, orient="vertical", command=self.history_canvas.yview
-        )
-        scrollable_frame = ttk.Frame(self.history_canvas, style="Custom.TFrame")
+        ttk.Label(
+            self.history_frame, text="История печати", font=("Arial", 14, "bold")
+        ).pack(anchor="w", padx=20, pady=10)
+        self._setup_filters()
+        self._setup_tree()
+        self.update_history()
 
-        self.history_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.history_canvas.configure(
-                scrollregion=self.history_canvas.bbox("all")
-            ),
+    def _setup_filters(self):
+        filter_frame = ttk.Frame(self.history_frame, style="NoBorder.TFrame")
+        filter_frame.pack(fill=X, padx=20, pady=(0, 10))
+
+        ttk.Label(filter_frame, text="С:").pack(side=LEFT)
+        self.date_from_entry = self._date_entry(filter_frame)
+        ttk.Label(filter_frame, text="По:").pack(side=LEFT, padx=(10, 0))
+        self.date_to_entry = self._date_entry(filter_frame)
+
+        ttk.Label(filter_frame, text="Поиск:").pack(side=LEFT, padx=(20, 0))
+        self.search_entry = ttk.Entry(filter_frame, width=30)
+        self.search_entry.pack(side=LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.update_history())
+        bind_hotkeys(self.search_entry)
+        create_context_menu(self.search_entry)
+
+        ttk.Button(
+            filter_frame, text="Применить", style="Print.TButton", command=self.update_history, takefocus=0
+        ).pack(side=LEFT, padx=5)
+        ttk.Button(
+            filter_frame, text="Сбросить", style="Print.TButton", command=self.reset_filters, takefocus=0
+        ).pack(side=LEFT, padx=5)
+
+        ttk.Button(
+            filter_frame, text="Удалить", style="Print.TButton", command=self.delete_selected, takefocus=0
+        ).pack(side=RIGHT, padx=5)
+        ttk.Button(
+            filter_frame, text="Открыть", style="Print.TButton", command=self.open_selected, takefocus=0
+        ).pack(side=RIGHT, padx=5)
+        ttk.Button(
+            filter_frame, text="Печать заново", style="Print.TButton", command=self.reprint_selected, takefocus=0
+        ).pack(side=RIGHT, padx=5)
+
+    def _date_entry(self, parent):
+        entry = ttk.Entry(parent, width=12)
+        vcmd = (
+            self.root.register(lambda char, value, e=entry: validate_date(char, value, e)),
+            "%S",
+            "%P",
         )
-        self.history_canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Прокрутка мышкой — строго через общий обработчик для корректной работы UI
-        self.history_canvas.bind("<Enter>", self.main_window._on_canvas_enter)
-        self.history_canvas.bind("<Leave>", self.main_window._on_canvas_leave)
-
-        self.history_canvas.pack(side=LEFT, fill=BOTH, expand=True)
+        entry.configure(validate="key", validatecommand=vcmd)
+        entry.pack(side=LEFT, padx=5)
+        entry.bind("<Return>", lambda e: self.update_history())
+        bind_hotkeys(entry)
+        create_context_menu(entry)
+        return entry
+
+    def _setup_tree(self):
+        tree_frame = ttk.Frame(self.history_frame, style="NoBorder.TFrame")
+        tree_frame.pack(fill=BOTH, expand=True, padx=20, pady=(0, 10))
+        self.history_tree = ttk.Treeview(
+            tree_frame,
+            columns=[key for key, _, _ in HISTORY_COLUMNS],
+            show="headings",
+            selectmode="extended",
+        )
+        for key, title, width in HISTORY_COLUMNS:
+            self.history_tree.heading(key, text=title)
+            self.history_tree.column(key, width=width, anchor="w", stretch=(key == "pdf_path"))
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=lambda first, last: self._on_scroll(scrollbar, first, last))
+        self.history_tree.pack(side=LEFT, fill=BOTH, expand=True)
         scrollbar.pack(side=RIGHT, fill=Y)
 
-        ttk.Label(
-            scrollable_frame, text="История печати", font=("Arial", 14, "bold")
-        ).pack(anchor="w", padx=20, pady=10)
+        self.history_tree.bind("<Double-1>", lambda e: self.open_selected())
+        self.history_tree.bind("<Return>", lambda e: self.open_selected())
+        self.history_tree.bind("<Delete>", lambda e: self.delete_selected())
+
+    def _on_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        if self._has_more and not self._loading and float(last) >= LOAD_MORE_THRESHOLD:
+            # Догрузка вне обработчика прокрутки: вставка строк снова вызывает yscrollcommand
+            self._loading = True
+            self.root.after_idle(self.load_more_history)
+
+    # ----- Загрузка -----
+    def _filters(self):
+        return {
+            "date_from": self.date_from_entry.get().strip() or None,
+            "date_to": self.date_to_entry.get().strip() or None,
+            "search": self.search_entry.get().strip(),
+        }
 
-        headers = [
-            "№ п/п",
-            "Договор-Заявка №",
-            "Дата",
-            "Тип машины",
-            "Заказчик",
-            "Гос. номер",
-            "Путь к файлу",
-            "",  # Для кнопки "Открыть"
-            "",  # Для кнопки "Удалить"
-        ]
-        header_frame = ttk.Frame(scrollable_frame)
-        header_frame.pack(fill=X, padx=20)
-
-        for col, header in enumerate(headers):
-            ttk.Label(
-                header_frame,
-                text=header,
-                font=("Arial", 10, "bold"),
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=0, column=col, sticky="nsew")
-
-        self.history_body_frame = ttk.Frame(scrollable_frame)
-        self.history_body_frame.pack(fill=X, padx=20)
+    def update_history(self):
+        """Первая страница истории с текущими фильтрами; незавершённая загрузка отменяется"""
+        self.history_tree.delete(*self.history_tree.get_children())
+        self._entries = {}
+        self._next_key = None
+        self._has_more = False
+        self._loading = True
+        self._load_page()
+
+    def load_more_history(self):
+        if not self._has_more:
+            self._loading = False
+            return
+        self._load_page()
+
+    def _load_page(self):
+        self.db.submit(
+            get_print_history, limit=PRINT_HISTORY_PAGE_SIZE, after_key=self._next_key, **self._filters(),
+            on_done=self._on_page_loaded, on_error=self._on_load_error, key="history",
+        )
 
+    def _on_load_error(self, error):
+        self._loading = False
+        self._has_more = False
+        messagebox.showerror("Ошибка", f"Не удалось загрузить историю печати: {error}")
+
+    def _on_page_loaded(self, history):
+        for entry in history:
+            iid = str(entry["id"])
+            if iid in self._entries:
+                continue   # уже в таблице — повторная вставка iid вызвала бы TclError
+            self._entries[iid] = entry
+            values = [len(self._entries)] + [entry.get(key) or "" for key, _, _ in HISTORY_COLUMNS[1:]]
+            self.history_tree.insert("", END, iid=iid, values=values)
+        if history:
+            self._next_key = (history[-1]["printed_at"], history[-1]["id"])
+        self._has_more = len(history) == PRINT_HISTORY_PAGE_SIZE
+        self._loading = False
+
+    def reset_filters(self):
+        for entry in (self.date_from_entry, self.date_to_entry, self.search_entry):
+            entry.delete(0, END)
         self.update_history()
 
-    def update_history(self):
-        """Обновление истории печати"""
-        for widget in self.history_body_frame.winfo_children():
-            widget.destroy()
+    # ----- Действия -----
+    def _selected_entries(self):
+        return [self._entries[iid] for iid in self.history_tree.selection() if iid in self._entries]
 
-        try:
-            history = get_print_history()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить историю печати: {e}")
-            return
+    def open_selected(self):
+        for entry in self._selected_entries()[:1]:
+            self.open_pdf(entry["pdf_path"])
 
-        for row, entry in enumerate(history, 1):
-            pdf_path = entry["pdf_path"]
-            print_date = entry.get("date", "")
-            customer = entry.get("customer", "")
-            brand = entry.get("brand", "")
-            number = entry.get("number", "")
-            contract_number = entry.get("contract_number", "")
-            vehicle_type = entry.get("type", "")
-
-            ttk.Label(
-                self.history_body_frame,
-                text=str(row),
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=0, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=contract_number,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=1, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=print_date,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=2, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=vehicle_type,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=3, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=customer,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=4, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=number,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=5, sticky="nsew")
-            ttk.Label(
-                self.history_body_frame,
-                text=pdf_path,
-                borderwidth=1,
-                relief="solid",
-                padding=5,
-            ).grid(row=row, column=6, sticky="nsew")
-            ttk.Button(
-                self.history_body_frame,
-                text="Открыть",
-                style="Print.TButton",
-                command=lambda path=pdf_path: self.open_pdf(path),
-            ).grid(row=row, column=7, sticky="nsew", padx=1, pady=1)
-            ttk.Button(
-                self.history_body_frame,
-                text="Удалить",
-                style="Print.TButton",
-                command=lambda entry_id=entry["id"], path=pdf_path: self.delete_history_entry(entry_id, path),
-            ).grid(row=row, column=8, sticky="nsew", padx=1, pady=1)
-
-        self.history_canvas.configure(scrollregion=self.history_canvas.bbox("all"))
+    def reprint_selected(self):
+        """Новый PDF по текущим данным заказа; одиночный документ открывается после печати"""
+        vehicle_ids = []
+        for entry in self._selected_entries():
+            if entry["vehicle_id"] not in vehicle_ids:
+                vehicle_ids.append(entry["vehicle_id"])
+        for vehicle_id in vehicle_ids:
+            self.main_window.print_vehicle(vehicle_id, open_when_done=len(vehicle_ids) == 1)
+
+    def delete_selected(self):
+        for entry in self._selected_entries():
+            self.delete_history_entry(entry["id"])
 
     def open_pdf(self, pdf_path):
         """Открытие PDF-файла с обработкой ошибок"""
+        if not pdf_path:
+            messagebox.showinfo(
+                "Файл удалён", "Файл отчёта удалён из кэша отчётов. Используйте «Печать заново»."
+            )
+            return
         try:
             if os.path.exists(pdf_path):
-                os.startfile(pdf_path)  # Для Windows
+                open_pdf(pdf_path)
             else:
                 messagebox.showerror("Ошибка", f"Файл {pdf_path} не найден.")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть файл: {e}")
 
-    def delete_history_entry(self, entry_id, pdf_path):
-        """Удаление записи из истории и PDF-файла"""
-        # Удаляем PDF-файл, если он существует
-        if os.path.exists(pdf_path):
+    def delete_history_entry(self, entry_id):
+        """
+        Удаление записи из истории (в фоновом потоке); из таблицы убирается только эта строка.
+        PDF удаляется, если на него не ссылаются другие записи: повторная печать
+        неизменённого заказа использует тот же файл из кэша отчётов.
+        """
+        self.db.submit(
+            delete_print_history_entry, entry_id,
+            on_done=lambda pdf_path: self._remove_entry(entry_id, pdf_path),
+            on_error=lambda e: messagebox.showerror(
+                "Ошибка", f"Не удалось удалить запись из базы данных: {e}"
+            ),
+        )
+
+    def _remove_entry(self, entry_id, pdf_path):
+        iid = str(entry_id)
+        if self.history_tree.exists(iid):
+            self.history_tree.delete(iid)
+        self._entries.pop(iid, None)
+        # Удаляем PDF-файл, если он больше не нужен
+        if pdf_path and os.path.exists(pdf_path):
             try:
                 os.remove(pdf_path)
             except OSError as e:
                 messagebox.showerror(
                     "Ошибка", f"Не удалось удалить файл {pdf_path}: {e}"
                 )
-                return
-        # Удаляем запись из базы данных
-        try:
-            delete_print_history_entry(entry_id)
-            messagebox.showinfo("Успех", "Запись успешно удалена из истории.")
-        except Exception as e:
-            messagebox.showerror(
-                "Ошибка", f"Не удалось удалить запись из базы данных: {e}"
-            )
-            return
-        # Обновляем таблицу
-        self.update_history()
\ No newline at end of file
@@ -12,16 +12,36 @@ from src.db.database import (
     add_material,
     delete_work,
     delete_material,
+    transaction,
 )
 from src.ui.suggestion_mixin import SuggestionMixin
 from src.utils.utils import bind_hotkeys, create_context_menu
 from tkinter import messagebox
 import src.utils.table_settings as tbl
 
+# --- Операции страницы, выполняемые в потоке БД ---
+def load_catalog():
+    """Общие списки работ и материалов: (works, materials)"""
+    return get_works(), get_materials()
+
+def save_catalog(works, materials):
+    """Замена общих списков одной транзакцией; works/materials — [(name, unit, price)]"""
+    # Кэш справочников сбрасывается один раз, после COMMIT
+    with transaction():
+        for work in get_works():
+            delete_work(work["id"])
+        for name, unit, price in works:
+            add_work(name, unit, price)
+        for material in get_materials():
+            delete_material(material["id"])
+        for name, unit, price in materials:
+            add_material(name, unit, price)
+
 class ProcessesPage(SuggestionMixin):
     def __init__(self, main_window):
         self.main_window = main_window
         self.root = main_window.root
+        self.db = main_window.db
         self.processes_frame = main_window.processes_frame
         self.work_rows = tbl.WORK_ROWS
         self.material_rows = tbl.MATERIAL_ROWS
@@ -31,6 +51,7 @@ class ProcessesPage(SuggestionMixin):
         self.active_canvas = None
         self.vehicle_id = None
         self.init_processes_page()
+        self.refresh_suggestion_indexes()   # индексы подсказок строятся в потоке БД заранее
 
     def bind_suggestion_events(self, entry, field_type, row, table_type):
         super().bind_suggestion_events(entry, field_type, row, table_type)
@@ -290,25 +311,30 @@ class ProcessesPage(SuggestionMixin):
         self.global_materials_canvas.configure(scrollregion=self.global_materials_canvas.bbox("all"))
 
     def update_vehicle_combobox(self):
-        try:
-            self.vehicles = get_all_vehicles()
-            if not self.vehicles:
-                messagebox.showinfo("Информация", "Список транспортных средств пуст.")
-                self.vehicle_combobox["values"] = []
-                self.vehicle_combobox.set("")
-                self.vehicle_id = None
-                self.update_vehicle_tables()
-                return
-            vehicle_options = [
-                f"{v['type']} — {v['customer']}, Заявка № {v['contract_number']}, Гос. номер {v['number']}"
-                for v in self.vehicles
-            ]
-            self.vehicle_combobox["values"] = vehicle_options
-            self.vehicle_combobox.set(vehicle_options[0])
-            self.vehicle_id = self.vehicles[0]['id']
+        self.db.submit(
+            get_all_vehicles,
+            on_done=self._on_vehicles_loaded,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить список ТС: {e}"),
+            key="processes_vehicles",
+        )
+
+    def _on_vehicles_loaded(self, vehicles):
+        self.vehicles = vehicles
+        if not self.vehicles:
+            messagebox.showinfo("Информация", "Список транспортных средств пуст.")
+            self.vehicle_combobox["values"] = []
+            self.vehicle_combobox.set("")
+            self.vehicle_id = None
             self.update_vehicle_tables()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить список ТС: {e}")
+            return
+        vehicle_options = [
+            f"{v['type']} — {v['customer']}, Заявка № {v['contract_number']}, Гос. номер {v['number']}"
+            for v in self.vehicles
+        ]
+        self.vehicle_combobox["values"] = vehicle_options
+        self.vehicle_combobox.set(vehicle_options[0])
+        self.vehicle_id = self.vehicles[0]['id']
+        self.update_vehicle_tables()
 
     def update_vehicle_tables(self, event=None, vehicle_id=None):
         if event:
@@ -324,7 +350,17 @@ class ProcessesPage(SuggestionMixin):
             self.clear_vehicle_tables()
             return
 
-        materials_and_works = get_materials_and_works(self.vehicle_id)
+        vehicle_id = self.vehicle_id
+        self.db.submit(
+            get_materials_and_works, vehicle_id,
+            on_done=lambda lines: self._fill_vehicle_tables(vehicle_id, lines),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить работы и материалы: {e}"),
+            key="processes_lines",
+        )
+
+    def _fill_vehicle_tables(self, vehicle_id, materials_and_works):
+        if vehicle_id != self.vehicle_id:
+            return  # за время загрузки выбрали другое ТС
         works = [entry for entry in materials_and_works if entry["work"]]
         materials = [entry for entry in materials_and_works if entry["material"]]
 
@@ -345,11 +381,10 @@ class ProcessesPage(SuggestionMixin):
             entries[1].insert(0, works[row]["unit"])
             entries[2].insert(0, works[row]["quantity"])
             entries[3].insert(0, works[row]["price_per_unit"])
-            self.work_ids.append(works[row]["id"])
+            self.work_ids[-1] = works[row]["id"]
 
         for _ in range(len(works), self.work_rows):
             self.add_work_row(add_to_global=False)
-            self.work_ids.append(None)
         self.works_canvas.configure(scrollregion=self.works_canvas.bbox("all"))
 
         self.material_rows = max(len(materials), tbl.MATERIAL_ROWS)
@@ -369,11 +404,10 @@ class ProcessesPage(SuggestionMixin):
             entries[1].insert(0, materials[row]["unit"])
             entries[2].insert(0, materials[row]["quantity"])
             entries[3].insert(0, materials[row]["price_per_unit"])
-            self.material_ids.append(materials[row]["id"])
+            self.material_ids[-1] = materials[row]["id"]
 
         for _ in range(len(materials), self.material_rows):
             self.add_material_row(add_to_global=False)
-            self.material_ids.append(None)
         self.materials_canvas.configure(scrollregion=self.materials_canvas.bbox("all"))
 
     def clear_vehicle_tables(self):
@@ -385,8 +419,14 @@ class ProcessesPage(SuggestionMixin):
                 entry.delete(0, tk.END)
 
     def update_global_tables(self):
-        works = get_works()
-        materials = get_materials()
+        self.db.submit(
+            load_catalog,
+            on_done=lambda result: self._fill_global_tables(*result),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить общие списки: {e}"),
+            key="processes_catalog",
+        )
+
+    def _fill_global_tables(self, works, materials):
         self.global_work_rows = max(len(works), tbl.WORK_ROWS)
         for entries in self.global_work_entries:
             for entry in entries:
@@ -402,10 +442,9 @@ class ProcessesPage(SuggestionMixin):
             entries[0].insert(0, works[row]["name"])
             entries[1].insert(0, works[row]["unit"])
             entries[2].insert(0, works[row]["price"])
-            self.global_work_ids.append(works[row]["id"])
+            self.global_work_ids[-1] = works[row]["id"]
         for _ in range(len(works), self.global_work_rows):
             self.add_global_work_row(add_to_global=False)
-            self.global_work_ids.append(None)
         self.global_works_canvas.configure(scrollregion=self.global_works_canvas.bbox("all"))
         self.global_material_rows = max(len(materials), tbl.MATERIAL_ROWS)
         for entries in self.global_material_entries:
@@ -422,21 +461,46 @@ class ProcessesPage(SuggestionMixin):
             entries[0].insert(0, materials[row]["name"])
             entries[1].insert(0, materials[row]["unit"])
             entries[2].insert(0, materials[row]["price"])
-            self.global_material_ids.append(materials[row]["id"])
+            self.global_material_ids[-1] = materials[row]["id"]
         for _ in range(len(materials), self.global_material_rows):
             self.add_global_material_row(add_to_global=False)
-            self.global_material_ids.append(None)
         self.global_materials_canvas.configure(scrollregion=self.global_materials_canvas.bbox("all"))
 
+    def _delete_row(self, row_id, button, delete, remove, error_text):
+        """
+        Удаляет запись row_id в БД и только после этого убирает строку таблицы (remove).
+        При ошибке строка остаётся, несохранённые правки в таблицах не теряются.
+        """
+        if row_id is None:
+            remove()
+            return
+        button.configure(state="disabled")   # не удалять повторно, пока идёт удаление
+
+        def failed(error):
+            if button.winfo_exists():
+                button.configure(state="normal")
+            messagebox.showerror("Ошибка", f"{error_text}: {error}")
+
+        self.db.submit(delete, row_id, on_done=lambda _: remove(), on_error=failed)
+
+    @staticmethod
+    def _row_index(rows, entries):
+        """Текущий номер строки (строки выше могли удалить); None — таблица перечитана"""
+        return next((i for i, row_entries in enumerate(rows) if row_entries is entries), None)
+
     def delete_work_row(self, row):
         if self.work_rows <= 1:
             return
-        if self.work_ids[row] is not None:
-            try:
-                delete_material_and_work(self.work_ids[row])
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось удалить работу: {e}")
-                return
+        entries = self.work_entries[row]
+        self._delete_row(
+            self.work_ids[row], self.work_delete_buttons[row], delete_material_and_work,
+            lambda: self._remove_work_row(entries), "Не удалось удалить работу",
+        )
+
+    def _remove_work_row(self, entries):
+        row = self._row_index(self.work_entries, entries)
+        if row is None:
+            return
         for entry in self.work_entries[row]:
             entry.grid_forget()
         self.work_delete_buttons[row].grid_forget()
@@ -466,12 +530,16 @@ class ProcessesPage(SuggestionMixin):
     def delete_material_row(self, row):
         if self.material_rows <= 1:
             return
-        if self.material_ids[row] is not None:
-            try:
-                delete_material_and_work(self.material_ids[row])
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось удалить материал: {e}")
-                return
+        entries = self.material_entries[row]
+        self._delete_row(
+            self.material_ids[row], self.material_delete_buttons[row], delete_material_and_work,
+            lambda: self._remove_material_row(entries), "Не удалось удалить материал",
+        )
+
+    def _remove_material_row(self, entries):
+        row = self._row_index(self.material_entries, entries)
+        if row is None:
+            return
         for entry in self.material_entries[row]:
             entry.grid_forget()
         self.material_delete_buttons[row].grid_forget()
@@ -501,14 +569,16 @@ class ProcessesPage(SuggestionMixin):
     def delete_global_work_row(self, row):
         if self.global_work_rows <= 1:
             return
-        if self.global_work_ids[row] is not None:
-            try:
-                delete_work(self.global_work_ids[row])
-            except Exception as e:
-                messagebox.showerror(
-                    "Ошибка", f"Не удалось удалить работу из общего списка: {e}"
-                )
-                return
+        entries = self.global_work_entries[row]
+        self._delete_row(
+            self.global_work_ids[row], self.global_work_delete_buttons[row], delete_work,
+            lambda: self._remove_global_work_row(entries), "Не удалось удалить работу из общего списка",
+        )
+
+    def _remove_global_work_row(self, entries):
+        row = self._row_index(self.global_work_entries, entries)
+        if row is None:
+            return
         for entry in self.global_work_entries[row]:
             entry.grid_forget()
         self.global_work_delete_buttons[row].grid_forget()
@@ -538,14 +608,16 @@ class ProcessesPage(SuggestionMixin):
     def delete_global_material_row(self, row):
         if self.global_material_rows <= 1:
             return
-        if self.global_material_ids[row] is not None:
-            try:
-                delete_material(self.global_material_ids[row])
-            except Exception as e:
-                messagebox.showerror(
-                    "Ошибка", f"Не удалось удалить материал из общего списка: {e}"
-                )
-                return
+        entries = self.global_material_entries[row]
+        self._delete_row(
+            self.global_material_ids[row], self.global_material_delete_buttons[row], delete_material,
+            lambda: self._remove_global_material_row(entries), "Не удалось удалить материал из общего списка",
+        )
+
+    def _remove_global_material_row(self, entries):
+        row = self._row_index(self.global_material_entries, entries)
+        if row is None:
+            return
         for entry in self.global_material_entries[row]:
             entry.grid_forget()
         self.global_material_delete_buttons[row].grid_forget()
@@ -589,33 +661,23 @@ class ProcessesPage(SuggestionMixin):
             btn.configure(command=lambda r=i: self.delete_global_material_row(r))
 
     def save_processes(self):
-        try:
-            existing_works = get_works()
-            for work in existing_works:
-                delete_work(work["id"])
-            for entries in self.global_work_entries:
+        def collect(rows):
+            items = []
+            for entries in rows:
                 name = entries[0].get().strip()
-                unit = entries[1].get().strip()
-                price = entries[2].get().strip()
                 if name:
-                    add_work(name, unit, price)
+                    items.append((name, entries[1].get().strip(), entries[2].get().strip()))
+            return items
 
-            existing_materials = get_materials()
-            for material in existing_materials:
-                delete_material(material["id"])
-            for entries in self.global_material_entries:
-                name = entries[0].get().strip()
-                unit = entries[1].get().strip()
-                price = entries[2].get().strip()
-                if name:
-                    add_material(name, unit, price)
-
-            if hasattr(self.main_window, "add_page"):
-                self.main_window.add_page.update_suggestions()
-            self.update_global_tables()
-            messagebox.showinfo("Успех", "Общие списки успешно сохранены!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить данные в общих таблицах: {e}")
+        self.db.submit(
+            save_catalog, collect(self.global_work_entries), collect(self.global_material_entries),
+            on_done=self._on_processes_saved,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось сохранить данные в общих таблицах: {e}"),
+        )
+
+    def _on_processes_saved(self, _):
+        self.update_global_tables()
+        messagebox.showinfo("Успех", "Общие списки успешно сохранены!")
 
     def refresh_from_add_page(self, vehicle_id):
         self.update_vehicle_combobox()
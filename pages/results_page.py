@@ -1,22 +1,70 @@
+import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from src.db.database import get_all_vehicles, delete_vehicle
+from src.db.database import (
+    VEHICLE_LIST_FIELDS, query_vehicles, search_orders, delete_vehicle, get_vehicle_by_id
+)
+from src.db.search import VEHICLE_TYPES
 from tkinter import messagebox
-import os
-from PIL import Image, ImageTk
+from src.ui.assets import get_photo
+from src.ui.virtual_list import VirtualList
 from src.utils.utils import (
     bind_hotkeys,
     create_context_menu,
-    resource_path
+    validate_date,
 )
 
+# Размер страницы списка ТС и варианты сортировки (подпись -> колонка query_vehicles)
+PAGE_SIZE = 50
+VEHICLE_ICON_SIZE = (100, 100)
+ROW_HEIGHT = 112  # иконка 100x100 + отступы; строки виртуального списка одной высоты
+SORT_OPTIONS = {
+    "По порядку": "id",
+    "По заказчику": "customer",
+    "По номеру заявки": "contract_number",
+}
+
+def fetch_vehicles_page(params, use_fts, after_key=None, limit=PAGE_SIZE):
+    """
+    Страница списка ТС (выполняется в потоке БД). При полнотекстовом поиске результаты
+    идут по релевантности, ключ следующей страницы — смещение (после удаления строк из
+    списка его уменьшает ResultsPage._forget_rows); иначе — keyset-пагинация
+    query_vehicles. Возвращает (строки, ключ следующей страницы).
+    """
+    if use_fts:
+        offset = after_key or 0
+        vehicles = search_orders(
+            params["search"], limit=limit + 1, type=params["type"], offset=offset
+        )
+        next_key = offset + limit if len(vehicles) > limit else None
+        return vehicles[:limit], next_key
+    return query_vehicles(limit=limit, after_key=after_key, **params)
+
+def fetch_vehicles(params, limit=PAGE_SIZE):
+    """Первая страница: полнотекстовый поиск, при пустом результате — поиск подстроки"""
+    use_fts = bool(params["search"])
+    vehicles, next_key = fetch_vehicles_page(params, use_fts, limit=limit)
+    if use_fts and not vehicles:
+        # Полнотекстовый поиск ищет слова целиком или по началу;
+        # для фрагментов внутри слова остаётся поиск подстроки
+        use_fts = False
+        vehicles, next_key = fetch_vehicles_page(params, use_fts, limit=limit)
+    return vehicles, next_key, use_fts
+
 class ResultsPage:
     def __init__(self, main_window):
         self.main_window = main_window
         self.root = main_window.root
+        self.db = main_window.db
         self.results_frame = main_window.results_frame
         self.vehicle_images = main_window.vehicle_images
         self.current_active_button = None
+        self._next_key = None
+        self._use_fts = False
+        self._params = None
+        self._loading = False
+        self._vehicles = []
+        self._selected = set()   # id ТС, отмеченных для пакетной печати
         self._setup_ui()
 
     def _setup_ui(self):
@@ -43,8 +91,7 @@ class ResultsPage:
         bind_hotkeys(self.search_entry)
         create_context_menu(self.search_entry)
         try:
-            search_icon_path = resource_path(r"Tandem/assets/search_icon.png")
-            search_icon = ImageTk.PhotoImage(Image.open(search_icon_path))
+            search_icon = get_photo(r"Tandem/assets/search_icon.png")
             search_button = ttk.Button(
                 search_frame,
                 image=search_icon,
@@ -69,25 +116,41 @@ class ResultsPage:
         filter_frame.pack(side=LEFT, padx=10)
         self.filter_combobox = ttk.Combobox(
             filter_frame,
-            values=["Все типы", "Легковые", "Автобусы", "Рефрижераторы", "Разное"],
+            values=["Все типы", *VEHICLE_TYPES],
             state="readonly",
             width=15,
         )
         self.filter_combobox.set("Все типы")
-        self.filter_combobox.pack()
+        self.filter_combobox.pack(side=LEFT)
         self.filter_combobox.bind("<<ComboboxSelected>>", self.filter_vehicles)
+        self.sort_combobox = ttk.Combobox(
+            filter_frame,
+            values=list(SORT_OPTIONS),
+            state="readonly",
+            width=18,
+        )
+        self.sort_combobox.set("По порядку")
+        self.sort_combobox.pack(side=LEFT, padx=(10, 0))
+        self.sort_combobox.bind("<<ComboboxSelected>>", self.filter_vehicles)
 
     def _setup_buttons(self, parent):
         button_frame = ttk.Frame(parent, style="NoBorder.TFrame")
         button_frame.pack(side=RIGHT)
+        ttk.Button(
+            button_frame,
+            text="Пакетная печать",
+            style="NoBorder.TButton",
+            command=self.open_batch_print_dialog,
+            takefocus=0,
+        ).pack(side=LEFT, padx=5)
         self._setup_history_button(button_frame)
         self._setup_processes_button(button_frame)
         self._setup_add_button(button_frame)
 
     def _setup_history_button(self, frame):
         try:
-            history_icon = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/history.png")))
-            history_icon_active = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/history_active.png")))
+            history_icon = get_photo(r"Tandem/assets/history.png")
+            history_icon_active = get_photo(r"Tandem/assets/history_active.png")
             self.history_button = ttk.Button(
                 frame,
                 image=history_icon,
@@ -114,8 +177,8 @@ class ResultsPage:
 
     def _setup_processes_button(self, frame):
         try:
-            processes_icon = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/list.png")))
-            processes_icon_active = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/list_active.png")))
+            processes_icon = get_photo(r"Tandem/assets/list.png")
+            processes_icon_active = get_photo(r"Tandem/assets/list_active.png")
             self.processes_button = ttk.Button(
                 frame,
                 image=processes_icon,
@@ -142,8 +205,8 @@ class ResultsPage:
 
     def _setup_add_button(self, frame):
         try:
-            add_icon = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/add.png")))
-            add_icon_active = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/add_active.png")))
+            add_icon = get_photo(r"Tandem/assets/add.png")
+            add_icon_active = get_photo(r"Tandem/assets/add_active.png")
             self.add_button = ttk.Button(
                 frame,
                 image=add_icon,
@@ -169,34 +232,30 @@ class ResultsPage:
             self.add_button.pack(side=LEFT, padx=5)
 
     def _setup_vehicles_canvas(self):
-        self.results_canvas = ttk.Canvas(self.results_frame)
-        scrollbar = ttk.Scrollbar(
-            self.results_frame, orient="vertical", command=self.results_canvas.yview
-        )
-        self.scrollable_frame = ttk.Frame(self.results_canvas, style="NoBorder.TFrame")
-        self.results_canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.results_canvas.configure(scrollregion=self.results_canvas.bbox("all")),
-        )
-        self.results_canvas.configure(yscrollcommand=scrollbar.set)
+        self.results_canvas = ttk.Canvas(self.results_frame, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self.results_frame, orient="vertical")
         self.results_canvas.bind("<Enter>", self.main_window._on_canvas_enter)
         self.results_canvas.bind("<Leave>", self.main_window._on_canvas_leave)
-        self.results_canvas.pack(side=LEFT, fill=BOTH, expand=True)
+        self.results_canvas.pack(side=LEFT, fill=BOTH, expand=True, padx=(20, 0), pady=10)
         scrollbar.pack(side=RIGHT, fill=Y)
-        self.results_body_frame = ttk.Frame(self.scrollable_frame)
-        self.results_body_frame.pack(fill=X, padx=20, pady=10)
+        # Виджеты создаются только для видимых строк и переиспользуются при прокрутке
+        self.vehicle_list = VirtualList(
+            self.results_canvas,
+            scrollbar,
+            ROW_HEIGHT,
+            self._create_vehicle_row,
+            self._update_vehicle_row,
+            key=lambda vehicle: vehicle["id"],
+        )
 
     def _load_vehicle_icons(self):
+        # Уменьшенные иконки берутся из общего кэша (и его дискового кэша миниатюр)
         self.vehicle_images_tk = {}
         for vehicle_type, path in self.vehicle_images.items():
-            full_path = resource_path(path)
-            if os.path.exists(full_path):
-                try:
-                    image = Image.open(full_path).resize((100, 100), Image.Resampling.LANCZOS)
-                    self.vehicle_images_tk[vehicle_type] = ImageTk.PhotoImage(image)
-                except Exception:
-                    pass
+            try:
+                self.vehicle_images_tk[vehicle_type] = get_photo(path, VEHICLE_ICON_SIZE)
+            except Exception:
+                pass
 
     def set_active_button(self, button_name):
         self.current_active_button = button_name
@@ -219,75 +278,224 @@ class ResultsPage:
         if not self.search_entry.get():
             self.search_entry.insert(0, "Поиск")
 
-    def update_results(self):
-        for widget in self.results_body_frame.winfo_children():
-            widget.destroy()
-        try:
-            vehicles = get_all_vehicles()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить список ТС: {e}")
-            return
-        if not vehicles:
-            ttk.Label(
-                self.results_body_frame,
-                text="Список транспортных средств пуст.",
-                style="Custom.TLabel",
-            ).pack(pady=20)
-            return
-        search_text = self.search_entry.get().lower().strip()
-        if search_text == "поиск":
+    def _query_params(self):
+        search_text = self.search_entry.get().strip()
+        if search_text.lower() == "поиск":
             search_text = ""
         filter_type = self.filter_combobox.get()
-        filtered_vehicles = [
-            v for v in vehicles
-            if (not search_text or
-                search_text in v.get("contract_number", "").lower().strip() or
-                search_text in v.get("customer", "").lower().strip() or
-                search_text in v.get("number", "").lower().strip() or
-                search_text in v.get("brand", "").lower().strip())
-            and (filter_type == "Все типы" or v.get("type", "").lower().strip() == filter_type.lower().strip())
-        ]
-        if not filtered_vehicles:
-            ttk.Label(
-                self.results_body_frame,
-                text="Нет транспортных средств, соответствующих фильтру.",
-                style="Custom.TLabel",
-            ).pack(pady=20)
+        return {
+            "search": search_text,
+            "type": None if filter_type == "Все типы" else filter_type,
+            "order_by": SORT_OPTIONS.get(self.sort_combobox.get(), "id"),
+        }
+
+    def update_results(self, keep_position=False):
+        """
+        Загружает список ТС в фоновом потоке; фильтр, поиск и сортировка — в SQL.
+        Новый запрос вытесняет незавершённый (например, при наборе текста поиска).
+        Виджеты перерисовываются только для добавленных, удалённых, изменённых
+        и сдвинутых строк (VirtualList сравнивает строки по id).
+        keep_position — перечитать уже загруженные строки, не сбрасывая прокрутку.
+        """
+        params = self._query_params()
+        limit = max(PAGE_SIZE, len(self._vehicles)) if keep_position else PAGE_SIZE
+        self._loading = True
+        self.db.submit(
+            fetch_vehicles, params, limit,
+            on_done=lambda result: self._on_results_loaded(params, keep_position, *result),
+            on_error=self._on_results_error,
+            key="results",
+        )
+
+    def _on_results_loaded(self, params, keep_position, vehicles, next_key, use_fts):
+        self._loading = False
+        self._params = params
+        self._next_key = next_key
+        self._use_fts = use_fts
+        if not vehicles:
+            text = (
+                "Нет транспортных средств, соответствующих фильтру."
+                if params["search"] or params["type"]
+                else "Список транспортных средств пуст."
+            )
+            self.vehicle_list.set_empty_text(text, font=("Arial", 12))
+        else:
+            self.vehicle_list.set_empty_text(None)
+        self._set_vehicles(vehicles, keep_position)
+
+    def _on_results_error(self, error):
+        self._loading = False
+        self._next_key = None
+        messagebox.showerror("Ошибка", f"Не удалось загрузить список ТС: {error}")
+
+    def _set_vehicles(self, vehicles, keep_position=True):
+        self._vehicles = vehicles
+        self.vehicle_list.set_source(
+            len(vehicles), self._vehicles.__getitem__, self.load_more_results, keep_position=keep_position
+        )
+
+    def refresh_vehicle(self, vehicle_id):
+        """После сохранения ТС: обновляет только его строку (новое ТС — перечитывает список)"""
+        if not any(v["id"] == vehicle_id for v in self._vehicles):
+            self.update_results(keep_position=True)
             return
-        for vehicle in filtered_vehicles:
-            self._add_vehicle_row(vehicle)
+        self.db.submit(
+            get_vehicle_by_id, vehicle_id,
+            on_done=lambda vehicle: self._replace_vehicle(vehicle_id, vehicle),
+            on_error=self._on_results_error,
+        )
+
+    def _replace_vehicle(self, vehicle_id, vehicle):
+        # Пока строка загружалась, список мог обновиться — позиция ищется заново
+        index = next((i for i, v in enumerate(self._vehicles) if v["id"] == vehicle_id), None)
+        if index is None:
+            return
+        vehicles = list(self._vehicles)
+        if vehicle is None:
+            del vehicles[index]
+            self._forget_rows(1)
+        else:
+            vehicles[index] = {field: vehicle.get(field) for field in VEHICLE_LIST_FIELDS}
+        self._set_vehicles(vehicles)
+
+    def load_more_results(self):
+        """Догружает следующую страницу, когда список прокручен почти до конца"""
+        if self._next_key is None or self._loading:
+            return
+        self._loading = True
+        self.db.submit(
+            fetch_vehicles_page, self._params, self._use_fts, self._next_key,
+            on_done=lambda result: self._on_more_loaded(*result),
+            on_error=self._on_results_error,
+            key="results",
+        )
 
-    def _add_vehicle_row(self, vehicle):
-        vehicle_frame = ttk.Frame(self.results_body_frame, style="NoBorder.TFrame")
-        vehicle_frame.pack(fill=X, pady=5)
+    def _on_more_loaded(self, vehicles, next_key):
+        self._loading = False
+        self._next_key = next_key
+        # Порядок по релевантности может сдвинуться между страницами — повторы пропускаются
+        loaded = {v["id"] for v in self._vehicles}
+        self._vehicles.extend(v for v in vehicles if v["id"] not in loaded)
+        self.vehicle_list.set_count(len(self._vehicles))
+
+    def _forget_rows(self, count):
+        """
+        Строки удалены из уже загруженной части списка: смещение следующей страницы
+        полнотекстового поиска уменьшается, иначе столько же заказов было бы пропущено.
+        Ключ query_vehicles — (значение, id) последней строки, его удаление не сдвигает.
+        """
+        if self._use_fts and self._next_key is not None:
+            self._next_key = max(0, self._next_key - count)
+
+    def _create_vehicle_row(self, parent):
+        """Строка списка ТС; данные подставляет _update_vehicle_row"""
+        vehicle_frame = ttk.Frame(parent, style="NoBorder.TFrame")
+        vehicle_frame.vehicle_id = None
+        vehicle_frame.selected_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            vehicle_frame,
+            variable=vehicle_frame.selected_var,
+            command=lambda: self._toggle_selected(vehicle_frame),
+            takefocus=0,
+        ).pack(side=LEFT, padx=(10, 0))
+        vehicle_frame.icon_label = ttk.Label(vehicle_frame, style="Custom.TLabel")
+        vehicle_frame.icon_label.pack(side=LEFT, padx=10)
+        button_frame = ttk.Frame(vehicle_frame, style="NoBorder.TFrame")
+        button_frame.pack(side=RIGHT, padx=10)
+        vehicle_frame.text_label = ttk.Label(vehicle_frame, style="Custom.TLabel", wraplength=0)
+        vehicle_frame.text_label.pack(side=LEFT, padx=10, fill=X, expand=True)
+        self._add_edit_button(button_frame, vehicle_frame)
+        self._add_print_button(button_frame, vehicle_frame)
+        self._add_delete_button(button_frame, vehicle_frame)
+        return vehicle_frame
+
+    def _update_vehicle_row(self, vehicle_frame, vehicle, index):
+        vehicle_frame.vehicle_id = vehicle["id"]
+        vehicle_frame.selected_var.set(vehicle["id"] in self._selected)
         vehicle_type = vehicle.get("type", "Разное")
         vehicle_icon = self.vehicle_images_tk.get(vehicle_type, self.vehicle_images_tk.get("Разное"))
         if vehicle_icon:
-            ttk.Label(vehicle_frame, image=vehicle_icon, style="Custom.TLabel").pack(side=LEFT, padx=10)
+            vehicle_frame.icon_label.configure(image=vehicle_icon, text="")
         else:
-            ttk.Label(vehicle_frame, text="[Иконка не загружена]", style="Custom.TLabel").pack(side=LEFT, padx=10)
+            vehicle_frame.icon_label.configure(image="", text="[Иконка не загружена]")
         vehicle_text = (
             f"{vehicle.get('type', 'Не указан')} — {vehicle.get('customer', 'Не указан')}, "
             f"Заявка № {vehicle.get('contract_number', 'Не указан')}, "
             f"Гос. номер {vehicle.get('number', 'Не указан')}, "
             f"Марка — {vehicle.get('brand', 'Не указан')}"
         )
-        ttk.Label(vehicle_frame, text=vehicle_text, style="Custom.TLabel", wraplength=0).pack(side=LEFT, padx=10, fill=X, expand=True)
-        button_frame = ttk.Frame(vehicle_frame, style="NoBorder.TFrame")
-        button_frame.pack(side=RIGHT, padx=10)
-        self._add_edit_button(button_frame, vehicle["id"])
-        self._add_print_button(button_frame, vehicle["id"])
-        self._add_delete_button(button_frame, vehicle["id"])
+        vehicle_frame.text_label.configure(text=vehicle_text)
+
+    def _toggle_selected(self, vehicle_frame):
+        if vehicle_frame.selected_var.get():
+            self._selected.add(vehicle_frame.vehicle_id)
+        else:
+            self._selected.discard(vehicle_frame.vehicle_id)
+
+    # ----- Пакетная печать -----
+    def open_batch_print_dialog(self):
+        """Печать отмеченных ТС или всех заказов за период (по дате заказа)"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Пакетная печать")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        frame = ttk.Frame(dialog, padding=15)
+        frame.pack(fill=BOTH, expand=True)
 
-    def _add_edit_button(self, frame, vehicle_id):
+        mode = tk.StringVar(value="selected" if self._selected else "period")
+        selected_radio = ttk.Radiobutton(
+            frame, text=f"Отмеченные в списке ({len(self._selected)})", variable=mode, value="selected"
+        )
+        selected_radio.grid(row=0, column=0, columnspan=4, sticky="w", pady=(0, 5))
+        if not self._selected:
+            selected_radio.configure(state="disabled")
+        ttk.Radiobutton(frame, text="Заказы за период", variable=mode, value="period").grid(
+            row=1, column=0, columnspan=4, sticky="w"
+        )
+        date_entries = []
+        for column, caption in ((0, "С:"), (2, "По:")):
+            ttk.Label(frame, text=caption).grid(row=2, column=column, sticky="e", padx=(0, 5), pady=5)
+            entry = ttk.Entry(frame, width=12)
+            entry.configure(
+                validate="key",
+                validatecommand=(
+                    self.root.register(lambda char, value, e=entry: validate_date(char, value, e)),
+                    "%S",
+                    "%P",
+                ),
+            )
+            entry.grid(row=2, column=column + 1, sticky="w", pady=5)
+            entry.bind("<FocusIn>", lambda e: mode.set("period"))
+            bind_hotkeys(entry)
+            create_context_menu(entry)
+            date_entries.append(entry)
+
+        def start():
+            if mode.get() == "selected":
+                self.main_window.print_batch(vehicle_ids=sorted(self._selected))
+            else:
+                date_from, date_to = (entry.get().strip() or None for entry in date_entries)
+                if not date_from and not date_to:
+                    messagebox.showerror("Ошибка", "Укажите период печати.", parent=dialog)
+                    return
+                self.main_window.print_batch(date_from=date_from, date_to=date_to)
+            dialog.destroy()
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=3, column=0, columnspan=4, sticky="e", pady=(10, 0))
+        ttk.Button(button_frame, text="Печать", style="Print.TButton", command=start).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Отмена", style="Print.TButton", command=dialog.destroy).pack(side=LEFT)
+        dialog.grab_set()
+
+    def _add_edit_button(self, frame, row):
         try:
-            edit_icon = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/edit.png")))
-            edit_icon_active = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/edit_active.png")))
+            edit_icon = get_photo(r"Tandem/assets/edit.png")
+            edit_icon_active = get_photo(r"Tandem/assets/edit_active.png")
             edit_button = ttk.Button(
                 frame,
                 image=edit_icon,
                 style="NoBorder.TButton",
-                command=lambda: self._edit_vehicle_action(vehicle_id),
+                command=lambda: self._edit_vehicle_action(row.vehicle_id),
                 takefocus=0,
             )
             edit_button.pack(side=LEFT, padx=5)
@@ -300,7 +508,7 @@ class ResultsPage:
                 frame,
                 text="Ред.",
                 style="NoBorder.TButton",
-                command=lambda: self._edit_vehicle_action(vehicle_id),
+                command=lambda: self._edit_vehicle_action(row.vehicle_id),
                 takefocus=0,
             )
             edit_button.pack(side=LEFT, padx=5)
@@ -312,15 +520,15 @@ class ResultsPage:
         if hasattr(self.main_window, "add_page") and hasattr(self.main_window.add_page, "load_vehicle"):
             self.main_window.add_page.load_vehicle(vehicle_id)
 
-    def _add_print_button(self, frame, vehicle_id):
+    def _add_print_button(self, frame, row):
         try:
-            print_icon_default = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/print_icon_default.png")))
-            print_icon_hover = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/print_icon_while_hovering.png")))
+            print_icon_default = get_photo(r"Tandem/assets/print_icon_default.png")
+            print_icon_hover = get_photo(r"Tandem/assets/print_icon_while_hovering.png")
             print_button = ttk.Button(
                 frame,
                 image=print_icon_default,
                 style="NoBorder.TButton",
-                command=lambda: self.main_window.print_vehicle(vehicle_id),
+                command=lambda: self.main_window.print_vehicle(row.vehicle_id),
                 takefocus=0,
             )
             print_button.pack(side=LEFT, padx=5)
@@ -333,20 +541,20 @@ class ResultsPage:
                 frame,
                 text="Печ.",
                 style="NoBorder.TButton",
-                command=lambda: self.main_window.print_vehicle(vehicle_id),
+                command=lambda: self.main_window.print_vehicle(row.vehicle_id),
                 takefocus=0,
             )
             print_button.pack(side=LEFT, padx=5)
 
-    def _add_delete_button(self, frame, vehicle_id):
+    def _add_delete_button(self, frame, row):
         try:
-            delete_icon_default = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/delete_icon_default.png")))
-            delete_icon_hover = ImageTk.PhotoImage(Image.open(resource_path(r"Tandem/assets/delete_icon_while_hovering.png")))
+            delete_icon_default = get_photo(r"Tandem/assets/delete_icon_default.png")
+            delete_icon_hover = get_photo(r"Tandem/assets/delete_icon_while_hovering.png")
             delete_button = ttk.Button(
                 frame,
                 image=delete_icon_default,
                 style="NoBorder.TButton",
-                command=lambda: self.delete_vehicle(vehicle_id),
+                command=lambda: self.delete_vehicle(row.vehicle_id),
                 takefocus=0,
             )
             delete_button.pack(side=LEFT, padx=5)
@@ -359,7 +567,7 @@ class ResultsPage:
                 frame,
                 text="Удал.",
                 style="NoBorder.TButton",
-                command=lambda: self.delete_vehicle(vehicle_id),
+                command=lambda: self.delete_vehicle(row.vehicle_id),
                 takefocus=0,
             )
             delete_button.pack(side=LEFT, padx=5)
@@ -368,9 +576,17 @@ class ResultsPage:
         self.update_results()
 
     def delete_vehicle(self, vehicle_id):
-        try:
-            delete_vehicle(vehicle_id)
-            messagebox.showinfo("Успех", "Транспортное средство успешно удалено.")
-            self.update_results()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось удалить транспортное средство: {e}")
\ No newline at end of file
+        self.db.submit(
+            delete_vehicle, vehicle_id,
+            on_done=lambda _: self._on_vehicle_deleted(vehicle_id),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось удалить транспортное средство: {e}"),
+        )
+
+    def _on_vehicle_deleted(self, vehicle_id):
+        # Убирается одна строка; строки ниже только сдвигаются. Список обновляется до
+        # сообщения: пока оно открыто, может прийти следующая страница
+        self._selected.discard(vehicle_id)
+        vehicles = [v for v in self._vehicles if v["id"] != vehicle_id]
+        self._forget_rows(len(self._vehicles) - len(vehicles))
+        self._set_vehicles(vehicles)
+        messagebox.showinfo("Успех", "Транспортное средство успешно удалено.")
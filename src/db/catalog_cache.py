@@ -0,0 +1,71 @@
+import threading
+
+# --- Кэш справочников (общие списки работ и материалов) ---
+# Справочник загружается из БД при первом обращении и дальше отдаётся из памяти.
+# Функции записи сбрасывают кэш после завершения транзакции, поэтому чтение
+# внутри незавершённой транзакции не оставляет в кэше неподтверждённые данные.
+# Производные данные (например, уникальные единицы измерения) кэшируются
+# вместе со справочником и сбрасываются вместе с ним.
+
+class CatalogCache:
+    def __init__(self, loaders):
+        """loaders: имя справочника -> функция без аргументов, возвращающая список словарей"""
+        self._loaders = dict(loaders)
+        self._items = {}
+        self._derived = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name):
+        """Записи справочника name (кортеж словарей; изменять их нельзя)"""
+        with self._lock:
+            items = self._items.get(name)
+            if items is not None:
+                self.hits += 1
+                return items
+            self.misses += 1
+            generation = self._generation
+        items = tuple(self._loaders[name]())
+        with self._lock:
+            # Если во время загрузки кэш сбросили, загруженные данные могли устареть
+            if generation == self._generation:
+                self._items.setdefault(name, items)
+        return items
+
+    @property
+    def generation(self):
+        """Растёт при каждом сбросе: по нему видно, что построенное по кэшу устарело"""
+        return self._generation
+
+    def derived(self, name, key, build):
+        """
+        Значение build(items), вычисленное один раз для текущего содержимого справочника.
+        key различает разные производные одного справочника.
+        """
+        items = self.get(name)
+        with self._lock:
+            cached = self._derived.get((name, key))
+            if cached is not None and cached[0] is items:
+                return cached[1]
+        value = build(items)
+        with self._lock:
+            self._derived[(name, key)] = (items, value)
+        return value
+
+    def invalidate(self, name=None):
+        """Сбрасывает справочник name (или все справочники, если name не указан)"""
+        with self._lock:
+            self._generation += 1
+            if name is None:
+                self._items.clear()
+                self._derived.clear()
+                return
+            self._items.pop(name, None)
+            for key in [key for key in self._derived if key[0] == name]:
+                del self._derived[key]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# --- Настройки соединения ---
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 16 * 1024          # кэш страниц на соединение (PRAGMA cache_size в KiB)
+MMAP_SIZE = 64 * 1024 * 1024       # отображение файла БД в память
+STATEMENT_CACHE_SIZE = 256         # кэш подготовленных выражений sqlite3
+
+class ConnectionManager:
+    """
+    Долгоживущие соединения с SQLite: одно соединение на поток.
+    Соединение открывается при первом обращении из потока и живёт до close().
+    Транзакции управляются явно через transaction(); вложенные вызовы
+    используют SAVEPOINT, поэтому внешняя транзакция остаётся атомарной.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._commit_hooks = []
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # транзакциями управляем сами
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self):
+        """Соединение текущего потока (создаётся при первом обращении)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.after_callbacks = []
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Явная транзакция на соединении текущего потока.
+        Внешний уровень — BEGIN/COMMIT, вложенные — SAVEPOINT/RELEASE.
+        При исключении откатывается только свой уровень, исключение пробрасывается.
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            conn.execute("BEGIN")
+            changes = conn.total_changes
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+            if depth == 0 and conn.total_changes != changes:
+                for hook in self._commit_hooks:
+                    hook(conn)
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                try:
+                    conn.execute("ROLLBACK")
+                finally:
+                    self._run_after_callbacks()
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        else:
+            self._local.depth = depth
+            if depth == 0:
+                try:
+                    conn.execute("COMMIT")
+                finally:
+                    self._run_after_callbacks()
+            else:
+                conn.execute(f"RELEASE sp_{depth}")
+
+    def add_commit_hook(self, hook):
+        """
+        hook(conn) вызывается в конце каждой внешней транзакции, изменившей данные, —
+        внутри неё, перед COMMIT: ошибка hook откатывает всю транзакцию.
+        Повторная регистрация того же hook не дублирует вызов.
+        """
+        if hook not in self._commit_hooks:
+            self._commit_hooks.append(hook)
+
+    def after_transaction(self, callback):
+        """
+        Вызывает callback после завершения внешней транзакции (COMMIT или ROLLBACK).
+        Вне транзакции callback вызывается сразу. Повторная регистрация того же
+        callback в одной транзакции не дублирует вызов.
+        """
+        if not self.in_transaction():
+            callback()
+            return
+        callbacks = self._local.after_callbacks
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def _run_after_callbacks(self):
+        callbacks, self._local.after_callbacks = self._local.after_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def in_transaction(self):
+        return getattr(self._local, "depth", 0) > 0
+
+    def close_current(self):
+        """Закрывает соединение текущего потока (рабочий поток — перед завершением)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        self._local.conn = None
+        conn.close()
+
+    def close(self):
+        """Закрывает соединения всех потоков (при выходе из приложения)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+# --- Бенчмарк: python -m src.db.connection ---
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    def _prepare(path):
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE IF NOT EXISTS works (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, unit TEXT, price TEXT)")
+        conn.executemany(
+            "INSERT INTO works (name, unit, price) VALUES (?, ?, ?)",
+            [(f"Работа {i}", "шт.", str(i)) for i in range(200)],
+        )
+        conn.commit()
+        conn.close()
+
+    def _per_call(path, n):
+        # Поведение прежнего with_connection: connect/commit/close на каждый вызов
+        for i in range(n):
+            conn = sqlite3.connect(path)
+            conn.execute("SELECT id, name, unit, price FROM works").fetchall()
+            conn.execute("UPDATE works SET price = ? WHERE id = ?", (str(i), 1 + i % 200))
+            conn.commit()
+            conn.close()
+
+    def _managed(manager, n):
+        for i in range(n):
+            with manager.transaction() as conn:
+                conn.execute("SELECT id, name, unit, price FROM works").fetchall()
+                conn.execute("UPDATE works SET price = ? WHERE id = ?", (str(i), 1 + i % 200))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        n = 2000
+        old_path = os.path.join(tmp, "old.db")
+        new_path = os.path.join(tmp, "new.db")
+        _prepare(old_path)
+        _prepare(new_path)
+
+        start = time.perf_counter()
+        _per_call(old_path, n)
+        old_rate = n / (time.perf_counter() - start)
+
+        manager = ConnectionManager(new_path)
+        start = time.perf_counter()
+        _managed(manager, n)
+        new_rate = n / (time.perf_counter() - start)
+        manager.close()
+
+        print(f"connect/close на вызов: {old_rate:10.0f} вызовов/с")
+        print(f"ConnectionManager:      {new_rate:10.0f} вызовов/с")
+        print(f"ускорение:              {new_rate / old_rate:10.1f}x")
@@ -1,18 +1,21 @@
 import sqlite3
 import os
 import sys
-from datetime import datetime
+import hashlib
+import json
+from datetime import datetime, timedelta
 from functools import wraps
-
-# --- Константы для диапазонов ID ---
-VEHICLE_ID_MIN = 1
-VEHICLE_ID_MAX = 9999
-MATERIALS_AND_WORKS_ID_MIN = 10000
-MATERIALS_AND_WORKS_ID_MAX = 19999
-MATERIAL_ID_MIN = 20000
-MATERIAL_ID_MAX = 29999
-WORK_ID_MIN = 30000
-WORK_ID_MAX = 39999
+from src.db.connection import ConnectionManager
+from src.db.catalog_cache import CatalogCache
+from src.db.ids import allocate_ids
+from src.db.search import (
+    ORDER_FTS_WEIGHTS, vehicle_search_key, normalize_search, normalize_vehicle_type, fts_match_query,
+    lines_text_sql
+)
+from src.db.money import (
+    LINE_AMOUNT_SQL, parse_money, parse_quantity, format_money, format_quantity
+)
+from src.db.migrations import apply_migrations, record_schema_version
 
 # --- Вспомогательные функции для путей ---
 def get_persistent_db_path():
@@ -38,23 +41,31 @@ if not os.path.exists(DB_PATH):
         with open(default_db_path, "rb") as src, open(DB_PATH, "wb") as dst:
             dst.write(src.read())
 
-# --- Декоратор для автоматического открытия/закрытия соединения ---
+# --- Менеджер соединений: одно долгоживущее соединение на поток ---
+_manager = ConnectionManager(DB_PATH)
+
+def transaction():
+    """Явная транзакция: все вызовы CRUD внутри неё атомарны"""
+    return _manager.transaction()
+
+def close_connections():
+    _manager.close()
+
+def close_thread_connection():
+    """Закрывает соединение текущего потока (соединение SQLite нельзя закрыть из другого потока)"""
+    _manager.close_current()
+
+# --- Декоратор: выполняет функцию в транзакции на соединении потока ---
 def with_connection(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect(DB_PATH)
-        try:
-            result = fn(conn, *args, **kwargs)
-            conn.commit()
-            return result
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with _manager.transaction() as conn:
+            return fn(conn, *args, **kwargs)
     return wrapper
 
-# --- Полная функция инициализации и миграции таблиц ---
+# --- Инициализация и миграция таблиц ---
+BASE_SCHEMA_VERSION = 2  # Базовая схема; дальнейшие изменения — в src/db/migrations.py
+
 @with_connection
 def init_db(conn):
     cursor = conn.cursor()
@@ -72,12 +83,20 @@ def init_db(conn):
     cursor.execute("SELECT version FROM schema_version ORDER BY version DESC LIMIT 1")
     row = cursor.fetchone()
     current_version = row[0] if row else 0
-    latest_version = 2  # Обновляйте при изменениях
 
-    # Если версия актуальна — ничего не делаем
-    if current_version >= latest_version:
-        return
+    if current_version < BASE_SCHEMA_VERSION:
+        _create_base_schema(cursor)
+        record_schema_version(cursor, BASE_SCHEMA_VERSION)
+        current_version = BASE_SCHEMA_VERSION
+
+    # Версионные миграции поверх базовой схемы
+    apply_migrations(cursor, current_version)
+
+    # Текст строк заказов в orders_fts обновляется перед COMMIT каждой записи (миграция 14)
+    _manager.add_commit_hook(_flush_dirty_orders)
 
+def _create_base_schema(cursor):
+    """Создание/пересборка таблиц базовой схемы и тестовые данные"""
     # --- vehicles ---
     cursor.execute("PRAGMA table_info(vehicles)")
     columns = [column[1] for column in cursor.fetchall()]
@@ -404,20 +423,92 @@ def init_db(conn):
             "INSERT INTO materials (name, unit, price) VALUES (?, ?, ?)", test_materials
         )
 
-    # --- В конце обновляем версию схемы ---
-    if current_version < latest_version:
-        cursor.execute("""
-            INSERT INTO schema_version (version, applied_at)
-            VALUES (?, ?)
-        """, (latest_version, datetime.now().strftime("%d.%m.%Y %H:%M:%S")))
-
 # =========================
 # --- VEHICLES CRUD ---
 # =========================
+VEHICLE_FIELDS = [
+    "contract_number", "date", "acceptance_date", "work_order_date", "completion_date",
+    "type", "customer", "number", "brand", "refrigerator_brand", "year", "mileage", "phone",
+    "address", "preliminary_inspection", "work_total", "work_total_with_coeff", "parts_total",
+    "equipment_delivered", "recommendations", "executor_position", "executor_name",
+    "customer_position", "customer_name",
+]
+
+# Суммы по ТС хранятся в копейках (INTEGER), в API передаются строками '1500.00'
+VEHICLE_MONEY_FIELDS = ("work_total", "work_total_with_coeff", "parts_total")
+
+def _vehicle_value(vehicle_data, field):
+    """Значение поля ТС для записи в БД: суммы — в копейках, тип — в едином написании"""
+    if field in VEHICLE_MONEY_FIELDS:
+        return parse_money(vehicle_data.get(field))
+    if field == "type":
+        return normalize_vehicle_type(vehicle_data.get(field))
+    return vehicle_data.get(field, "")
+
+def _vehicle_values(vehicle_data):
+    return tuple(_vehicle_value(vehicle_data, field) for field in VEHICLE_FIELDS)
+
+def _vehicle_from_row(row):
+    vehicle = {"id": row[0]}
+    for field, value in zip(VEHICLE_FIELDS, row[1:]):
+        vehicle[field] = format_money(value) if field in VEHICLE_MONEY_FIELDS else value
+    return vehicle
+
+def _insert_vehicle(cursor, vehicle_data):
+    cursor.execute(
+        f"""
+        INSERT INTO vehicles ({", ".join(VEHICLE_FIELDS)}, search_key)
+        VALUES ({", ".join("?" for _ in VEHICLE_FIELDS)}, ?)
+        """,
+        _vehicle_values(vehicle_data) + (vehicle_search_key(vehicle_data),),
+    )
+    return cursor.lastrowid
+
+def _update_vehicle(cursor, vehicle_data):
+    cursor.execute(
+        f"""
+        UPDATE vehicles SET {", ".join(f"{field} = ?" for field in VEHICLE_FIELDS)}, search_key = ?
+        WHERE id = ?
+        """,
+        _vehicle_values(vehicle_data) + (vehicle_search_key(vehicle_data), vehicle_data["id"]),
+    )
+
+def _insert_materials_and_works(cursor, vehicle_id, lines):
+    """
+    Пакетная вставка строк работ/материалов одним executemany.
+    lines — кортежи (material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2).
+    ID всего пакета резервируются одним обращением к последовательности.
+    """
+    if not lines:
+        return []
+    ids = list(allocate_ids(cursor, "material_and_work", len(lines)))
+    cursor.executemany(
+        "INSERT INTO materials_and_works (id, vehicle_id, material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (new_id, vehicle_id, material, work, unit, parse_quantity(quantity), parse_money(price),
+             param1, param2)
+            for new_id, (material, work, unit, quantity, price, param1, param2) in zip(ids, lines)
+        ],
+    )
+    return ids
+
+def _flush_dirty_orders(conn):
+    """
+    Перед COMMIT транзакции, изменившей данные: пересобирает текст строк (колонка lines
+    в orders_fts) заказов, отмеченных триггерами materials_and_works в orders_fts_dirty, —
+    один раз на заказ, сколько бы его строк ни изменилось
+    """
+    conn.execute(f"""
+        UPDATE orders_fts SET lines = {lines_text_sql("orders_fts.rowid")}
+        WHERE rowid IN (SELECT vehicle_id FROM orders_fts_dirty)
+    """)
+    conn.execute("DELETE FROM orders_fts_dirty")
+
 @with_connection
 def save_vehicle(conn, vehicle_data, works, materials):
     """
     Сохраняет или обновляет ТС и связанные работы/материалы по id.
+    Всё сохранение выполняется в одной транзакции: при ошибке заказ не записывается частично.
     - vehicle_data: dict с полями ТС (как в add_vehicle/update_vehicle)
     - works: список словарей работ (каждая — поля: work, unit, quantity, price_per_unit, equipment_param1, equipment_param2)
     - materials: список словарей материалов (каждая — поля: material, unit, quantity, price_per_unit)
@@ -425,215 +516,220 @@ def save_vehicle(conn, vehicle_data, works, materials):
     """
     cursor = conn.cursor()
 
-    # 1. Проверка уникальности contract_number (договора-заявки)
-    contract_number = vehicle_data.get("contract_number")
+    # 1. Добавление или обновление ТС; уникальность contract_number проверяет UNIQUE-индекс
     vehicle_id = vehicle_data.get("id")
-    cursor.execute("SELECT id FROM vehicles WHERE contract_number = ?", (contract_number,))
-    row = cursor.fetchone()
-    if row:
-        existing_id = row[0]
-        # Если редактируем — допускаем совпадение только с самим собой
-        if not vehicle_id or (vehicle_id and existing_id != vehicle_id):
-            raise Exception(f"Транспорт с номером договора-заявки {contract_number} уже существует!")
-
-    # 2. Добавление или обновление ТС
-    if vehicle_id:  # обновление
-        update_vehicle(vehicle_data)
-        saved_id = vehicle_id
-    else:           # добавление
-        saved_id = add_vehicle(vehicle_data)
-        vehicle_data["id"] = saved_id
+    try:
+        if vehicle_id:  # обновление
+            _update_vehicle(cursor, vehicle_data)
+            saved_id = vehicle_id
+        else:           # добавление
+            saved_id = _insert_vehicle(cursor, vehicle_data)
+    except sqlite3.IntegrityError as e:
+        if "contract_number" not in str(e):
+            raise
+        raise Exception(
+            f"Транспорт с номером договора-заявки {vehicle_data.get('contract_number')} уже существует!"
+        )
+
+    # 2. Удалить старые работы/материалы для этого ТС
+    cursor.execute("DELETE FROM materials_and_works WHERE vehicle_id = ?", (saved_id,))
 
-    # 3. Удалить старые работы/материалы для этого ТС
-    delete_materials_and_works(saved_id)
+    # 3. Сохранить новые работы и материалы одним пакетом
+    lines = [_line_values(w, True) for w in works] + [_line_values(m, False) for m in materials]
+    _insert_materials_and_works(cursor, saved_id, lines)
 
-    # 4. Сохранить новые работы
-    for w in works:
-        add_material_and_work(
-            saved_id,
+    if not vehicle_id:
+        vehicle_data["id"] = saved_id
+    return saved_id
+
+def _line_values(line, is_work=None):
+    """
+    Словарь работы (ключ work) или материала (ключ material) -> кортеж для _insert_materials_and_works.
+    Без is_work вид строки определяется по заполненному полю work.
+    """
+    if is_work is None:
+        is_work = bool(line.get("work"))
+    if is_work:
+        return (
             "",
-            w.get("work", ""),
-            w.get("unit", ""),
-            w.get("quantity", ""),
-            w.get("price_per_unit", ""),
-            w.get("equipment_param1", ""),
-            w.get("equipment_param2", "")
+            line.get("work", ""),
+            line.get("unit", ""),
+            line.get("quantity", ""),
+            line.get("price_per_unit", ""),
+            line.get("equipment_param1", ""),
+            line.get("equipment_param2", ""),
         )
+    return (
+        line.get("material", ""),
+        "",
+        line.get("unit", ""),
+        line.get("quantity", ""),
+        line.get("price_per_unit", ""),
+        "", "",
+    )
 
-    # 5. Сохранить новые материалы
-    for m in materials:
-        add_material_and_work(
-            saved_id,
-            m.get("material", ""),
-            "",
-            m.get("unit", ""),
-            m.get("quantity", ""),
-            m.get("price_per_unit", ""),
-            "", ""
+@with_connection
+def save_vehicle_changes(conn, vehicle_data, changed_fields=(), lines=(), deleted_line_ids=()):
+    """
+    Сохранение только изменений существующего ТС в одной транзакции.
+    - vehicle_data: все поля ТС с id (нужны для ключа поиска)
+    - changed_fields: изменённые поля ТС — UPDATE затрагивает только их
+    - lines: изменённые и новые строки (словари работ/материалов); строка с id обновляется,
+      без id — вставляется
+    - deleted_line_ids: id удалённых строк
+    Id существующих строк не меняются. Возвращает список id строк в порядке lines.
+    Для нового ТС (без id) используйте save_vehicle.
+    """
+    cursor = conn.cursor()
+    vehicle_id = vehicle_data["id"]
+
+    fields = [field for field in VEHICLE_FIELDS if field in set(changed_fields)]
+    if fields:
+        values = [_vehicle_value(vehicle_data, field) for field in fields]
+        try:
+            cursor.execute(
+                f"UPDATE vehicles SET {', '.join(f'{field} = ?' for field in fields)}, search_key = ? WHERE id = ?",
+                values + [vehicle_search_key(vehicle_data), vehicle_id],
+            )
+        except sqlite3.IntegrityError as e:
+            if "contract_number" not in str(e):
+                raise
+            raise Exception(
+                f"Транспорт с номером договора-заявки {vehicle_data.get('contract_number')} уже существует!"
+            )
+
+    if deleted_line_ids:
+        cursor.executemany(
+            "DELETE FROM materials_and_works WHERE id = ? AND vehicle_id = ?",
+            [(line_id, vehicle_id) for line_id in deleted_line_ids],
         )
-    return saved_id
+
+    updated = [line for line in lines if line.get("id")]
+    if updated:
+        cursor.executemany(
+            """
+            UPDATE materials_and_works
+            SET material = ?, work = ?, unit = ?, quantity = ?, price_per_unit = ?,
+                equipment_param1 = ?, equipment_param2 = ?
+            WHERE id = ? AND vehicle_id = ?
+            """,
+            [
+                (material, work, unit, parse_quantity(quantity), parse_money(price), param1, param2,
+                 line["id"], vehicle_id)
+                for line in updated
+                for material, work, unit, quantity, price, param1, param2 in (_line_values(line),)
+            ],
+        )
+
+    inserted = [line for line in lines if not line.get("id")]
+    new_ids = iter(_insert_materials_and_works(cursor, vehicle_id, [_line_values(line) for line in inserted]))
+    return [line.get("id") or next(new_ids) for line in lines]
 
 @with_connection
 def add_vehicle(conn, vehicle_data):
     """Добавление нового ТС в базу данных"""
-    cursor = conn.cursor()
-    data_to_insert = (
-        vehicle_data.get("contract_number", ""),
-        vehicle_data.get("date", ""),
-        vehicle_data.get("acceptance_date", ""),
-        vehicle_data.get("work_order_date", ""),
-        vehicle_data.get("completion_date", ""),
-        vehicle_data.get("type", ""),
-        vehicle_data.get("customer", ""),
-        vehicle_data.get("number", ""),
-        vehicle_data.get("brand", ""),
-        vehicle_data.get("refrigerator_brand", ""),
-        vehicle_data.get("year", ""),
-        vehicle_data.get("mileage", ""),
-        vehicle_data.get("phone", ""),
-        vehicle_data.get("address", ""),
-        vehicle_data.get("preliminary_inspection", ""),
-        vehicle_data.get("work_total", ""),
-        vehicle_data.get("work_total_with_coeff", ""),
-        vehicle_data.get("parts_total", ""),
-        vehicle_data.get("equipment_delivered", ""),
-        vehicle_data.get("recommendations", ""),
-        vehicle_data.get("executor_position", ""),
-        vehicle_data.get("executor_name", ""),
-        vehicle_data.get("customer_position", ""),
-        vehicle_data.get("customer_name", ""),
-    )
-    cursor.execute(
-        """
-        INSERT INTO vehicles (
-            contract_number, date, acceptance_date, work_order_date, completion_date,
-            type, customer, number, brand, refrigerator_brand, year, mileage, phone,
-            address, preliminary_inspection, work_total, work_total_with_coeff, parts_total,
-            equipment_delivered, recommendations, executor_position, executor_name,
-            customer_position, customer_name
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        data_to_insert,
-    )
-    return cursor.lastrowid
+    return _insert_vehicle(conn.cursor(), vehicle_data)
 
 @with_connection
 def get_all_vehicles(conn):
     """Получение всех ТС"""
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM vehicles")
+    cursor.execute(f"SELECT id, {', '.join(VEHICLE_FIELDS)} FROM vehicles")
+    return [_vehicle_from_row(row) for row in cursor.fetchall()]
+
+# Поля строки списка ТС и допустимые сортировки для query_vehicles
+VEHICLE_LIST_FIELDS = ["id", "type", "customer", "contract_number", "number", "brand"]
+VEHICLE_SORT_COLUMNS = ("id", "customer", "contract_number")
+
+@with_connection
+def query_vehicles(conn, search="", type=None, order_by="id", limit=50, after_key=None):
+    """
+    Страница списка ТС: фильтр, поиск и сортировка выполняются в SQLite.
+    - search: подстрока (без учёта регистра) в номере заявки, заказчике, гос. номере или марке
+    - type: тип машины (без учёта регистра и пробелов по краям) или None для всех типов
+    - order_by: одна из VEHICLE_SORT_COLUMNS, по возрастанию
+    - after_key: ключ последней строки предыдущей страницы (keyset-пагинация, без OFFSET)
+    Возвращает (список ТС с полями VEHICLE_LIST_FIELDS, ключ следующей страницы или None).
+    """
+    if order_by not in VEHICLE_SORT_COLUMNS:
+        raise ValueError(f"Недопустимая сортировка: {order_by}")
+    conditions = []
+    params = []
+    type = normalize_vehicle_type(type)
+    if type:
+        conditions.append("type = ?")
+        params.append(type)
+    search = normalize_search(search)
+    if search:
+        conditions.append("instr(search_key, ?) > 0")
+        params.append(search)
+    if after_key is not None:
+        if order_by == "id":
+            conditions.append("id > ?")
+            params.append(after_key)
+        else:
+            conditions.append(f"({order_by}, id) > (?, ?)")
+            params.extend(after_key)
+    order = "id" if order_by == "id" else f"{order_by}, id"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT {', '.join(VEHICLE_LIST_FIELDS)} FROM vehicles {where} ORDER BY {order} LIMIT ?",
+        params + [limit + 1],
+    )
     rows = cursor.fetchall()
-    return [
-        {
-            "id": row[0],
-            "contract_number": row[1],
-            "date": row[2],
-            "acceptance_date": row[3],
-            "work_order_date": row[4],
-            "completion_date": row[5],
-            "type": row[6],
-            "customer": row[7],
-            "number": row[8],
-            "brand": row[9],
-            "refrigerator_brand": row[10],
-            "year": row[11],
-            "mileage": row[12],
-            "phone": row[13],
-            "address": row[14],
-            "preliminary_inspection": row[15],
-            "work_total": row[16],
-            "work_total_with_coeff": row[17],
-            "parts_total": row[18],
-            "equipment_delivered": row[19],
-            "recommendations": row[20],
-            "executor_position": row[21],
-            "executor_name": row[22],
-            "customer_position": row[23],
-            "customer_name": row[24],
-        }
-        for row in rows
-    ]
+    vehicles = [dict(zip(VEHICLE_LIST_FIELDS, row)) for row in rows[:limit]]
+    next_key = None
+    if len(rows) > limit:
+        last = vehicles[-1]
+        next_key = last["id"] if order_by == "id" else (last[order_by], last["id"])
+    return vehicles, next_key
+
+@with_connection
+def search_orders(conn, query, limit=50, type=None, offset=0):
+    """
+    Полнотекстовый поиск заказов (FTS5) по карточке ТС, адресу, телефону, осмотру,
+    рекомендациям и тексту работ/материалов. Каждое слово запроса ищется как префикс.
+    Результаты упорядочены по релевантности (bm25); поля — как у query_vehicles.
+    """
+    match = fts_match_query(query)
+    if not match:
+        return []
+    params = [match]
+    type_condition = ""
+    type = normalize_vehicle_type(type)
+    if type:
+        type_condition = "AND v.type = ?"
+        params.append(type)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT {", ".join(f"v.{field}" for field in VEHICLE_LIST_FIELDS)}
+        FROM orders_fts
+        JOIN vehicles v ON v.id = orders_fts.rowid
+        WHERE orders_fts MATCH ? {type_condition}
+        ORDER BY bm25(orders_fts, {", ".join(str(w) for w in ORDER_FTS_WEIGHTS)})
+        LIMIT ? OFFSET ?
+        """,
+        params + [limit, offset],
+    )
+    return [dict(zip(VEHICLE_LIST_FIELDS, row)) for row in cursor.fetchall()]
 
 @with_connection
 def get_vehicle_by_id(conn, vehicle_id):
     """Получение данных ТС по ID"""
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM vehicles WHERE id = ?", (vehicle_id,))
+    cursor.execute(f"SELECT id, {', '.join(VEHICLE_FIELDS)} FROM vehicles WHERE id = ?", (vehicle_id,))
     row = cursor.fetchone()
     if not row:
         return None
-    return {
-        "id": row[0],
-        "contract_number": row[1],
-        "date": row[2],
-        "acceptance_date": row[3],
-        "work_order_date": row[4],
-        "completion_date": row[5],
-        "type": row[6],
-        "customer": row[7],
-        "number": row[8],
-        "brand": row[9],
-        "refrigerator_brand": row[10],
-        "year": row[11],
-        "mileage": row[12],
-        "phone": row[13],
-        "address": row[14],
-        "preliminary_inspection": row[15],
-        "work_total": row[16],
-        "work_total_with_coeff": row[17],
-        "parts_total": row[18],
-        "equipment_delivered": row[19],
-        "recommendations": row[20],
-        "executor_position": row[21],
-        "executor_name": row[22],
-        "customer_position": row[23],
-        "customer_name": row[24],
-    }
+    return _vehicle_from_row(row)
 
 @with_connection
 def update_vehicle(conn, vehicle_data):
     """Обновление данных о ТС"""
-    cursor = conn.cursor()
-    data_to_update = (
-        vehicle_data.get("contract_number", ""),
-        vehicle_data.get("date", ""),
-        vehicle_data.get("acceptance_date", ""),
-        vehicle_data.get("work_order_date", ""),
-        vehicle_data.get("completion_date", ""),
-        vehicle_data.get("type", ""),
-        vehicle_data.get("customer", ""),
-        vehicle_data.get("number", ""),
-        vehicle_data.get("brand", ""),
-        vehicle_data.get("refrigerator_brand", ""),
-        vehicle_data.get("year", ""),
-        vehicle_data.get("mileage", ""),
-        vehicle_data.get("phone", ""),
-        vehicle_data.get("address", ""),
-        vehicle_data.get("preliminary_inspection", ""),
-        vehicle_data.get("work_total", ""),
-        vehicle_data.get("work_total_with_coeff", ""),
-        vehicle_data.get("parts_total", ""),
-        vehicle_data.get("equipment_delivered", ""),
-        vehicle_data.get("recommendations", ""),
-        vehicle_data.get("executor_position", ""),
-        vehicle_data.get("executor_name", ""),
-        vehicle_data.get("customer_position", ""),
-        vehicle_data.get("customer_name", ""),
-        vehicle_data["id"],
-    )
-    cursor.execute(
-        """
-        UPDATE vehicles SET
-            contract_number = ?, date = ?, acceptance_date = ?, work_order_date = ?,
-            completion_date = ?, type = ?, customer = ?, number = ?, brand = ?,
-            refrigerator_brand = ?, year = ?, mileage = ?, phone = ?,
-            address = ?, preliminary_inspection = ?, work_total = ?, work_total_with_coeff = ?,
-            parts_total = ?, equipment_delivered = ?, recommendations = ?,
-            executor_position = ?, executor_name = ?, customer_position = ?, customer_name = ?
-        WHERE id = ?
-        """,
-        data_to_update,
-    )
+    _update_vehicle(conn.cursor(), vehicle_data)
 
 @with_connection
 def delete_vehicle(conn, vehicle_id):
@@ -642,6 +738,10 @@ def delete_vehicle(conn, vehicle_id):
     cursor.execute("DELETE FROM vehicles WHERE id = ?", (vehicle_id,))
     cursor.execute("DELETE FROM print_history WHERE vehicle_id = ?", (vehicle_id,))
     cursor.execute("DELETE FROM materials_and_works WHERE vehicle_id = ?", (vehicle_id,))
+    cursor.execute(
+        "UPDATE print_jobs SET status = 'cancelled', updated_at = ? WHERE vehicle_id = ? AND status = 'queued'",
+        (_now_iso(), vehicle_id),
+    )
 
 # =========================
 # --- WORKS CRUD ---
@@ -650,20 +750,15 @@ def delete_vehicle(conn, vehicle_id):
 def add_work(conn, name, unit="шт.", price="0"):
     """Добавление новой работы в общий список с ID, начиная с 30000"""
     cursor = conn.cursor()
-    cursor.execute("SELECT MAX(id) FROM works")
-    max_id = cursor.fetchone()[0]
-    if max_id is None or max_id < WORK_ID_MIN:
-        new_id = WORK_ID_MIN
-    else:
-        new_id = max_id + 1
+    new_id = allocate_ids(cursor, "work")[0]
     cursor.execute(
         "INSERT INTO works (id, name, unit, price) VALUES (?, ?, ?, ?)",
         (new_id, name, unit, price),
     )
+    _invalidate_catalog("works")
 
 @with_connection
-def get_works(conn):
-    """Получение всех работ из общего списка"""
+def _load_works(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, unit, price FROM works")
     rows = cursor.fetchall()
@@ -672,11 +767,16 @@ def get_works(conn):
         for row in rows
     ]
 
+def get_works():
+    """Получение всех работ из общего списка (копии записей из кэша справочников)"""
+    return [dict(item) for item in _catalog.get("works")]
+
 @with_connection
 def delete_work(conn, work_id):
     """Удаление работы из общего списка"""
     cursor = conn.cursor()
     cursor.execute("DELETE FROM works WHERE id = ?", (work_id,))
+    _invalidate_catalog("works")
 
 # =========================
 # --- MATERIALS CRUD ---
@@ -685,20 +785,15 @@ def delete_work(conn, work_id):
 def add_material(conn, name, unit="шт.", price="0"):
     """Добавление нового материала в общий список с ID, начиная с 20000"""
     cursor = conn.cursor()
-    cursor.execute("SELECT MAX(id) FROM materials")
-    max_id = cursor.fetchone()[0]
-    if max_id is None or max_id < MATERIAL_ID_MIN:
-        new_id = MATERIAL_ID_MIN
-    else:
-        new_id = max_id + 1
+    new_id = allocate_ids(cursor, "material")[0]
     cursor.execute(
         "INSERT INTO materials (id, name, unit, price) VALUES (?, ?, ?, ?)",
         (new_id, name, unit, price),
     )
+    _invalidate_catalog("materials")
 
 @with_connection
-def get_materials(conn):
-    """Получение всех материалов из общего списка"""
+def _load_materials(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, unit, price FROM materials")
     rows = cursor.fetchall()
@@ -707,11 +802,74 @@ def get_materials(conn):
         for row in rows
     ]
 
+def get_materials():
+    """Получение всех материалов из общего списка (копии записей из кэша справочников)"""
+    return [dict(item) for item in _catalog.get("materials")]
+
 @with_connection
 def delete_material(conn, material_id):
     """Удаление материала из общего списка"""
     cursor = conn.cursor()
     cursor.execute("DELETE FROM materials WHERE id = ?", (material_id,))
+    _invalidate_catalog("materials")
+
+# =========================
+# --- КЭШ СПРАВОЧНИКОВ ---
+# =========================
+_catalog = CatalogCache({"works": _load_works, "materials": _load_materials})
+
+def _invalidate_works():
+    _catalog.invalidate("works")
+
+def _invalidate_materials():
+    _catalog.invalidate("materials")
+
+_CATALOG_INVALIDATORS = {"works": _invalidate_works, "materials": _invalidate_materials}
+
+def _invalidate_catalog(name):
+    """
+    Сброс справочника после записи: сразу (чтобы чтение в этой же транзакции увидело
+    изменения) и ещё раз после COMMIT/ROLLBACK (чтобы в кэше не осталось
+    неподтверждённых или откатанных данных).
+    """
+    invalidate = _CATALOG_INVALIDATORS[name]
+    invalidate()
+    _manager.after_transaction(invalidate)
+
+def invalidate_catalog():
+    """Полный сброс кэша справочников (например, после внешнего изменения БД)"""
+    _catalog.invalidate()
+
+def get_catalog_generation():
+    """Номер сброса кэша справочников (без обращения к БД)"""
+    return _catalog.generation
+
+def get_catalog_stats():
+    """Счётчики кэша справочников: {"hits": ..., "misses": ...}"""
+    return _catalog.stats()
+
+def find_catalog_item(name, item_name):
+    """Запись справочника по точному названию (копия словаря из кэша) или None"""
+    by_name = _catalog.derived(
+        name,
+        ("by_name",),
+        lambda items: {item["name"]: item for item in reversed(items)},
+    )
+    item = by_name.get(item_name)
+    return dict(item) if item is not None else None
+
+def get_catalog_field_values(name, field):
+    """
+    Отсортированные уникальные непустые значения поля справочника ('' — первым).
+    Кортеж из кэша: пока справочник не менялся, возвращается тот же объект.
+    """
+    return _catalog.derived(
+        name,
+        ("field_values", field),
+        lambda items: tuple(sorted(
+            {str(item.get(field, "")).strip() for item in items if item.get(field, "")} | {""}
+        )),
+    )
 
 # =========================
 # --- MATERIALS_AND_WORKS CRUD ---
@@ -728,53 +886,157 @@ def add_material_and_work(
     equipment_param1="",
     equipment_param2="",
 ):
-    """Добавление материала или работы, связанных с ТС (ID в диапазоне 10000-19999)"""
-    cursor = conn.cursor()
-    cursor.execute("SELECT MAX(id) FROM materials_and_works")
-    max_id = cursor.fetchone()[0]
-    if max_id is None or max_id < MATERIALS_AND_WORKS_ID_MIN:
-        new_id = MATERIALS_AND_WORKS_ID_MIN
-    elif max_id >= MATERIALS_AND_WORKS_ID_MAX:
-        raise Exception("Превышен лимит ID для materials_and_works!")
-    else:
-        new_id = max_id + 1
-    cursor.execute(
-        "INSERT INTO materials_and_works (id, vehicle_id, material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            new_id,
-            vehicle_id,
-            material,
-            work,
-            unit,
-            quantity,
-            price_per_unit,
-            equipment_param1,
-            equipment_param2,
-        ),
+    """Добавление материала или работы, связанных с ТС (ID начиная с 10000)"""
+    _insert_materials_and_works(
+        conn.cursor(),
+        vehicle_id,
+        [(material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2)],
     )
 
+LINE_SELECT_FIELDS = "id, material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2"
+
+def _line_from_row(row):
+    return {
+        "id": row[0],
+        "material": row[1],
+        "work": row[2],
+        "unit": row[3],
+        "quantity": format_quantity(row[4]),
+        "price_per_unit": format_money(row[5]),
+        "equipment_param1": row[6],
+        "equipment_param2": row[7],
+    }
+
 @with_connection
 def get_materials_and_works(conn, vehicle_id):
     """Получение материалов и работ для ТС"""
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT id, material, work, unit, quantity, price_per_unit, equipment_param1, equipment_param2 FROM materials_and_works WHERE vehicle_id = ?",
+        f"SELECT {LINE_SELECT_FIELDS} FROM materials_and_works WHERE vehicle_id = ?",
         (vehicle_id,),
     )
-    rows = cursor.fetchall()
-    return [
-        {
-            "id": row[0],
-            "material": row[1],
-            "work": row[2],
-            "unit": row[3],
-            "quantity": row[4],
-            "price_per_unit": row[5],
-            "equipment_param1": row[6],
-            "equipment_param2": row[7],
-        }
-        for row in rows
-    ]
+    return [_line_from_row(row) for row in cursor.fetchall()]
+
+@with_connection
+def load_order(conn, vehicle_id):
+    """Карточка ТС и строки заказа одним согласованным чтением: (vehicle, materials_and_works)"""
+    vehicle = get_vehicle_by_id(vehicle_id)
+    if not vehicle:
+        return None, []
+    return vehicle, get_materials_and_works(vehicle_id)
+
+# Не больше стольких параметров в одном IN (...) — ниже лимита переменных SQLite
+ORDERS_CHUNK_SIZE = 500
+
+# Дата ТС хранится как 'ДД.ММ.ГГГГ'; для сравнения диапазоном переводится в 'ГГГГ-ММ-ДД'
+VEHICLE_ISO_DATE_SQL = "substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)"
+
+@with_connection
+def load_orders(conn, vehicle_ids=None, date_from=None, date_to=None):
+    """
+    Заказы для пакетной печати: [(vehicle, materials_and_works)] в порядке id.
+    vehicle_ids — выбранные ТС; иначе date_from/date_to — границы даты заказа
+    включительно ('ДД.ММ.ГГГГ' или date). Строки всех ТС читаются пачками, а не по одному ТС.
+    """
+    cursor = conn.cursor()
+    vehicles = []
+    if vehicle_ids is not None:
+        vehicle_ids = list(vehicle_ids)
+        for start in range(0, len(vehicle_ids), ORDERS_CHUNK_SIZE):
+            chunk = vehicle_ids[start:start + ORDERS_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT id, {', '.join(VEHICLE_FIELDS)} FROM vehicles "
+                f"WHERE id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            )
+            vehicles.extend(_vehicle_from_row(row) for row in cursor.fetchall())
+        vehicles.sort(key=lambda vehicle: vehicle["id"])
+    else:
+        conditions = []
+        params = []
+        iso_from = _iso_date(date_from)
+        iso_to = _iso_date(date_to)
+        if iso_from:
+            conditions.append(f"{VEHICLE_ISO_DATE_SQL} >= ?")
+            params.append(iso_from)
+        if iso_to:
+            conditions.append(f"{VEHICLE_ISO_DATE_SQL} <= ?")
+            params.append(iso_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(
+            f"SELECT id, {', '.join(VEHICLE_FIELDS)} FROM vehicles {where} ORDER BY id", params
+        )
+        vehicles = [_vehicle_from_row(row) for row in cursor.fetchall()]
+
+    lines = {vehicle["id"]: [] for vehicle in vehicles}
+    ids = list(lines)
+    for start in range(0, len(ids), ORDERS_CHUNK_SIZE):
+        chunk = ids[start:start + ORDERS_CHUNK_SIZE]
+        cursor.execute(
+            f"SELECT vehicle_id, {LINE_SELECT_FIELDS} FROM materials_and_works "
+            f"WHERE vehicle_id IN ({', '.join('?' for _ in chunk)}) ORDER BY vehicle_id, id",
+            chunk,
+        )
+        for row in cursor.fetchall():
+            lines[row[0]].append(_line_from_row(row[1:]))
+    return [(vehicle, lines[vehicle["id"]]) for vehicle in vehicles]
+
+@with_connection
+def get_order_totals(conn, vehicle_id):
+    """
+    Итоги заказа, посчитанные в SQLite: {"work_total": копейки, "parts_total": копейки}.
+    Сумма строки — LINE_AMOUNT_SQL, та же формула, что в money.line_amount.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT
+            COALESCE(SUM(CASE WHEN COALESCE(work, '') != '' THEN {LINE_AMOUNT_SQL} END), 0),
+            COALESCE(SUM(CASE WHEN COALESCE(work, '') = '' AND COALESCE(material, '') != '' THEN {LINE_AMOUNT_SQL} END), 0)
+        FROM materials_and_works
+        WHERE vehicle_id = ?
+        """,
+        (vehicle_id,),
+    )
+    work_total, parts_total = cursor.fetchone()
+    return {"work_total": work_total, "parts_total": parts_total}
+
+@with_connection
+def get_orders_totals(conn):
+    """
+    Итоги по всем заказам одним запросом с GROUP BY.
+    Возвращает dict: vehicle_id -> {"work_total": копейки, "parts_total": копейки}.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT
+            vehicle_id,
+            COALESCE(SUM(CASE WHEN COALESCE(work, '') != '' THEN {LINE_AMOUNT_SQL} END), 0),
+            COALESCE(SUM(CASE WHEN COALESCE(work, '') = '' AND COALESCE(material, '') != '' THEN {LINE_AMOUNT_SQL} END), 0)
+        FROM materials_and_works
+        GROUP BY vehicle_id
+        """
+    )
+    return {
+        row[0]: {"work_total": row[1], "parts_total": row[2]}
+        for row in cursor.fetchall()
+    }
+
+@with_connection
+def get_line_usage_counts(conn):
+    """
+    Сколько раз каждое название встречается в заказах (для ранжирования подсказок).
+    Возвращает {"works": {название: число}, "materials": {название: число}}.
+    """
+    cursor = conn.cursor()
+    usage = {}
+    for name, column in (("works", "work"), ("materials", "material")):
+        cursor.execute(
+            f"SELECT {column}, COUNT(*) FROM materials_and_works WHERE {column} != '' GROUP BY {column}"
+        )
+        usage[name] = dict(cursor.fetchall())
+    return usage
 
 @with_connection
 def delete_materials_and_works(conn, vehicle_id):
@@ -793,59 +1055,310 @@ def delete_material_and_work(conn, entry_id):
 # =========================
 # --- PRINT_HISTORY CRUD ---
 # =========================
+PRINT_HISTORY_PAGE_SIZE = 100
+PRINT_HISTORY_FIELDS = [
+    "id", "vehicle_id", "date", "customer", "brand", "number", "pdf_path", "contract_number", "type",
+    "printed_at",
+]
+
+def _iso_date(value):
+    """'ДД.ММ.ГГГГ', date или datetime -> 'ГГГГ-ММ-ДД'; пустое значение -> None"""
+    if not value:
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    try:
+        return datetime.strptime(str(value).strip(), "%d.%m.%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        raise Exception(f"Некорректная дата: {value}")
+
+PRINT_HISTORY_INSERT_SQL = """
+    INSERT INTO print_history (vehicle_id, print_date, printed_at, customer, brand, number, pdf_path, search_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _print_history_values(vehicle_data, pdf_path, now):
+    return (
+        vehicle_data["id"],
+        now.strftime("%d.%m.%Y %H:%M:%S"),
+        now.strftime("%Y-%m-%d %H:%M:%S"),
+        vehicle_data.get("customer", ""),
+        vehicle_data.get("brand", ""),
+        vehicle_data.get("number", ""),
+        pdf_path,
+        vehicle_search_key(vehicle_data),
+    )
+
 @with_connection
 def add_print_history(conn, vehicle_data, pdf_path):
     """Добавление записи в историю печати"""
     cursor = conn.cursor()
-    current_date = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-    cursor.execute(
-        """
-        INSERT INTO print_history (vehicle_id, print_date, customer, brand, number, pdf_path)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            vehicle_data["id"],
-            current_date,
-            vehicle_data.get("customer", ""),
-            vehicle_data.get("brand", ""),
-            vehicle_data.get("number", ""),
-            pdf_path,
-        ),
+    cursor.execute(PRINT_HISTORY_INSERT_SQL, _print_history_values(vehicle_data, pdf_path, datetime.now()))
+
+@with_connection
+def add_print_history_batch(conn, entries):
+    """Записи пакетной печати [(vehicle_data, pdf_path)] одним executemany в одной транзакции"""
+    cursor = conn.cursor()
+    now = datetime.now()
+    cursor.executemany(
+        PRINT_HISTORY_INSERT_SQL,
+        [_print_history_values(vehicle_data, pdf_path, now) for vehicle_data, pdf_path in entries],
     )
 
 @with_connection
-def get_print_history(conn):
-    """Получение истории печати с данными о ТС"""
+def get_print_history(conn, limit=None, after_key=None, date_from=None, date_to=None, search=""):
+    """
+    История печати с данными о ТС, новые записи первыми.
+    limit — размер страницы (None — вся история); after_key — ключ (printed_at, id)
+    последней записи предыдущей страницы (keyset-пагинация: удаление записей и новая
+    печать не сдвигают следующие страницы); date_from/date_to — границы по дате печати
+    включительно ('ДД.ММ.ГГГГ' или date); search — подстрока номера договора,
+    заказчика, гос. номера или марки без учёта регистра.
+    """
+    conditions = []
+    params = []
+    iso_from = _iso_date(date_from)
+    iso_to = _iso_date(date_to)
+    if iso_from:
+        conditions.append("ph.printed_at >= ?")
+        params.append(iso_from)
+    if iso_to:
+        # Включительно: всё, что раньше начала следующего дня
+        conditions.append("ph.printed_at < date(?, '+1 day')")
+        params.append(iso_to)
+    search = normalize_search(search)
+    if search:
+        conditions.append("instr(ph.search_key, ?) > 0")
+        params.append(search)
+    if after_key is not None:
+        conditions.append("(ph.printed_at, ph.id) < (?, ?)")
+        params.extend(after_key)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "LIMIT ?"
+        params.append(limit)
+    # Страница идёт по индексу idx_print_history_printed_at (printed_at, id, search_key)
+    # в порядке вывода; условия проверяются по колонкам индекса, строка таблицы и ТС
+    # читаются только для попавших в страницу записей
     cursor = conn.cursor()
     cursor.execute(
-        """
+        f"""
         SELECT ph.id, ph.vehicle_id, ph.print_date, ph.customer, ph.brand, ph.number, ph.pdf_path,
-               v.contract_number, v.type
+               v.contract_number, v.type, ph.printed_at
         FROM print_history ph
         LEFT JOIN vehicles v ON ph.vehicle_id = v.id
+        {where}
+        ORDER BY ph.printed_at DESC, ph.id DESC
+        {limit_sql}
+        """,
+        params,
+    )
+    return [dict(zip(PRINT_HISTORY_FIELDS, row)) for row in cursor.fetchall()]
+
+@with_connection
+def delete_print_history_entry(conn, entry_id):
+    """
+    Удаление записи из истории печати. Возвращает путь к PDF, если на файл больше
+    не ссылается ни одна запись (его можно удалить), иначе None — файл из кэша
+    отчётов нужен другим записям.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT pdf_path FROM print_history WHERE id = ?", (entry_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    cursor.execute("DELETE FROM print_history WHERE id = ?", (entry_id,))
+    if not row[0]:
+        return None
+    cursor.execute("SELECT 1 FROM print_history WHERE pdf_path = ? LIMIT 1", (row[0],))
+    return None if cursor.fetchone() else row[0]
+
+@with_connection
+def forget_report_files(conn, pdf_paths):
+    """Файлы отчётов удалены из кэша: ссылки на них в истории печати очищаются (pdf_path NULL)"""
+    conn.cursor().executemany(
+        "UPDATE print_history SET pdf_path = NULL WHERE pdf_path = ?", [(path,) for path in pdf_paths]
+    )
+
+# =========================
+# --- PRINT_JOBS (очередь печати) ---
+# =========================
+# Статусы: queued — ждёт (или ждёт повтора после ошибки), running — передано на формирование,
+# done — файл готов и записан в историю, failed — попытки исчерпаны, cancelled — отменено.
+PRINT_JOB_MAX_ATTEMPTS = 3
+PRINT_JOB_RETRY_SECONDS = 30      # пауза перед повтором; растёт с номером попытки
+PRINT_JOB_KEEP_DAYS = 30          # завершённые задания старше удаляются при запуске
+
+def _now_iso(delta_seconds=0):
+    return (datetime.now() + timedelta(seconds=delta_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+def order_content_hash(vehicle_data, materials_and_works):
+    """Версия содержимого заказа: хэш полей ТС и строк (без id строк)"""
+    lines = [
+        {key: value for key, value in line.items() if key != "id"}
+        for line in materials_and_works
+    ]
+    payload = json.dumps([vehicle_data, lines], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _enqueue_print_job(cursor, vehicle_data, materials_and_works, now):
+    """(id задания, True — совпало с уже активным заданием на ту же версию заказа)"""
+    content_hash = order_content_hash(vehicle_data, materials_and_works)
+    cursor.execute(
+        "SELECT id FROM print_jobs WHERE vehicle_id = ? AND content_hash = ? AND status IN ('queued', 'running')",
+        (vehicle_data["id"], content_hash),
+    )
+    row = cursor.fetchone()
+    if row:
+        return row[0], True
+    cursor.execute(
         """
+        INSERT INTO print_jobs (vehicle_id, content_hash, status, next_attempt_at, created_at, updated_at)
+        VALUES (?, ?, 'queued', ?, ?, ?)
+        """,
+        (vehicle_data["id"], content_hash, now, now, now),
     )
-    rows = cursor.fetchall()
+    return cursor.lastrowid, False
+
+@with_connection
+def enqueue_print_job(conn, vehicle_id):
+    """
+    Ставит заказ в очередь печати. Возвращает (id задания, coalesced); coalesced — такое же
+    задание уже ждёт или выполняется. Для несуществующего ТС — (None, False).
+    """
+    vehicle, lines = load_order(vehicle_id)
+    if not vehicle:
+        return None, False
+    return _enqueue_print_job(conn.cursor(), vehicle, lines, _now_iso())
+
+@with_connection
+def enqueue_print_jobs(conn, vehicle_ids=None, date_from=None, date_to=None):
+    """
+    Пакетная постановка в очередь (отбор как у load_orders). Возвращает [(id задания, coalesced)];
+    coalesced — заказ уже ждал или выполнялся, вернулся id существующего задания.
+    """
+    cursor = conn.cursor()
+    now = _now_iso()
     return [
-        {
-            "id": row[0],
-            "vehicle_id": row[1],
-            "date": row[2],
-            "customer": row[3],
-            "brand": row[4],
-            "number": row[5],
-            "pdf_path": row[6],
-            "contract_number": row[7],
-            "type": row[8],
-        }
-        for row in rows
+        _enqueue_print_job(cursor, vehicle, lines, now)
+        for vehicle, lines in load_orders(vehicle_ids, date_from, date_to)
     ]
 
 @with_connection
-def delete_print_history_entry(conn, entry_id):
-    """Удаление записи из истории печати"""
+def claim_print_jobs(conn, limit):
+    """
+    Забирает до limit готовых к выполнению заданий (running, попытка +1).
+    Возвращает [(id задания, vehicle, materials_and_works)] с текущими данными заказа;
+    задания удалённых ТС сразу помечаются failed.
+    """
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM print_history WHERE id = ?", (entry_id,))
+    now = _now_iso()
+    cursor.execute(
+        """
+        SELECT id, vehicle_id FROM print_jobs
+        WHERE status = 'queued' AND next_attempt_at <= ?
+        ORDER BY next_attempt_at, id LIMIT ?
+        """,
+        (now, limit),
+    )
+    jobs = cursor.fetchall()
+    if not jobs:
+        return []
+    orders = {vehicle["id"]: (vehicle, lines) for vehicle, lines in load_orders([vehicle_id for _, vehicle_id in jobs])}
+    claimed = []
+    for job_id, vehicle_id in jobs:
+        if vehicle_id not in orders:
+            cursor.execute(
+                "UPDATE print_jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                ("Транспортное средство удалено", now, job_id),
+            )
+            continue
+        cursor.execute(
+            "UPDATE print_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (now, job_id),
+        )
+        claimed.append((job_id, *orders[vehicle_id]))
+    return claimed
+
+@with_connection
+def complete_print_jobs(conn, results):
+    """
+    Фиксирует готовые файлы [(id задания, vehicle, pdf_path)]: задания — done, записи
+    истории печати добавляются одним executemany в той же транзакции.
+    """
+    cursor = conn.cursor()
+    now = datetime.now()
+    cursor.executemany(
+        "UPDATE print_jobs SET status = 'done', pdf_path = ?, error = NULL, updated_at = ? WHERE id = ?",
+        [(pdf_path, now.strftime("%Y-%m-%d %H:%M:%S"), job_id) for job_id, _, pdf_path in results],
+    )
+    cursor.executemany(
+        PRINT_HISTORY_INSERT_SQL,
+        [_print_history_values(vehicle, pdf_path, now) for _, vehicle, pdf_path in results],
+    )
+
+@with_connection
+def fail_print_job(conn, job_id, error):
+    """Ошибка формирования: повтор позже или failed после последней попытки. Возвращает статус"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT attempts FROM print_jobs WHERE id = ?", (job_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    status = "queued" if row[0] < PRINT_JOB_MAX_ATTEMPTS else "failed"
+    cursor.execute(
+        "UPDATE print_jobs SET status = ?, error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+        (status, str(error), _now_iso(PRINT_JOB_RETRY_SECONDS * row[0]), _now_iso(), job_id),
+    )
+    return status
+
+@with_connection
+def cancel_print_jobs(conn, job_ids=None):
+    """
+    Отменяет все ожидающие задания; возвращает их id. job_ids — отменить только эти
+    задания (ожидающие или формируемые — формирование которых прервано отменой)
+    """
+    cursor = conn.cursor()
+    if job_ids is not None:
+        cursor.executemany(
+            "UPDATE print_jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            [(_now_iso(), job_id) for job_id in job_ids],
+        )
+        return list(job_ids)
+    cursor.execute("SELECT id FROM print_jobs WHERE status = 'queued'")
+    job_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "UPDATE print_jobs SET status = 'cancelled', updated_at = ? WHERE status = 'queued'", (_now_iso(),)
+    )
+    return job_ids
+
+@with_connection
+def recover_print_jobs(conn):
+    """
+    При запуске: задания, прерванные закрытием программы (running), снова ставятся
+    в очередь; старые завершённые удаляются. Возвращает число ожидающих заданий.
+    """
+    cursor = conn.cursor()
+    now = _now_iso()
+    cursor.execute(
+        "UPDATE print_jobs SET status = 'queued', next_attempt_at = ?, updated_at = ? WHERE status = 'running'",
+        (now, now),
+    )
+    cursor.execute(
+        "DELETE FROM print_jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?",
+        (_now_iso(-PRINT_JOB_KEEP_DAYS * 24 * 3600),),
+    )
+    cursor.execute("SELECT COUNT(*) FROM print_jobs WHERE status = 'queued'")
+    return cursor.fetchone()[0]
+
+@with_connection
+def get_print_queue_state(conn):
+    """{"queued": ожидающих, "next_attempt_at": ближайший повтор (ISO) или None}"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*), MIN(next_attempt_at) FROM print_jobs WHERE status = 'queued'")
+    count, next_attempt_at = cursor.fetchone()
+    return {"queued": count, "next_attempt_at": next_attempt_at}
 
 # --- Для ручного запуска инициализации ---
 if __name__ == "__main__":
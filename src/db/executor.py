@@ -0,0 +1,168 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Фоновое выполнение запросов к БД ---
+# Все обращения страниц к БД выполняются в одном рабочем потоке со своим соединением
+# (ConnectionManager открывает соединение на поток), поэтому медленный диск, антивирус
+# или занятая другим процессом БД не останавливают цикл событий Tk.
+# Один поток сохраняет порядок операций: запись, отправленная раньше чтения, будет
+# выполнена раньше него.
+# Результаты возвращаются в главный поток опросом очереди через root.after; обработчики
+# on_done/on_error вызываются только в главном потоке и могут работать с виджетами.
+# Задачи с одинаковым key вытесняют друг друга: ещё не начатая старая задача отменяется,
+# а результат уже выполняющейся — отбрасывается (например, предыдущий поиск).
+
+POLL_MS = 15
+
+class DbExecutor:
+    def __init__(self, root, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self._finished = queue.SimpleQueue()
+        self._handlers = {}     # future -> (key, on_done, on_error)
+        self._latest = {}       # key -> последняя отправленная задача
+        self._busy_listeners = []
+        self._poll_id = None
+        self._closed = False
+
+    # ----- Отправка задач -----
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """
+        Выполняет fn(*args, **kwargs) в рабочем потоке. on_done(result) или on_error(exc)
+        вызываются в главном потоке. Без on_error ошибка передаётся в report_callback_exception.
+        Задача с key отменяет предыдущую задачу с тем же key.
+        """
+        if self._closed:
+            raise RuntimeError("DbExecutor остановлен")
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+        was_busy = self.busy
+        future = self._pool.submit(fn, *args, **kwargs)
+        self._handlers[future] = (key, on_done, on_error)
+        if key is not None:
+            self._latest[key] = future
+        # Колбэк выполняется в рабочем потоке (или сразу, если задача уже завершена) —
+        # только кладёт задачу в очередь, с Tk работает _poll
+        future.add_done_callback(self._finished.put)
+        self._schedule_poll()
+        if not was_busy:
+            self._notify_busy(True)
+        return future
+
+    # ----- Доставка результатов в главный поток -----
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                future = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(future)
+        if self._handlers:
+            self._schedule_poll()
+        else:
+            self._notify_busy(False)
+
+    def _deliver(self, future):
+        key, on_done, on_error = self._handlers.pop(future, (None, None, None))
+        superseded = key is not None and self._latest.get(key) is not future
+        if key is not None and not superseded:
+            del self._latest[key]
+        if superseded or future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if on_done is not None:
+                on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    # ----- Индикатор занятости -----
+    @property
+    def busy(self):
+        return bool(self._handlers)
+
+    def add_busy_listener(self, callback):
+        """callback(busy) — вызывается в главном потоке при начале и окончании работы"""
+        self._busy_listeners.append(callback)
+
+    def _notify_busy(self, busy):
+        for callback in self._busy_listeners:
+            callback(busy)
+
+    # ----- Завершение -----
+    def shutdown(self, finalizer=None):
+        """
+        Дожидается выполнения отправленных задач (записи не теряются) и останавливает поток.
+        finalizer выполняется последним в рабочем потоке (например, закрытие соединений).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        if finalizer is not None:
+            self._pool.submit(finalizer)
+        self._pool.shutdown(wait=True)
+
+# --- Проверка без Tk: python -m src.db.executor ---
+if __name__ == "__main__":
+    import time
+
+    class _FakeRoot:
+        """Минимальная замена root.after для проверки: очередь отложенных вызовов"""
+        def __init__(self):
+            self.calls = []
+        def after(self, ms, callback):
+            self.calls.append(callback)
+            return len(self.calls)
+        def after_cancel(self, call_id):
+            pass
+        def report_callback_exception(self, exc_type, exc, tb):
+            print("Ошибка:", exc, file=sys.stderr)
+        def run_pending(self, timeout=2.0):
+            deadline = time.monotonic() + timeout
+            while self.calls and time.monotonic() < deadline:
+                callback = self.calls.pop(0)
+                callback()
+                time.sleep(0.001)
+
+    root = _FakeRoot()
+    executor = DbExecutor(root)
+    results = []
+    busy_changes = []
+    main_thread = threading.current_thread()
+    executor.add_busy_listener(busy_changes.append)
+
+    def slow_search(text):
+        time.sleep(0.05)
+        return text
+
+    def on_result(value):
+        assert threading.current_thread() is main_thread
+        results.append(value)
+
+    # Три быстрых поиска подряд: доставлен только последний
+    for text in ("а", "ав", "авт"):
+        executor.submit(slow_search, text, on_done=on_result, key="search")
+    executor.submit(lambda: 1 / 0, on_error=lambda exc: results.append(type(exc).__name__))
+    root.run_pending()
+    assert results == ["авт", "ZeroDivisionError"], results
+    assert busy_changes == [True, False], busy_changes
+    executor.shutdown()
+    print("Проверка пройдена:", results)
@@ -0,0 +1,46 @@
+# --- Выделение ID через таблицу последовательностей ---
+# Каждый вид записей (kind) имеет свою строку в id_sequences с next_id.
+# Выделение — один атомарный UPDATE по первичному ключу: O(1) на вызов,
+# без сканирования MAX(id) и без верхней границы диапазона.
+# UPDATE берёт блокировку записи в текущей транзакции, поэтому два писателя
+# не могут получить один и тот же диапазон.
+
+# kind -> (таблица, начальный ID). Начальные значения совпадают с прежними диапазонами.
+ID_SEQUENCES = {
+    "material_and_work": ("materials_and_works", 10000),
+    "material": ("materials", 20000),
+    "work": ("works", 30000),
+}
+
+def create_id_sequences(cursor):
+    """
+    Создаёт таблицу последовательностей и заполняет её по существующим данным.
+    Следующий ID = max(начальный ID, MAX(id) + 1), существующие строки не перенумеровываются.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            kind TEXT PRIMARY KEY,
+            next_id INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    for kind, (table, start_id) in ID_SEQUENCES.items():
+        cursor.execute(f"SELECT MAX(id) FROM {table}")
+        max_id = cursor.fetchone()[0]
+        next_id = start_id if max_id is None or max_id < start_id else max_id + 1
+        cursor.execute(
+            "INSERT OR REPLACE INTO id_sequences (kind, next_id) VALUES (?, ?)",
+            (kind, next_id),
+        )
+
+def allocate_ids(cursor, kind, count=1):
+    """Резервирует count последовательных ID вида kind, возвращает range"""
+    if count <= 0:
+        return range(0)
+    cursor.execute(
+        "UPDATE id_sequences SET next_id = next_id + ? WHERE kind = ?", (count, kind)
+    )
+    if cursor.rowcount != 1:
+        raise Exception(f"Неизвестная последовательность ID: {kind}")
+    cursor.execute("SELECT next_id FROM id_sequences WHERE kind = ?", (kind,))
+    end_id = cursor.fetchone()[0]
+    return range(end_id - count, end_id)
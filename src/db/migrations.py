@@ -0,0 +1,428 @@
+from datetime import datetime
+from src.db.ids import create_id_sequences
+from src.db.money import parse_money_lenient, parse_quantity_lenient
+from src.db.search import (
+    VEHICLE_SEARCH_COLUMNS, vehicle_search_key, normalize_vehicle_type, fts_text_sql, lines_text_sql
+)
+
+# --- Версионные миграции схемы ---
+# Каждая миграция регистрируется декоратором @migration(N) и применяется ровно один раз,
+# в порядке возрастания версии, в той же транзакции, что и init_db.
+MIGRATIONS = {}
+
+def migration(version):
+    def register(fn):
+        MIGRATIONS[version] = fn
+        return fn
+    return register
+
+def record_schema_version(cursor, version):
+    cursor.execute(
+        "INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
+        (version, datetime.now().strftime("%d.%m.%Y %H:%M:%S")),
+    )
+
+def apply_migrations(cursor, current_version):
+    """Применяет все миграции с версией выше current_version"""
+    for version in sorted(MIGRATIONS):
+        if version > current_version:
+            MIGRATIONS[version](cursor)
+            record_schema_version(cursor, version)
+
+@migration(3)
+def _sequence_table(cursor):
+    """Последовательности ID вместо MAX(id) + 1 и жёстких диапазонов"""
+    create_id_sequences(cursor)
+
+@migration(4)
+def _lookup_indexes(cursor):
+    """
+    Индексы для поиска по contract_number и vehicle_id.
+    Номер договора-заявки становится UNIQUE: если в старой базе уже есть дубли,
+    к номерам более поздних записей дописывается их id, первая запись не меняется.
+    Если такой номер уже занят, дописывается ещё и порядковый номер: ' (id-2)', ...
+    """
+    cursor.execute("""
+        SELECT id, contract_number FROM vehicles
+        WHERE contract_number IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM vehicles GROUP BY contract_number)
+        ORDER BY id
+    """)
+    duplicates = cursor.fetchall()
+    if duplicates:
+        cursor.execute("SELECT contract_number FROM vehicles WHERE contract_number IS NOT NULL")
+        taken = {row[0] for row in cursor.fetchall()}
+        for vehicle_id, contract_number in duplicates:
+            new_number = f"{contract_number} ({vehicle_id})"
+            attempt = 1
+            while new_number in taken:
+                attempt += 1
+                new_number = f"{contract_number} ({vehicle_id}-{attempt})"
+            taken.add(new_number)
+            cursor.execute(
+                "UPDATE vehicles SET contract_number = ? WHERE id = ?", (new_number, vehicle_id)
+            )
+    _create_lookup_indexes(cursor)
+
+def _create_lookup_indexes(cursor):
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_vehicles_contract_number ON vehicles(contract_number)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_materials_and_works_vehicle_id ON materials_and_works(vehicle_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_print_history_vehicle_id ON print_history(vehicle_id)"
+    )
+
+@migration(5)
+def _integer_money(cursor):
+    """
+    Суммы в копейках (INTEGER) и количества в тысячных долях (INTEGER) вместо TEXT.
+    Старый текст ('1 500,50', '1500 руб.') разбирается parse_money/parse_quantity,
+    пустые и нечисловые значения становятся NULL. Непустой текст, который не удалось
+    разобрать ('2,5 кг', 'по договору'), сохраняется в legacy_money_text (таблица,
+    id строки, колонка, исходное значение).
+    """
+    conn = cursor.connection
+    conn.create_function("parse_money", 1, parse_money_lenient, deterministic=True)
+    conn.create_function("parse_quantity", 1, parse_quantity_lenient, deterministic=True)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS legacy_money_text (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (table_name, row_id, column_name)
+        )
+    """)
+    for table, column, parse in (
+        ("vehicles", "work_total", "parse_money"),
+        ("vehicles", "work_total_with_coeff", "parse_money"),
+        ("vehicles", "parts_total", "parse_money"),
+        ("materials_and_works", "quantity", "parse_quantity"),
+        ("materials_and_works", "price_per_unit", "parse_money"),
+    ):
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO legacy_money_text (table_name, row_id, column_name, value)
+            SELECT '{table}', id, '{column}', CAST({column} AS TEXT)
+            FROM {table}
+            WHERE TRIM(COALESCE({column}, '')) != '' AND {parse}({column}) IS NULL
+        """)
+
+    cursor.execute("DROP TABLE IF EXISTS vehicles_temp")
+    cursor.execute("""
+        CREATE TABLE vehicles_temp (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            contract_number TEXT,
+            date TEXT,
+            acceptance_date TEXT,
+            work_order_date TEXT,
+            completion_date TEXT,
+            type TEXT,
+            customer TEXT,
+            number TEXT,
+            brand TEXT,
+            refrigerator_brand TEXT,
+            year TEXT,
+            mileage TEXT,
+            phone TEXT,
+            address TEXT,
+            preliminary_inspection TEXT,
+            work_total INTEGER,
+            work_total_with_coeff INTEGER,
+            parts_total INTEGER,
+            equipment_delivered TEXT,
+            recommendations TEXT,
+            executor_position TEXT,
+            executor_name TEXT,
+            customer_position TEXT,
+            customer_name TEXT
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO vehicles_temp
+        SELECT id, contract_number, date, acceptance_date, work_order_date, completion_date,
+               type, customer, number, brand, refrigerator_brand, year, mileage, phone,
+               address, preliminary_inspection, parse_money(work_total),
+               parse_money(work_total_with_coeff), parse_money(parts_total),
+               equipment_delivered, recommendations, executor_position, executor_name,
+               customer_position, customer_name
+        FROM vehicles
+    """)
+    cursor.execute("DROP TABLE vehicles")
+    cursor.execute("ALTER TABLE vehicles_temp RENAME TO vehicles")
+
+    cursor.execute("DROP TABLE IF EXISTS materials_and_works_temp")
+    cursor.execute("""
+        CREATE TABLE materials_and_works_temp (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle_id INTEGER,
+            material TEXT,
+            work TEXT,
+            unit TEXT,
+            quantity INTEGER,
+            price_per_unit INTEGER,
+            equipment_param1 TEXT,
+            equipment_param2 TEXT,
+            FOREIGN KEY (vehicle_id) REFERENCES vehicles(id)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO materials_and_works_temp
+        SELECT id, vehicle_id, material, work, unit, parse_quantity(quantity),
+               parse_money(price_per_unit), equipment_param1, equipment_param2
+        FROM materials_and_works
+    """)
+    cursor.execute("DROP TABLE materials_and_works")
+    cursor.execute("ALTER TABLE materials_and_works_temp RENAME TO materials_and_works")
+
+    _create_lookup_indexes(cursor)
+
+@migration(6)
+def _vehicle_list_indexes(cursor):
+    """
+    Индексы и поисковый ключ для списка ТС с фильтром по типу и сортировкой (query_vehicles).
+    NULL в сортируемых колонках заменяются на '', чтобы ключ страницы (значение, id)
+    всегда сравнивался.
+    """
+    conn = cursor.connection
+    conn.create_function(
+        "vehicle_search_key",
+        len(VEHICLE_SEARCH_COLUMNS),
+        lambda *values: vehicle_search_key(dict(zip(VEHICLE_SEARCH_COLUMNS, values))),
+        deterministic=True,
+    )
+    cursor.execute("""
+        UPDATE vehicles SET
+            type = COALESCE(type, ''),
+            customer = COALESCE(customer, ''),
+            number = COALESCE(number, ''),
+            brand = COALESCE(brand, ''),
+            contract_number = COALESCE(contract_number, '(' || id || ')')
+        WHERE type IS NULL OR customer IS NULL OR number IS NULL
+           OR brand IS NULL OR contract_number IS NULL
+    """)
+    cursor.execute("ALTER TABLE vehicles ADD COLUMN search_key TEXT")
+    cursor.execute(
+        f"UPDATE vehicles SET search_key = vehicle_search_key({', '.join(VEHICLE_SEARCH_COLUMNS)})"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehicles_type ON vehicles(type, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehicles_customer ON vehicles(customer, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehicles_type_customer ON vehicles(type, customer, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehicles_type_contract ON vehicles(type, contract_number, id)")
+
+# Колонки orders_fts на момент миграции 7: список зафиксирован здесь, изменение
+# search.ORDER_FTS_COLUMNS требует новой миграции, а не меняет уже применённую
+ORDERS_FTS_V7_COLUMNS = (
+    "contract_number", "customer", "number", "brand", "address", "phone",
+    "preliminary_inspection", "recommendations",
+)
+
+@migration(7)
+def _orders_fts(cursor):
+    """
+    Полнотекстовый индекс заказов orders_fts (rowid = id ТС) и триггеры синхронизации.
+    Вставка строки работ дописывает её текст в документ заказа; изменение и удаление
+    пересобирают колонку lines по индексу idx_materials_and_works_vehicle_id.
+    """
+    columns = ", ".join(ORDERS_FTS_V7_COLUMNS)
+    new_values = ", ".join(fts_text_sql(f"NEW.{col}") for col in ORDERS_FTS_V7_COLUMNS)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+            {columns}, lines,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+
+    # --- vehicles ---
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_vehicles_ai AFTER INSERT ON vehicles BEGIN
+            INSERT INTO orders_fts (rowid, {columns}, lines)
+            VALUES (NEW.id, {new_values}, {lines_text_sql("NEW.id")});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_vehicles_au AFTER UPDATE ON vehicles BEGIN
+            DELETE FROM orders_fts WHERE rowid = OLD.id;
+            INSERT INTO orders_fts (rowid, {columns}, lines)
+            VALUES (NEW.id, {new_values}, {lines_text_sql("NEW.id")});
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_vehicles_ad AFTER DELETE ON vehicles BEGIN
+            DELETE FROM orders_fts WHERE rowid = OLD.id;
+        END
+    """)
+
+    # --- materials_and_works ---
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_lines_ai AFTER INSERT ON materials_and_works BEGIN
+            UPDATE orders_fts
+            SET lines = trim(COALESCE(lines, '') || ' ' || {fts_text_sql("COALESCE(NEW.work, '') || ' ' || COALESCE(NEW.material, '')")})
+            WHERE rowid = NEW.vehicle_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_lines_au AFTER UPDATE ON materials_and_works BEGIN
+            UPDATE orders_fts SET lines = {lines_text_sql("OLD.vehicle_id")} WHERE rowid = OLD.vehicle_id;
+            UPDATE orders_fts SET lines = {lines_text_sql("NEW.vehicle_id")} WHERE rowid = NEW.vehicle_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_lines_ad AFTER DELETE ON materials_and_works BEGIN
+            UPDATE orders_fts SET lines = {lines_text_sql("OLD.vehicle_id")} WHERE rowid = OLD.vehicle_id;
+        END
+    """)
+
+    # Первичное заполнение
+    cursor.execute("DELETE FROM orders_fts")
+    cursor.execute(f"""
+        INSERT INTO orders_fts (rowid, {columns}, lines)
+        SELECT v.id, {", ".join(fts_text_sql(f"v.{col}") for col in ORDERS_FTS_V7_COLUMNS)}, {lines_text_sql("v.id")}
+        FROM vehicles v
+    """)
+
+@migration(8)
+def _print_history_paging(cursor):
+    """
+    История печати: сортируемая дата printed_at (ISO 'ГГГГ-ММ-ДД ЧЧ:ММ:СС') и поисковый
+    ключ как у vehicles. Индекс (printed_at, id, search_key) покрывает выбор страницы,
+    фильтр по датам и поиск без чтения строк таблицы.
+    print_date ('ДД.ММ.ГГГГ ЧЧ:ММ:СС') остаётся для отображения.
+    """
+    conn = cursor.connection
+    conn.create_function(
+        "vehicle_search_key",
+        len(VEHICLE_SEARCH_COLUMNS),
+        lambda *values: vehicle_search_key(dict(zip(VEHICLE_SEARCH_COLUMNS, values))),
+        deterministic=True,
+    )
+    cursor.execute("ALTER TABLE print_history ADD COLUMN printed_at TEXT")
+    cursor.execute("ALTER TABLE print_history ADD COLUMN search_key TEXT")
+    cursor.execute("""
+        UPDATE print_history
+        SET printed_at = substr(print_date, 7, 4) || '-' || substr(print_date, 4, 2) || '-'
+                         || substr(print_date, 1, 2) || substr(print_date, 11)
+        WHERE print_date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]*'
+    """)
+    cursor.execute(f"""
+        UPDATE print_history
+        SET search_key = vehicle_search_key(
+            {", ".join(
+                "(SELECT contract_number FROM vehicles WHERE vehicles.id = print_history.vehicle_id)"
+                if col == "contract_number" else col
+                for col in VEHICLE_SEARCH_COLUMNS
+            )}
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_print_history_printed_at ON print_history(printed_at, id, search_key)"
+    )
+
+@migration(9)
+def _print_jobs(cursor):
+    """
+    Очередь печати: задание — ТС и хэш содержимого заказа на момент постановки.
+    Уникальный частичный индекс не даёт поставить второе активное задание на ту же
+    версию заказа (двойной щелчок); индекс (status, next_attempt_at, id) — выбор
+    следующих заданий. Задания переживают перезапуск: running при старте снова queued.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS print_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle_id INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            pdf_path TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_print_jobs_active
+        ON print_jobs(vehicle_id, content_hash) WHERE status IN ('queued', 'running')
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_print_jobs_queue ON print_jobs(status, next_attempt_at, id)"
+    )
+
+@migration(10)
+def _print_history_pdf_path(cursor):
+    """
+    Кэш PDF: одинаковые заказы печатаются в один файл, и на него ссылаются несколько
+    записей истории. Индекс по pdf_path — проверка, нужен ли файл ещё кому-то, при
+    удалении записи.
+    """
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_print_history_pdf_path ON print_history(pdf_path)"
+    )
+
+@migration(11)
+def _orders_fts_lines_once(cursor):
+    """
+    Колонка lines в orders_fts больше не поддерживается триггерами на каждую строку
+    materials_and_works: при пересохранении заказа каждая вставка/удаление заново
+    собирала текст всех строк (квадратично от числа строк). Теперь lines пересобирается
+    один раз после записи строк заказа (с миграции 14 — перед COMMIT, см. _orders_fts_dirty).
+    """
+    for trigger in ("orders_fts_lines_ai", "orders_fts_lines_au", "orders_fts_lines_ad"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+@migration(12)
+def _print_history_keyset(cursor):
+    """
+    История печати листается по ключу (printed_at, id) вместо OFFSET. Записи с датой
+    печати в старом формате получают printed_at = '' вместо NULL, чтобы ключ всегда
+    сравнивался; в порядке «новые первыми» они остаются в конце.
+    """
+    cursor.execute("UPDATE print_history SET printed_at = '' WHERE printed_at IS NULL")
+
+@migration(13)
+def _normalize_vehicle_types(cursor):
+    """
+    Фильтр по типу сравнивает значения точно (type = ?, по индексам idx_vehicles_type*),
+    а список до перехода на SQL сравнивал их без учёта регистра и пробелов по краям.
+    Тип старых записей приводится к тому же написанию, что и при сохранении ТС.
+    """
+    cursor.connection.create_function(
+        "normalize_vehicle_type", 1, normalize_vehicle_type, deterministic=True
+    )
+    cursor.execute("""
+        UPDATE vehicles SET type = normalize_vehicle_type(type)
+        WHERE type IS NOT normalize_vehicle_type(type)
+    """)
+
+@migration(14)
+def _orders_fts_dirty(cursor):
+    """
+    Синхронизация колонки lines в orders_fts снова не зависит от кода записи строк:
+    триггеры materials_and_works только отмечают заказ в orders_fts_dirty, а lines
+    пересобирается один раз на заказ перед COMMIT транзакции (database._flush_dirty_orders).
+    Пересохранение заказа с N строками по-прежнему собирает его текст один раз, а не N раз.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS orders_fts_dirty (vehicle_id INTEGER PRIMARY KEY)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_dirty_ai AFTER INSERT ON materials_and_works BEGIN
+            INSERT OR IGNORE INTO orders_fts_dirty (vehicle_id) VALUES (NEW.vehicle_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_dirty_au
+        AFTER UPDATE OF vehicle_id, work, material ON materials_and_works BEGIN
+            INSERT OR IGNORE INTO orders_fts_dirty (vehicle_id) VALUES (OLD.vehicle_id);
+            INSERT OR IGNORE INTO orders_fts_dirty (vehicle_id) VALUES (NEW.vehicle_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_dirty_ad AFTER DELETE ON materials_and_works BEGIN
+            INSERT OR IGNORE INTO orders_fts_dirty (vehicle_id) VALUES (OLD.vehicle_id);
+        END
+    """)
+    # Строки, записанные в обход ручного обновления до этой версии, — пересобрать все заказы
+    cursor.execute("INSERT OR IGNORE INTO orders_fts_dirty (vehicle_id) SELECT id FROM vehicles")
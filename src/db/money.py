@@ -0,0 +1,112 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# --- Денежные суммы и количества в целых числах ---
+# Суммы хранятся в копейках, количества — в тысячных долях единицы.
+# Сумма строки = количество × цена / 1000 с округлением до копейки.
+
+QUANTITY_SCALE = 1000
+
+# Выражение SQL для суммы строки materials_and_works (в копейках). Деление целых в SQLite
+# отбрасывает дробную часть к нулю, а line_amount округляет вниз (//): для отрицательных
+# сумм из частного вычитается 1, если остаток отрицательный
+_LINE_AMOUNT_NUMERATOR = "(quantity * price_per_unit + 500)"
+LINE_AMOUNT_SQL = (
+    f"({_LINE_AMOUNT_NUMERATOR} / 1000 - ({_LINE_AMOUNT_NUMERATOR} % 1000 < 0))"
+)
+
+_CURRENCY_SUFFIXES = ("руб.", "руб", "р.", "р", "₽")
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    text = str(value).strip().lower().replace(" ", "").replace(" ", "")
+    for suffix in _CURRENCY_SUFFIXES:
+        if text.endswith(suffix):
+            text = text[: -len(suffix)]
+            break
+    text = text.replace(",", ".")
+    if text in ("", "."):
+        return None
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Некорректное число: {value}")
+
+def parse_money(value):
+    """'1 500,5' -> 150050 (копейки); пустое значение -> None"""
+    number = _to_decimal(value)
+    if number is None:
+        return None
+    return int((number * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def parse_quantity(value):
+    """'1,5' -> 1500 (тысячные доли); пустое значение -> None"""
+    number = _to_decimal(value)
+    if number is None:
+        return None
+    return int((number * QUANTITY_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def format_money(kopecks):
+    """150050 -> '1500.50'; None -> ''"""
+    if kopecks is None:
+        return ""
+    sign = "-" if kopecks < 0 else ""
+    rubles, kop = divmod(abs(kopecks), 100)
+    return f"{sign}{rubles}.{kop:02d}"
+
+def format_quantity(milli):
+    """1500 -> '1.5', 5000 -> '5'; None -> ''"""
+    if milli is None:
+        return ""
+    sign = "-" if milli < 0 else ""
+    whole, frac = divmod(abs(milli), QUANTITY_SCALE)
+    if not frac:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{frac:03d}".rstrip("0")
+
+def line_amount(quantity_milli, price_kopecks):
+    """Сумма строки в копейках (та же формула, что LINE_AMOUNT_SQL)"""
+    if quantity_milli is None or price_kopecks is None:
+        return None
+    return (quantity_milli * price_kopecks + 500) // QUANTITY_SCALE
+
+def apply_coefficient(kopecks, coefficient):
+    """Сумма × коэффициент ('1,2') с округлением до копейки"""
+    coeff = _to_decimal(coefficient)
+    if coeff is None:
+        coeff = Decimal(1)
+    return int((Decimal(kopecks) * coeff).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def parse_money_lenient(value):
+    """Как parse_money, но нечисловой текст даёт None (для миграции старых данных)"""
+    try:
+        return parse_money(value)
+    except ValueError:
+        return None
+
+def parse_quantity_lenient(value):
+    try:
+        return parse_quantity(value)
+    except ValueError:
+        return None
+
+# --- Проверка: python -m src.db.money ---
+if __name__ == "__main__":
+    import sqlite3
+
+    conn = sqlite3.connect(":memory:")
+    cases = [
+        (1500, 10050), (2000, 125), (1, 499), (1, 500), (-1500, 10050), (1500, -333),
+        (-1, 499), (-1, 500), (-1, 501), (-1000, 1), (0, 100), (None, 100),
+    ]
+    for quantity, price in cases:
+        (sql,) = conn.execute(
+            f"SELECT {LINE_AMOUNT_SQL} FROM (SELECT ? AS quantity, ? AS price_per_unit)",
+            (quantity, price),
+        ).fetchone()
+        assert sql == line_amount(quantity, price), (quantity, price, sql)
+    print("Суммы строк: SQL и line_amount совпадают")
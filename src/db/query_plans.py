@@ -0,0 +1,184 @@
+import re
+
+# --- Проверка планов запросов CRUD (EXPLAIN QUERY PLAN) ---
+# Запросы не перечисляются вручную: сценарий вызывает сами CRUD-функции,
+# а trace callback соединения собирает фактически выполненный SQL.
+# Регрессией считаются SCAN таблицы и сортировка во временном B-дереве (ORDER BY не
+# по индексу). Разрешения задаются для отдельного вызова сценария, а не для функции:
+# ("vehicles", None) — перебор всей таблицы, ("ph", "idx_...") — проход по индексу
+# в порядке ORDER BY, TEMP_SORT — временное B-дерево. Другие вызовы той же функции
+# по-прежнему проверяются. Тест: tests/test_query_plans.py.
+
+TEMP_SORT = ("TEMP B-TREE", None)
+
+# Для виртуальных таблиц (FTS5) после ':' указаны ограничения индекса (M — MATCH,
+# '=' — rowid); пустой список означает полный перебор
+_SCAN_RE = re.compile(
+    r"^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?(?: VIRTUAL TABLE INDEX \d+:(\S*))?"
+)
+_TEMP_SORT_RE = re.compile(r"^USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY")
+_DML = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+_FTS_INTERNAL = "'main'.'"
+
+def collect_statements(conn, scenario):
+    """
+    Выполняет scenario — [(имя функции, вызов) или (имя, вызов, разрешённые проходы)] —
+    и возвращает список (имя функции, SQL, разрешённые проходы) для каждого запроса
+    """
+    statements = []
+    current = {"name": None, "allowed": frozenset()}
+
+    def trace(sql):
+        # Служебные запросы модуля FTS5 к его таблицам ('main'.'orders_fts_config' и т. п.)
+        # тоже проходят через trace, но не относятся к коду приложения
+        if _FTS_INTERNAL in sql:
+            return
+        if current["name"] and sql.lstrip().upper().startswith(_DML):
+            statements.append((current["name"], sql, current["allowed"]))
+
+    conn.set_trace_callback(trace)
+    try:
+        for name, call, *allowed in scenario:
+            current["name"] = name
+            current["allowed"] = frozenset(allowed[0]) if allowed else frozenset()
+            call()
+            current["name"] = None
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+def find_table_scans(conn, statements):
+    """Возвращает список нарушений: (имя функции, проход, SQL)"""
+    violations = []
+    for name, sql, allowed in statements:
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+            detail = row[3]
+            match = _SCAN_RE.match(detail)
+            if match:
+                if match.group(3):
+                    continue   # FTS5 с ограничением MATCH/rowid
+                access = (match.group(1), match.group(2))
+            elif _TEMP_SORT_RE.match(detail):
+                access = TEMP_SORT
+            else:
+                continue
+            if access not in allowed:
+                violations.append((name, detail, " ".join(sql.split())))
+    return violations
+
+def seed_database(db, vehicle_count=10000):
+    """Набор данных ~200k строк и ANALYZE — планы как на большой рабочей базе"""
+    from src.db.ids import create_id_sequences
+
+    conn = db._manager.connection()
+    with db.transaction():
+        conn.executemany(
+            "INSERT INTO vehicles (contract_number, type, customer, number, brand) VALUES (?, ?, ?, ?, ?)",
+            [(f"N{i}", "Легковые", f"Заказчик {i % 500}", f"А{i:03d}ВС", "Toyota") for i in range(vehicle_count)],
+        )
+        conn.executemany(
+            "INSERT INTO materials_and_works (vehicle_id, material, work, unit, quantity, price_per_unit) VALUES (?, '', ?, 'шт.', 1000, 10000)",
+            [(1 + i % vehicle_count, f"Работа {i % 300}") for i in range(100000)],
+        )
+        conn.executemany(
+            "INSERT INTO print_history (vehicle_id, print_date, printed_at, customer, brand, number, pdf_path, search_key) VALUES (?, '01.01.2025 10:00:00', '2025-01-01 10:00:00', '', '', '', '', ?)",
+            [(1 + i % vehicle_count, f"n{i % vehicle_count}") for i in range(100000)],
+        )
+        create_id_sequences(conn.cursor())
+    conn.execute("ANALYZE")
+    return conn
+
+def build_scenario(db):
+    """Вызовы CRUD-функций со всеми формами запросов (после seed_database)"""
+    vehicle = db.get_vehicle_by_id(42)
+    line = {"work": "Диагностика", "unit": "шт.", "quantity": "1", "price_per_unit": "500"}
+    return [
+        # Полный список и справочники читаются целиком
+        ("get_all_vehicles", db.get_all_vehicles, {("vehicles", None)}),
+        ("get_vehicle_by_id", lambda: db.get_vehicle_by_id(42)),
+        ("query_vehicles", lambda: db.query_vehicles(type="Легковые")),
+        ("query_vehicles", lambda: db.query_vehicles(type="Легковые", order_by="customer", after_key=("Заказчик 7", 8))),
+        ("query_vehicles", lambda: db.query_vehicles(order_by="contract_number", after_key=("N5", 6))),
+        # Поиск подстроки (запасной вариант, когда FTS ничего не нашёл) не может использовать
+        # индекс по search_key: таблица просматривается в порядке сортировки до limit + 1
+        # совпадений — по первичному ключу или индексу сортировки, без сортировки всей выборки
+        ("query_vehicles", lambda: db.query_vehicles(search="заказчик 7"), {("vehicles", None)}),
+        ("query_vehicles", lambda: db.query_vehicles(search="заказчик 7", order_by="customer"),
+         {("vehicles", "idx_vehicles_customer")}),
+        ("query_vehicles", lambda: db.query_vehicles(search="заказчик 7", order_by="contract_number"),
+         {("vehicles", "idx_vehicles_contract_number")}),
+        # Релевантность bm25 вычисляется для каждого совпадения — порядок только сортировкой
+        # найденных FTS5 документов
+        ("search_orders", lambda: db.search_orders("работа 17"), {TEMP_SORT}),
+        ("search_orders", lambda: db.search_orders("работа 17", type="Легковые"), {TEMP_SORT}),
+        ("save_vehicle", lambda: db.save_vehicle(vehicle, [line], [])),
+        ("save_vehicle", lambda: db.save_vehicle({"contract_number": "NEW-1"}, [line], [])),
+        ("save_vehicle_changes", lambda: db.save_vehicle_changes(
+            vehicle, ["customer", "work_total"],
+            [dict(line, id=db.get_materials_and_works(42)[0]["id"]), line], [10042],
+        )),
+        ("update_vehicle", lambda: db.update_vehicle(vehicle)),
+        ("get_materials_and_works", lambda: db.get_materials_and_works(42)),
+        ("get_order_totals", lambda: db.get_order_totals(42)),
+        # Итоги всех заказов и частоты названий — агрегаты по всем строкам
+        ("get_orders_totals", db.get_orders_totals,
+         {("materials_and_works", "idx_materials_and_works_vehicle_id")}),
+        ("get_line_usage_counts", db.get_line_usage_counts, {("materials_and_works", None)}),
+        ("add_material_and_work", lambda: db.add_material_and_work(42, "Фильтр", "")),
+        ("delete_material_and_work", lambda: db.delete_material_and_work(10000)),
+        ("delete_materials_and_works", lambda: db.delete_materials_and_works(43)),
+        ("get_works", db.get_works, {("works", None)}),
+        ("add_work", lambda: db.add_work("Новая работа")),
+        ("delete_work", lambda: db.delete_work(1)),
+        ("get_materials", db.get_materials, {("materials", None)}),
+        ("add_material", lambda: db.add_material("Новый материал")),
+        ("delete_material", lambda: db.delete_material(1)),
+        ("load_orders", lambda: db.load_orders([42, 43, 44])),
+        # Отбор по диапазону дат заказа (пакетная печать): даты хранятся как 'ДД.ММ.ГГГГ'
+        ("load_orders", lambda: db.load_orders(date_from="01.01.2025", date_to="31.01.2025"), {("vehicles", None)}),
+        ("add_print_history", lambda: db.add_print_history(vehicle, "report.pdf")),
+        ("add_print_history_batch", lambda: db.add_print_history_batch([(vehicle, "report.pdf")] * 3)),
+        # История идёт по индексу (printed_at, id, search_key) в порядке вывода до limit строк;
+        # поиск проверяет search_key в том же индексе
+        ("get_print_history", lambda: db.get_print_history(limit=100),
+         {("ph", "idx_print_history_printed_at")}),
+        ("get_print_history", lambda: db.get_print_history(limit=100, after_key=("2025-01-01 10:00:00", 500))),
+        ("get_print_history", lambda: db.get_print_history(limit=100, date_from="01.01.2025", date_to="31.01.2025")),
+        ("get_print_history", lambda: db.get_print_history(limit=100, search="n42"),
+         {("ph", "idx_print_history_printed_at")}),
+        ("get_print_history", lambda: db.get_print_history(limit=100, after_key=("2025-01-01 10:00:00", 500), search="n42")),
+        ("delete_print_history_entry", lambda: db.delete_print_history_entry(1)),
+        ("forget_report_files", lambda: db.forget_report_files(["report.pdf"])),
+        ("enqueue_print_job", lambda: db.enqueue_print_job(42)),
+        ("enqueue_print_job", lambda: db.enqueue_print_job(42)),
+        ("enqueue_print_jobs", lambda: db.enqueue_print_jobs([43, 45])),
+        ("claim_print_jobs", lambda: db.claim_print_jobs(2)),
+        ("complete_print_jobs", lambda: db.complete_print_jobs([(1, vehicle, "report.pdf")])),
+        ("fail_print_job", lambda: db.fail_print_job(2, "Ошибка")),
+        ("get_print_queue_state", db.get_print_queue_state),
+        ("cancel_print_jobs", lambda: db.cancel_print_jobs([3])),
+        ("cancel_print_jobs", db.cancel_print_jobs),
+        ("recover_print_jobs", db.recover_print_jobs),
+        ("delete_vehicle", lambda: db.delete_vehicle(44)),
+    ]
+
+# --- Регрессионная проверка: python -m src.db.query_plans ---
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["APPDATA"] = tmp
+        from src.db import database as db
+
+        db.init_db()
+        conn = seed_database(db)
+        statements = collect_statements(conn, build_scenario(db))
+        violations = find_table_scans(conn, statements)
+        db.close_connections()
+
+    print(f"Проверено запросов: {len(statements)}")
+    for name, detail, sql in violations:
+        print(f"{detail} в {name}: {sql}")
+    sys.exit(1 if violations else 0)
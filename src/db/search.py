@@ -0,0 +1,66 @@
+import re
+
+# --- Поисковый ключ ТС ---
+# Встроенные lower()/LIKE в SQLite не учитывают регистр кириллицы, а вызов
+# Python-функции на каждую строку дорог. Поэтому при записи ТС в колонку
+# vehicles.search_key кладётся склейка полей поиска в casefold, и поиск
+# сводится к встроенному instr(search_key, ?).
+
+VEHICLE_SEARCH_COLUMNS = ("contract_number", "customer", "number", "brand")
+SEARCH_KEY_SEPARATOR = "\x1f"  # не встречается во вводе, поэтому совпадение не «склеивает» поля
+
+def vehicle_search_key(vehicle_data):
+    return SEARCH_KEY_SEPARATOR.join(
+        str(vehicle_data.get(col) or "") for col in VEHICLE_SEARCH_COLUMNS
+    ).casefold()
+
+def normalize_search(text):
+    return (text or "").strip().casefold()
+
+# --- Тип машины ---
+# Фильтр списка по типу — точное сравнение по индексу (type, ...). Поэтому тип
+# приводится к одному написанию при записи ТС (и миграцией 13 для старых записей):
+# без пробелов по краям, известные типы — как в VEHICLE_TYPES независимо от регистра.
+
+VEHICLE_TYPES = ("Легковые", "Автобусы", "Рефрижераторы", "Разное")
+_VEHICLE_TYPES_BY_KEY = {vehicle_type.casefold(): vehicle_type for vehicle_type in VEHICLE_TYPES}
+
+def normalize_vehicle_type(value):
+    """' легковые ' -> 'Легковые'; неизвестный тип — без пробелов по краям"""
+    text = (value or "").strip()
+    return _VEHICLE_TYPES_BY_KEY.get(text.casefold(), text)
+
+# --- Полнотекстовый индекс заказов (FTS5) ---
+# Один документ на ТС: поля карточки + текст всех работ/материалов (колонка lines).
+# unicode61 приводит регистр любых букв (в т.ч. кириллицы) и снимает латинские
+# диакритики. «Ё» для unicode61 — отдельная буква, поэтому она заменяется на «Е»
+# и при индексации (fts_text_sql), и в запросе (fts_match_query).
+
+ORDER_FTS_COLUMNS = (
+    "contract_number", "customer", "number", "brand", "address", "phone",
+    "preliminary_inspection", "recommendations",
+)
+# Веса bm25 по колонкам ORDER_FTS_COLUMNS + lines: совпадение в номере важнее, чем в тексте работ
+ORDER_FTS_WEIGHTS = (10.0, 5.0, 10.0, 3.0, 1.0, 2.0, 1.0, 1.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def fts_text_sql(expr):
+    """Выражение SQL: текст для индексации с заменой «ё» на «е»"""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+def lines_text_sql(vehicle_id_expr):
+    """Подзапрос: текст всех строк работ/материалов ТС для колонки lines"""
+    text = fts_text_sql("trim(COALESCE(work, '') || ' ' || COALESCE(material, ''))")
+    return f"""(
+        SELECT group_concat({text}, ' ')
+        FROM materials_and_works WHERE vehicle_id = {vehicle_id_expr}
+    )"""
+
+def fts_match_query(text):
+    """
+    Пользовательский ввод -> выражение MATCH: каждое слово как префикс, все слова обязательны.
+    'сальник компрессора Denso' -> '"сальник"* "компрессора"* "denso"*'
+    """
+    tokens = _TOKEN_RE.findall((text or "").replace("ё", "е").replace("Ё", "Е"))
+    return " ".join(f'"{token}"*' for token in tokens)
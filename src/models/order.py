@@ -0,0 +1,323 @@
+from src.db.money import (
+    parse_money_lenient, parse_quantity_lenient, format_money, format_quantity,
+    line_amount, apply_coefficient
+)
+
+# --- Модель наряд-заказа без привязки к Tk ---
+# Строки работ и материалов хранятся как типизированные данные: количество — в тысячных
+# долях, цена и сумма — в копейках (None — поле не заполнено или нечисловое).
+# Итоги поддерживаются нарастающим итогом: изменение поля строки меняет сумму строки
+# и корректирует итог на разницу, без обхода остальных строк (O(1) на правку).
+# Виджеты подписываются на изменения (subscribe) и обновляют только затронутые поля;
+# та же модель используется при формировании PDF.
+# Для сохранения изменений модель помнит id строк из БД, изменённые строки (dirty)
+# и id удалённых строк: pending_changes() отдаёт только их.
+
+WORKS = "works"
+MATERIALS = "materials"
+
+# Поля строк в порядке колонок таблиц формы и PDF
+WORK_COLUMNS = ("name", "unit", "quantity", "price", "amount", "equipment_param1", "equipment_param2")
+MATERIAL_COLUMNS = ("name", "unit", "quantity", "price", "amount")
+COLUMNS = {WORKS: WORK_COLUMNS, MATERIALS: MATERIAL_COLUMNS}
+
+# Имя строки в словарях get_materials_and_works / save_vehicle
+NAME_KEYS = {WORKS: "work", MATERIALS: "material"}
+
+DEFAULT_COEFFICIENT = "1.2"
+
+class OrderLine:
+    def __init__(self, name="", unit="", quantity=None, price=None, amount=None,
+                 equipment_param1="", equipment_param2="", id=None):
+        self.id = id
+        self.name = name
+        self.unit = unit
+        self.quantity = quantity
+        self.price = price
+        self.manual_amount = amount   # сумма, введённая вручную (если нет количества или цены)
+        self.equipment_param1 = equipment_param1
+        self.equipment_param2 = equipment_param2
+        self.dirty = False   # изменена после загрузки или последнего сохранения
+
+    @property
+    def amount(self):
+        """Сумма строки в копейках: количество × цена, иначе введённая вручную"""
+        computed = line_amount(self.quantity, self.price)
+        return computed if computed is not None else self.manual_amount
+
+    def text(self, field):
+        """Значение поля в том виде, в каком оно показывается в форме"""
+        if field == "quantity":
+            return format_quantity(self.quantity)
+        if field in ("price", "amount"):
+            return format_money(getattr(self, field))
+        return getattr(self, field) or ""
+
+    def set_text(self, field, text):
+        """Устанавливает поле из текста формы; True, если значение изменилось"""
+        if field == "quantity":
+            value = parse_quantity_lenient(text)
+        elif field == "price":
+            value = parse_money_lenient(text)
+        elif field == "amount":
+            field, value = "manual_amount", parse_money_lenient(text)
+        else:
+            value = text
+        if getattr(self, field) == value:
+            return False
+        setattr(self, field, value)
+        self.dirty = True
+        return True
+
+    def to_dict(self, kind):
+        """Строка в формате get_materials_and_works / save_vehicle"""
+        data = {
+            "id": self.id,
+            NAME_KEYS[kind]: self.name.strip(),
+            "unit": self.unit.strip(),
+            "quantity": format_quantity(self.quantity),
+            "price_per_unit": format_money(self.price),
+        }
+        if kind == WORKS:
+            data["equipment_param1"] = self.equipment_param1.strip()
+            data["equipment_param2"] = self.equipment_param2.strip()
+        return data
+
+    @classmethod
+    def from_dict(cls, kind, item):
+        return cls(
+            id=item.get("id"),
+            name=item.get(NAME_KEYS[kind]) or "",
+            unit=item.get("unit") or "",
+            quantity=parse_quantity_lenient(item.get("quantity")),
+            price=parse_money_lenient(item.get("price_per_unit")),
+            equipment_param1=item.get("equipment_param1") or "" if kind == WORKS else "",
+            equipment_param2=item.get("equipment_param2") or "" if kind == WORKS else "",
+        )
+
+class OrderModel:
+    def __init__(self, coefficient=DEFAULT_COEFFICIENT):
+        self.lines = {WORKS: [], MATERIALS: []}
+        self._sums = {WORKS: 0, MATERIALS: 0}
+        self.coefficient = coefficient
+        self._deleted_ids = []   # id сохранённых строк, удалённых из заказа
+        self._line_listeners = []
+        self._totals_listeners = []
+
+    # ----- Подписка -----
+    def subscribe(self, on_line=None, on_totals=None):
+        """
+        on_line(kind, index, field) — изменилось поле field строки index
+            (index и field None — список строк заменён целиком);
+        on_totals(model) — изменились итоги.
+        """
+        if on_line is not None:
+            self._line_listeners.append(on_line)
+        if on_totals is not None:
+            self._totals_listeners.append(on_totals)
+
+    def _notify_line(self, kind, index, field=None):
+        for callback in self._line_listeners:
+            callback(kind, index, field)
+
+    def _notify_totals(self):
+        for callback in self._totals_listeners:
+            callback(self)
+
+    # ----- Строки -----
+    def add_line(self, kind, line=None):
+        line = line or OrderLine()
+        self.lines[kind].append(line)
+        self._add_to_sum(kind, line.amount or 0)
+        return len(self.lines[kind]) - 1
+
+    def remove_line(self, kind, index):
+        line = self.lines[kind].pop(index)
+        if line.id is not None:
+            self._deleted_ids.append(line.id)
+        self._add_to_sum(kind, -(line.amount or 0))
+        return line
+
+    def set_field(self, kind, index, field, text):
+        """Правка поля строки из текста формы"""
+        line = self.lines[kind][index]
+        before = line.amount or 0
+        if not line.set_text(field, text):
+            return
+        self._notify_line(kind, index, field)
+        self._add_to_sum(kind, (line.amount or 0) - before)
+
+    def _add_to_sum(self, kind, delta):
+        if delta:
+            self._sums[kind] += delta
+            self._notify_totals()
+
+    def load(self, materials_and_works=(), min_lines=0):
+        """
+        Замена всех строк (словари get_materials_and_works). Итоги считаются один раз,
+        подписчики получают одно уведомление на таблицу. Таблицы дополняются пустыми
+        строками до min_lines.
+        """
+        works = [OrderLine.from_dict(WORKS, item) for item in materials_and_works if item.get("work")]
+        materials = [
+            OrderLine.from_dict(MATERIALS, item)
+            for item in materials_and_works if not item.get("work") and item.get("material")
+        ]
+        for kind, lines in ((WORKS, works), (MATERIALS, materials)):
+            lines.extend(OrderLine() for _ in range(min_lines - len(lines)))
+            self.lines[kind] = lines
+            self._sums[kind] = sum(line.amount or 0 for line in lines)
+        self._deleted_ids = []
+        for kind in (WORKS, MATERIALS):
+            self._notify_line(kind, None)
+        self._notify_totals()
+
+    def clear(self, min_lines=0):
+        self.load((), min_lines)
+
+    def set_coefficient(self, text):
+        if text == self.coefficient:
+            return
+        self.coefficient = text
+        self._notify_totals()
+
+    # ----- Изменения для сохранения -----
+    def pending_changes(self):
+        """
+        ([(kind, строка)], [id]) — новые и изменённые строки с наименованием и id строк
+        к удалению. Сохранённая строка, у которой стёрли наименование, тоже удаляется.
+        """
+        lines = []
+        deleted = list(self._deleted_ids)
+        for kind in (WORKS, MATERIALS):
+            for line in self.lines[kind]:
+                if not line.name.strip():
+                    if line.id is not None:
+                        deleted.append(line.id)
+                elif line.id is None or line.dirty:
+                    lines.append((kind, line))
+        return lines, deleted
+
+    def mark_saved(self, lines, line_ids, deleted_ids, saved_dicts=None):
+        """
+        Фиксирует результат сохранения pending_changes(): id новых строк, сброс признаков.
+        saved_dicts — записанные значения (to_dict) при фоновом сохранении: строка, изменённая
+        после снимка, остаётся dirty, а удалённая за это время новая строка попадает в удаляемые.
+        """
+        for index, ((kind, line), line_id) in enumerate(zip(lines, line_ids)):
+            is_new = line.id is None
+            line.id = line_id
+            if saved_dicts is None:
+                line.dirty = False
+                continue
+            saved = dict(saved_dicts[index], id=line_id)
+            line.dirty = line.to_dict(kind) != saved
+            if is_new and not any(line is current for current in self.lines[kind]):
+                self._deleted_ids.append(line_id)
+        deleted_ids = set(deleted_ids)
+        for kind in (WORKS, MATERIALS):
+            for line in self.lines[kind]:
+                if line.id in deleted_ids:
+                    line.id = None
+        self._deleted_ids = [line_id for line_id in self._deleted_ids if line_id not in deleted_ids]
+
+    def line_dicts(self, kind):
+        """Заполненные строки (с наименованием) для сохранения и печати"""
+        return [line.to_dict(kind) for line in self.lines[kind] if line.name.strip()]
+
+    # ----- Итоги (копейки) -----
+    @property
+    def work_total(self):
+        return self._sums[WORKS]
+
+    @property
+    def parts_total(self):
+        return self._sums[MATERIALS]
+
+    @property
+    def work_total_with_coeff(self):
+        try:
+            return apply_coefficient(self._sums[WORKS], self.coefficient)
+        except ValueError:
+            return self._sums[WORKS]
+
+    @property
+    def order_total(self):
+        return self.work_total_with_coeff + self.parts_total
+
+    def totals(self):
+        """Итоги в виде строк, как они хранятся в vehicles и выводятся в форме"""
+        return {
+            "work_total": format_money(self.work_total),
+            "work_total_with_coeff": format_money(self.work_total_with_coeff),
+            "parts_total": format_money(self.parts_total),
+            "order_total": format_money(self.order_total),
+        }
+
+    @classmethod
+    def from_lines(cls, materials_and_works, coefficient=DEFAULT_COEFFICIENT):
+        model = cls(coefficient)
+        model.load(materials_and_works)
+        return model
+
+# --- Проверка: python -m src.models.order ---
+if __name__ == "__main__":
+    import time
+
+    model = OrderModel()
+    model.load([
+        {"work": "Замена сальника", "unit": "шт", "quantity": "2", "price_per_unit": "1500.50"},
+        {"material": "Фреон R134a", "unit": "кг", "quantity": "1,5", "price_per_unit": "900"},
+    ], min_lines=1)
+    assert model.totals() == {
+        "work_total": "3001.00", "work_total_with_coeff": "3601.20",
+        "parts_total": "1350.00", "order_total": "4951.20",
+    }, model.totals()
+    model.set_field(WORKS, 0, "quantity", "3")
+    model.set_field(MATERIALS, 0, "price", "")
+    model.set_field(MATERIALS, 0, "amount", "100")
+    model.set_coefficient("1")
+    assert model.totals()["work_total"] == "4501.50" and model.parts_total == 10000, model.totals()
+    model.remove_line(WORKS, 0)
+    assert model.work_total == 0 and model.lines[WORKS] == []
+
+    # Изменения для сохранения: только правленые, новые и удалённые строки
+    model.load([
+        {"id": 1, "work": "А", "quantity": "1", "price_per_unit": "1"},
+        {"id": 2, "work": "Б", "quantity": "1", "price_per_unit": "1"},
+        {"id": 3, "material": "В", "quantity": "1", "price_per_unit": "1"},
+    ])
+    assert model.pending_changes() == ([], [])
+    model.set_field(WORKS, 1, "price", "2")
+    model.add_line(MATERIALS)
+    model.set_field(MATERIALS, 1, "name", "Г")
+    model.remove_line(WORKS, 0)
+    lines, deleted = model.pending_changes()
+    assert [line.name for _, line in lines] == ["Б", "Г"] and deleted == [1], (lines, deleted)
+    model.mark_saved(lines, [2, 4], deleted)
+    assert model.pending_changes() == ([], []) and model.lines[MATERIALS][1].id == 4
+
+    # Фоновое сохранение: правка и удаление строк, пока запись выполнялась
+    model.add_line(WORKS)
+    model.set_field(WORKS, 1, "name", "Д")
+    model.add_line(WORKS)
+    model.set_field(WORKS, 2, "name", "Е")
+    lines, deleted = model.pending_changes()
+    saved_dicts = [line.to_dict(kind) for kind, line in lines]
+    model.set_field(WORKS, 1, "price", "5")
+    model.remove_line(WORKS, 2)
+    model.mark_saved(lines, [5, 6], deleted, saved_dicts)
+    lines, deleted = model.pending_changes()
+    assert [line.id for _, line in lines] == [5] and deleted == [6], (lines, deleted)
+
+    lines = 2000
+    model = OrderModel()
+    for i in range(lines):
+        model.add_line(WORKS)
+    start = time.perf_counter()
+    for i in range(lines):
+        model.set_field(WORKS, i, "quantity", "2")
+        model.set_field(WORKS, i, "price", f"{i}.25")
+    elapsed = (time.perf_counter() - start) * 1000
+    assert model.work_total == sum(line_amount(2000, i * 100 + 25) for i in range(lines))
+    print(f"Проверка пройдена; {2 * lines} правок на {lines} строках: {elapsed:.1f} мс")
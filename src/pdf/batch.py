@@ -0,0 +1,55 @@
+# --- Пакетная печать ---
+# Пакет ставится в очередь печати (PrintQueue.enqueue_batch), документы формируются в её пуле
+# процессов; BatchResult — итог пакета для сообщения пользователю.
+
+class BatchResult:
+    def __init__(self, total):
+        self.total = total
+        self.printed = []     # [(vehicle, pdf_path)] — полностью записанные файлы
+        self.failed = []      # [(vehicle, ошибка)]
+        self.cancelled = False
+        self.seconds = 0.0
+
+    @property
+    def per_minute(self):
+        """Производительность: документов в минуту"""
+        return len(self.printed) * 60 / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        text = (
+            f"Сформировано документов: {len(self.printed)} из {self.total} "
+            f"за {self.seconds:.1f} с ({self.per_minute:.0f} в минуту)."
+        )
+        if self.failed:
+            text += f"\nС ошибками: {len(self.failed)}."
+        if self.cancelled:
+            text += "\nПечать отменена."
+        return text
+
+# --- Замер: python -m src.pdf.batch [кол-во документов] ---
+# Формирование в пуле процессов без БД и очереди — производительность самого generate_pdf
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from src.pdf.fonts import prewarm
+    from src.pdf.report_generator import generate_pdf
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["APPDATA"] = tmp
+        line = {"work": "Диагностика", "unit": "шт.", "quantity": "1", "price_per_unit": "500.00"}
+        part = {"material": "Фильтр", "unit": "шт.", "quantity": "2", "price_per_unit": "350.00"}
+        orders = [
+            ({"id": i, "contract_number": f"N{i}", "customer": "Заказчик"}, [line] * 10 + [part] * 5)
+            for i in range(1, count + 1)
+        ]
+        result = BatchResult(count)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=prewarm) as pool:
+            futures = [(vehicle, pool.submit(generate_pdf, vehicle, lines)) for vehicle, lines in orders]
+            result.printed = [(vehicle, future.result()) for vehicle, future in futures]
+        result.seconds = time.perf_counter() - start
+        print(f"Процессов: {os.cpu_count()}. {result.summary()}")
@@ -0,0 +1,47 @@
+import threading
+from src.pdf import resource_path
+
+# --- Шрифт отчёта ---
+# reportlab и шрифт загружаются при первом формировании документа, а не при импорте:
+# программа запускается без них, если в этот день ничего не печатают. Процессы пула печати
+# загружают их заранее (prewarm — инициализатор пула), пока пользователь работает с окном.
+
+FONT = "DejaVuSans"
+FONT_FILE = "assets/DejaVuSans.ttf"
+
+_lock = threading.Lock()
+_registered = False
+
+def ensure_fonts():
+    """Импортирует reportlab и регистрирует шрифт отчёта (один раз на процесс)"""
+    global _registered
+    if _registered:
+        return
+    with _lock:
+        if _registered:
+            return
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        pdfmetrics.registerFont(TTFont(FONT, resource_path(FONT_FILE)))
+        _registered = True
+
+def prewarm():
+    """Инициализатор процессов пула печати: первый документ не ждёт загрузки шрифта"""
+    ensure_fonts()
+    from reportlab.pdfgen import canvas  # noqa: F401 — импорт модуля холста заранее
+
+# --- Проверка: python -m src.pdf.fonts ---
+if __name__ == "__main__":
+    import sys
+    import time
+
+    assert "reportlab" not in sys.modules, "reportlab импортирован при импорте модуля"
+    start = time.perf_counter()
+    prewarm()
+    loaded = time.perf_counter() - start
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    assert stringWidth("Договор наряд-заказ № 15", FONT, 9) > 0
+    start = time.perf_counter()
+    ensure_fonts()
+    repeated = time.perf_counter() - start
+    print(f"Загрузка reportlab и шрифта: {loaded * 1000:.1f} мс, повторный вызов: {repeated * 1000:.3f} мс")
@@ -0,0 +1,223 @@
+from functools import lru_cache
+
+# --- Потоковая вёрстка PDF ---
+# Строки таблиц выводятся по одной по мере поступления из итератора: когда следующая строка
+# не помещается, текущая страница закрывается подытогом, начинается новая, и шапка таблицы
+# повторяется. В памяти — только состояние текущей страницы, а не весь документ.
+# Ширина текста измеряется по словам с кэшем: у TTF-шрифтов reportlab ширина строки —
+# сумма ширин символов, поэтому ширина строки складывается из ширин слов и пробелов.
+
+@lru_cache(maxsize=8192)
+def text_width(text, font, size):
+    from reportlab.pdfbase.pdfmetrics import stringWidth   # reportlab — при первом формировании
+    return stringWidth(text, font, size)
+
+def _split_word(word, width, font, size):
+    """Режет слово, не помещающееся в строку, на части не шире width"""
+    parts = []
+    part = ""
+    part_width = 0
+    for char in word:
+        char_width = text_width(char, font, size)
+        if part and part_width + char_width > width:
+            parts.append(part)
+            part, part_width = "", 0
+        part += char
+        part_width += char_width
+    parts.append(part)
+    return parts
+
+def wrap_text(text, width, font, size):
+    """Разбивает текст на строки не шире width (переносы по словам и по абзацам)"""
+    space = text_width(" ", font, size)
+    lines = []
+    for paragraph in str(text or "").splitlines() or [""]:
+        line, line_width = "", 0
+        for word in paragraph.split():
+            word_width = text_width(word, font, size)
+            if word_width > width:
+                pieces = _split_word(word, width, font, size)
+                if line:
+                    lines.append(line)
+                lines.extend(pieces[:-1])
+                word = pieces[-1]
+                line, line_width = word, text_width(word, font, size)
+                continue
+            if line and line_width + space + word_width > width:
+                lines.append(line)
+                line, line_width = word, word_width
+            elif line:
+                line, line_width = f"{line} {word}", line_width + space + word_width
+            else:
+                line, line_width = word, word_width
+        lines.append(line)
+    return lines
+
+def replay(c, ops):
+    """Выполняет на canvas записанные операции [(метод, аргументы)]"""
+    for method, args in ops:
+        getattr(c, method)(*args)
+
+class PageFlow:
+    """
+    Текущая позиция вывода сверху вниз. y — верхняя граница свободного места;
+    при нехватке места new_page() переходит на следующую страницу.
+    """
+    def __init__(self, c, page_size, top, bottom, font, on_new_page=None, use_forms=False):
+        self.c = c
+        self.use_forms = use_forms
+        self.forms = set()               # имена form XObject, уже записанных в документ
+        self.page_width, self.page_height = page_size
+        self.top = top
+        self.bottom = bottom
+        self.font = font
+        self.on_new_page = on_new_page   # on_new_page(flow) — шапка страницы-продолжения
+        self.y = top
+        self.page = 1
+
+    def fits(self, height):
+        return self.y - height >= self.bottom
+
+    def ensure(self, height):
+        if not self.fits(height):
+            self.new_page()
+
+    def new_page(self):
+        self.draw_page_number()
+        self.c.showPage()
+        self.page += 1
+        self.y = self.top
+        if self.on_new_page is not None:
+            self.on_new_page(self)
+
+    def draw_page_number(self):
+        self.c.setFont(self.font, 8)
+        self.c.drawRightString(self.page_width - self.bottom / 2, self.bottom / 2, f"Страница {self.page}")
+
+    def stamp(self, name, ops, x=0, y=0):
+        """
+        Статичный фрагмент бланка ops в точке (x, y). С use_forms фрагмент записывается
+        в документ один раз как form XObject, дальше на каждой странице — только ссылка на него.
+        Координаты ops — неотрицательные: form обрезается по своей области (0, 0, размер страницы).
+        """
+        c = self.c
+        if self.use_forms and name not in self.forms:
+            c.beginForm(name)
+            replay(c, ops)
+            c.endForm()
+            self.forms.add(name)
+        c.saveState()
+        c.translate(x, y)
+        if self.use_forms:
+            c.doForm(name)
+        else:
+            replay(c, ops)
+        c.restoreState()
+
+    def paragraph(self, x, width, text, size=9, leading=None):
+        """Текст с переносами; строки, не вместившиеся на страницу, переходят на следующую"""
+        leading = leading or size + 3
+        for line in wrap_text(text, width, self.font, size):
+            self.ensure(leading)
+            self.y -= leading
+            self.c.setFont(self.font, size)
+            self.c.drawString(x, self.y + 3, line)
+
+    def finish(self):
+        self.draw_page_number()
+
+class StreamTable:
+    """
+    Таблица, принимающая строки по одной. Колонки из wrap_columns переносятся по словам,
+    высота строки — по самой высокой ячейке. sum_column — колонка суммы: при переходе
+    на новую страницу выводится подытог по странице, в конце — page_total / total.
+    label_columns — сколько колонок занимает подпись строки итога (по умолчанию — до суммы).
+    """
+    def __init__(self, flow, x, widths, headers, size=9, header_height=18, line_height=11,
+                 padding=5, wrap_columns=(), sum_column=None, subtotal_label="Итого по странице:",
+                 format_sum=str, label_columns=None, name=None):
+        self.flow = flow
+        self.name = name or f"table_{'_'.join(str(w) for w in widths)}"   # имя form шапки
+        self.x = x
+        self.widths = widths
+        self.headers = headers
+        self.size = size
+        self.header_height = header_height
+        self.line_height = line_height
+        self.padding = padding
+        self.wrap_columns = set(wrap_columns)
+        self.sum_column = sum_column
+        self.subtotal_label = subtotal_label
+        self.format_sum = format_sum
+        self.label_columns = label_columns if label_columns is not None else sum_column
+        self.min_row_height = line_height + padding
+        self._ops = None
+        self.page_total = 0
+        self.total = 0
+
+    def draw_header(self):
+        # Шапка не остаётся внизу страницы без строк: под ней — строка и место для подытога
+        rows = 2 if self.sum_column is not None else 1
+        self.flow.ensure(self.header_height + rows * self.min_row_height)
+        y = self.flow.y - self.header_height
+        self.flow.stamp(self.name, self._header_ops(), self.x, y)
+        self.flow.y = y
+
+    def _header_ops(self):
+        """Сетка и подписи шапки относительно её левого нижнего угла (вычисляются один раз)"""
+        if self._ops is None:
+            ops = [("setFont", (self.flow.font, self.size))]
+            x = 0
+            for width, header in zip(self.widths, self.headers):
+                ops.append(("rect", (x, 0, width, self.header_height)))
+                ops.append(("drawCentredString", (x + width / 2, 5, header)))
+                x += width
+            self._ops = ops
+        return self._ops
+
+    def _cell_lines(self, index, value):
+        value = "" if value is None else str(value)
+        if index in self.wrap_columns:
+            return wrap_text(value, self.widths[index] - 4, self.flow.font, self.size)
+        return [value]
+
+    def add_row(self, values, amount=0):
+        cells = [self._cell_lines(i, value) for i, value in enumerate(values)]
+        height = max(len(lines) for lines in cells) * self.line_height + self.padding
+        reserve = self.min_row_height if self.sum_column is not None else 0
+        if not self.flow.fits(height + reserve):
+            self._page_break()
+        c = self.flow.c
+        c.setFont(self.flow.font, self.size)
+        x = self.x
+        y = self.flow.y - height
+        for width, lines in zip(self.widths, cells):
+            c.rect(x, y, width, height, fill=0)
+            # Строки ячейки центрируются по вертикали
+            text_y = y + height / 2 + (len(lines) - 1) * self.line_height / 2 - self.size / 2 + 1
+            for line in lines:
+                c.drawCentredString(x + width / 2, text_y, line)
+                text_y -= self.line_height
+            x += width
+        self.flow.y = y
+        self.page_total += amount or 0
+        self.total += amount or 0
+
+    def summary_row(self, label, value):
+        """Строка итога: подпись на ширину label_columns колонок, значение — справа от неё"""
+        self.flow.ensure(self.min_row_height)
+        c = self.flow.c
+        label_width = sum(self.widths[:self.label_columns])
+        y = self.flow.y - self.min_row_height
+        c.setFont(self.flow.font, self.size)
+        c.rect(self.x, y, label_width, self.min_row_height, fill=0)
+        c.drawRightString(self.x + label_width - 5, y + 4, label)
+        c.drawString(self.x + label_width + 2, y + 4, value)
+        self.flow.y = y
+
+    def _page_break(self):
+        if self.sum_column is not None:
+            self.summary_row(self.subtotal_label, self.format_sum(self.page_total))
+        self.flow.new_page()
+        self.page_total = 0
+        self.draw_header()
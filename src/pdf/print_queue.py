@@ -0,0 +1,354 @@
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from src.db.database import (
+    enqueue_print_job, enqueue_print_jobs, claim_print_jobs, complete_print_jobs,
+    fail_print_job, cancel_print_jobs, recover_print_jobs, get_print_queue_state,
+    order_content_hash
+)
+from src.pdf.batch import BatchResult
+from src.pdf.fonts import ensure_fonts
+from src.pdf.report_cache import cached_report_path, use_cached_report, evict_reports
+from src.pdf.report_generator import PrintCancelled
+from src.pdf.worker import init_worker, render
+
+# --- Очередь печати ---
+# Все запросы печати (кнопки списка, «Печать» в форме, история, пакетная печать) только
+# ставят задание в таблицу print_jobs — это мгновенно, и повторный щелчок по тому же
+# заказу не создаёт второго задания. Задания выбираются из таблицы и формируются в пуле
+# процессов фиксированного размера (по процессу на ядро); ошибки повторяются с паузой,
+# незавершённые задания после перезапуска программы выполняются заново.
+# Объект работает в главном потоке: обращения к БД идут через DbExecutor, результаты
+# процессов забираются опросом root.after. Процессы пула запускаются вскоре после показа
+# окна и сразу загружают reportlab и шрифт, поэтому первая печать не ждёт их загрузки.
+# Неизменённый с прошлой печати заказ не формируется заново: файл берётся из кэша
+# отчётов (report_cache), в историю запись добавляется как обычно.
+# «Отмена» снимает ожидающие задания и прерывает уже формируемые документы: счётчик отмен
+# общий с процессами пула (src.pdf.worker), документ проверяет его перед каждой строкой.
+
+POLL_MS = 50
+PREWARM_DELAY_MS = 2000
+MAX_WAKE_MS = 60000   # не реже раза в минуту проверять отложенные повторы
+
+class PrintQueue:
+    def __init__(self, root, db, workers=None, poll_ms=POLL_MS):
+        self.root = root
+        self.db = db
+        self.workers = workers or os.cpu_count() or 1
+        self.poll_ms = poll_ms
+        self._pool = None                 # ProcessPoolExecutor — с prewarm или первым заданием
+        self._cancel_counter = multiprocessing.Value("i", 0)   # счётчик отмен, общий с пулом
+        self._running = {}                # future -> (id задания, vehicle, пул)
+        self._finished = queue.SimpleQueue()
+        self._open_when_done = set()      # id заданий, чей файл открыть после печати
+        self._batches = []                # [(BatchResult, id заданий пакета, время начала, on_done)]
+        self._listeners = []
+        self._claiming = False
+        self._poll_id = None
+        self._wake_id = None
+        self._prewarm_id = None
+        self._closed = False
+        self.queued = 0                   # ожидающих заданий в БД (по последнему обращению)
+
+    # ----- Постановка в очередь -----
+    def start(self):
+        """Возобновляет задания, оставшиеся с прошлого запуска"""
+        self.db.submit(recover_print_jobs, on_done=self._on_recovered)
+        self.db.submit(evict_reports)
+        self._prewarm_id = self.root.after(PREWARM_DELAY_MS, self.prewarm)
+
+    def prewarm(self):
+        """Запускает процессы пула заранее; каждый при запуске загружает reportlab и шрифт"""
+        self._prewarm_id = None
+        if self._closed:
+            return
+        # Задания пустые (шрифт уже загружен инициализатором) — они только запускают процессы
+        try:
+            pool = self._ensure_pool()
+            for _ in range(self.workers - len(self._running)):
+                pool.submit(ensure_fonts)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+
+    def _on_recovered(self, queued):
+        self.queued = queued
+        self._notify()
+        self.pump()
+
+    def enqueue(self, vehicle_id, open_when_done=False, on_error=None):
+        """Ставит заказ в очередь; open_when_done — открыть PDF, когда он будет готов"""
+        def queued(result):
+            job_id, coalesced = result
+            if job_id is None:
+                if on_error is not None:
+                    on_error(Exception("Транспортное средство не найдено."))
+                return
+            if open_when_done:
+                self._open_when_done.add(job_id)
+            if not coalesced:
+                self.queued += 1
+                self._notify()
+            self.pump()
+        self.db.submit(enqueue_print_job, vehicle_id, on_done=queued, on_error=on_error)
+
+    def enqueue_batch(self, vehicle_ids=None, date_from=None, date_to=None, on_done=None, on_error=None):
+        """
+        Пакетная постановка (выбранные ТС или период). on_done(BatchResult) — когда все
+        задания пакета сформированы, исчерпали попытки или отменены.
+        """
+        def queued(jobs):
+            job_ids = {job_id for job_id, _ in jobs}
+            result = BatchResult(len(job_ids))
+            if not job_ids:
+                if on_done is not None:
+                    on_done(result)
+                return
+            self._batches.append((result, job_ids, time.perf_counter(), on_done))
+            # Совпавшие с уже активными задания в очереди уже учтены
+            self.queued += sum(1 for _, coalesced in jobs if not coalesced)
+            self._notify()
+            self.pump()
+        self.db.submit(enqueue_print_jobs, vehicle_ids, date_from, date_to, on_done=queued, on_error=on_error)
+
+    def cancel_pending(self):
+        """
+        Отменяет ожидающие задания и прерывает формируемые документы; документ, который
+        успел записаться до проверки отмены, фиксируется как обычно
+        """
+        with self._cancel_counter.get_lock():
+            self._cancel_counter.value += 1
+        self.db.submit(cancel_print_jobs, on_done=self._on_cancelled)
+
+    def _cancel_jobs(self, job_ids):
+        """Отмечает отменёнными задания, которые были забраны из БД или формировались в момент отмены"""
+        self.db.submit(cancel_print_jobs, job_ids, on_done=self._on_jobs_cancelled)
+
+    def _on_cancelled(self, job_ids):
+        self.queued = 0
+        self._on_jobs_cancelled(job_ids)
+
+    def _on_jobs_cancelled(self, job_ids):
+        for job_id in job_ids:
+            self._open_when_done.discard(job_id)
+            self._batch_job_finished(job_id, cancelled=True)
+        self._notify()
+
+    # ----- Выполнение -----
+    def pump(self):
+        """Забирает из БД задания на свободные места пула"""
+        free = self.workers - len(self._running)
+        if self._closed or self._claiming or free <= 0:
+            return
+        self._claiming = True
+        generation = self._cancel_counter.value
+        self.db.submit(
+            claim_print_jobs, free,
+            on_done=lambda claimed: self._start_jobs(claimed, generation), on_error=self._on_claim_error,
+        )
+
+    def _on_claim_error(self, error):
+        self._claiming = False
+        self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def _start_jobs(self, claimed, generation):
+        self._claiming = False
+        if self._closed:
+            return
+        if not claimed:
+            # Ожидающих нет или все ждут повтора — проверить позже
+            self.db.submit(get_print_queue_state, on_done=self._schedule_wake)
+            return
+        if generation != self._cancel_counter.value:
+            # Отмена пришла, пока задания забирались из БД: они уже не ожидающие
+            self.queued = max(0, self.queued - len(claimed))
+            self._cancel_jobs([job_id for job_id, _, _ in claimed])
+            self.pump()
+            return
+        cached = []
+        for index, (job_id, vehicle, lines) in enumerate(claimed):
+            pdf_path = cached_report_path(vehicle, order_content_hash(vehicle, lines))
+            if use_cached_report(pdf_path):
+                cached.append((job_id, vehicle, pdf_path))
+                continue
+            pool = self._ensure_pool()
+            try:
+                future = pool.submit(render, vehicle, lines, pdf_path, generation)
+            except BrokenProcessPool as error:
+                # Процесс пула аварийно завершился: пул пересоздаётся, забранные задания
+                # возвращаются в очередь как неудачная попытка
+                self._reset_pool(pool)
+                for job_id, vehicle, _ in claimed[index:]:
+                    self._fail_job(job_id, vehicle, error)
+                break
+            self._running[future] = (job_id, vehicle, pool)
+            future.add_done_callback(self._finished.put)
+        if cached:
+            self.db.submit(complete_print_jobs, cached, on_done=lambda _: self._on_jobs_printed(cached))
+        self.queued = max(0, self.queued - len(claimed))
+        self._notify()
+        self._schedule_poll()
+        self.pump()
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_worker, initargs=(self._cancel_counter,)
+            )
+        return self._pool
+
+    def _reset_pool(self, pool):
+        """Сломанный пул больше не используется; следующее задание создаст новый"""
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_wake(self, state):
+        self.queued = state["queued"]
+        self._notify()
+        if self._wake_id is not None:
+            self.root.after_cancel(self._wake_id)
+            self._wake_id = None
+        if not state["next_attempt_at"] or self._closed:
+            return
+        next_at = datetime.strptime(state["next_attempt_at"], "%Y-%m-%d %H:%M:%S")
+        delay_ms = int((next_at - datetime.now()).total_seconds() * 1000) + 100
+        self._wake_id = self.root.after(min(max(delay_ms, self.poll_ms), MAX_WAKE_MS), self._wake)
+
+    def _wake(self):
+        self._wake_id = None
+        self.pump()
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        printed = []
+        cancelled = []
+        while True:
+            try:
+                future = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            job_id, vehicle, pool = self._running.pop(future)
+            error = future.exception()
+            if error is None:
+                printed.append((job_id, vehicle, future.result()))
+            elif isinstance(error, PrintCancelled):
+                cancelled.append(job_id)
+            else:
+                if isinstance(error, BrokenProcessPool):
+                    self._reset_pool(pool)
+                self._fail_job(job_id, vehicle, error)
+        if printed:
+            # Готовые за один опрос файлы фиксируются одной транзакцией
+            self.db.submit(complete_print_jobs, printed, on_done=lambda _: self._on_jobs_printed(printed))
+        if cancelled:
+            self._cancel_jobs(cancelled)
+        if self._running:
+            self._schedule_poll()
+        self.pump()
+
+    def _fail_job(self, job_id, vehicle, error):
+        self.db.submit(
+            fail_print_job, job_id, error,
+            on_done=lambda status: self._on_job_failed(job_id, vehicle, status, error),
+        )
+
+    def _on_jobs_printed(self, printed):
+        for job_id, vehicle, pdf_path in printed:
+            self._batch_job_finished(job_id, printed=(vehicle, pdf_path))
+            if job_id in self._open_when_done:
+                self._open_when_done.discard(job_id)
+                self._notify("open", pdf_path)
+        self._notify("printed", printed)
+
+    def _on_job_failed(self, job_id, vehicle, status, error):
+        if status == "queued":
+            self.queued += 1   # повтор после паузы
+            self._notify()
+            return
+        self._open_when_done.discard(job_id)
+        in_batch = self._batch_job_finished(job_id, failed=(vehicle, error))
+        self._notify("failed", (vehicle, error, in_batch))
+
+    def _batch_job_finished(self, job_id, printed=None, failed=None, cancelled=False):
+        """
+        Учитывает задание во всех пакетах, куда оно входит (пакеты за один период,
+        запущенные дважды, делят задания); True, если задание входит хотя бы в один пакет
+        """
+        in_batch = False
+        for batch in list(self._batches):
+            result, job_ids, started, on_done = batch
+            if job_id not in job_ids:
+                continue
+            in_batch = True
+            job_ids.discard(job_id)
+            if printed is not None:
+                result.printed.append(printed)
+            if failed is not None:
+                result.failed.append(failed)
+            result.cancelled = result.cancelled or cancelled
+            if not job_ids:
+                self._batches.remove(batch)
+                result.seconds = time.perf_counter() - started
+                if on_done is not None:
+                    on_done(result)
+        return in_batch
+
+    # ----- Состояние для строки состояния -----
+    @property
+    def running(self):
+        return len(self._running)
+
+    def add_listener(self, callback):
+        """
+        callback(event, data) в главном потоке: "state" — изменились счётчики queued/running;
+        "printed" — [(id задания, vehicle, pdf_path)] записаны в историю; "open" — путь
+        файла, который просили открыть; "failed" — (vehicle, ошибка, входит ли в пакет)
+        после последней попытки.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event="state", data=None):
+        for callback in self._listeners:
+            callback(event, data)
+
+    # ----- Завершение -----
+    def shutdown(self):
+        """
+        Останавливает пул: начатые документы прерываются и не фиксируются —
+        их задания остаются running и при следующем запуске выполняются снова.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for after_id in (self._poll_id, self._wake_id, self._prewarm_id):
+            if after_id is not None:
+                try:
+                    self.root.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._poll_id = self._wake_id = self._prewarm_id = None
+        if self._pool is not None:
+            with self._cancel_counter.get_lock():
+                self._cancel_counter.value += 1
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+def open_pdf(pdf_path):
+    """Открывает файл в программе просмотра, не дожидаясь её завершения"""
+    if sys.platform.startswith("win"):
+        os.startfile(pdf_path)
+    elif sys.platform.startswith("darwin"):
+        subprocess.Popen(["open", pdf_path])
+    else:
+        subprocess.Popen(
+            ["xdg-open", pdf_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import re
+import time
+from src.pdf.report_generator import REPORT_TEMPLATE_VERSION, reports_dir
+
+# --- Кэш сформированных отчётов ---
+# Имя файла отчёта выводится из хэша содержимого заказа (поля ТС и строки работ и
+# материалов, order_content_hash) и версии бланка. Повторная печать неизменённого заказа
+# находит готовый файл и не формирует его заново — в историю печати запись добавляется
+# как обычно. Время изменения файла обновляется при каждом попадании, поэтому вытеснение
+# (evict_reports) удаляет давно не печатавшиеся отчёты: старше REPORT_CACHE_MAX_DAYS
+# и самые старые сверх REPORT_CACHE_MAX_BYTES. Вытесняются только файлы кэша
+# (report_<id ТС>_<ключ>.pdf): отчёты прежнего формата с временем в имени не трогаются.
+# Записи истории, ссылавшиеся на удалённый файл, теряют путь — документ печатается заново.
+
+REPORT_CACHE_MAX_DAYS = 180
+REPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_FILE_RE = re.compile(r"^report_\d+_[0-9a-f]{24}\.pdf$")
+
+def cached_report_path(vehicle_data, content_hash):
+    """Путь отчёта для данной версии заказа и бланка"""
+    key = hashlib.sha256(f"{content_hash}|{REPORT_TEMPLATE_VERSION}".encode("utf-8")).hexdigest()
+    return os.path.join(reports_dir(), f"report_{vehicle_data['id']}_{key[:24]}.pdf")
+
+def use_cached_report(pdf_path):
+    """True, если отчёт уже сформирован; время изменения обновляется (для вытеснения)"""
+    try:
+        os.utime(pdf_path)
+        return True
+    except OSError:
+        return False
+
+def evict_reports(max_age_days=REPORT_CACHE_MAX_DAYS, max_bytes=REPORT_CACHE_MAX_BYTES):
+    """
+    Удаляет файлы кэша отчётов старше max_age_days и самые давние сверх max_bytes
+    суммарного размера; ссылки на них в истории печати очищаются в той же задаче.
+    Выполняется в потоке БД. Возвращает число удалённых файлов.
+    """
+    try:
+        entries = [
+            entry for entry in os.scandir(reports_dir())
+            if entry.is_file() and CACHE_FILE_RE.match(entry.name)
+        ]
+    except OSError:
+        return 0
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    cutoff = time.time() - max_age_days * 24 * 3600
+    total = sum(size for _, size, _ in files)
+    removed = []
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue   # файл открыт в программе просмотра — удалится в следующий раз
+        total -= size
+        removed.append(path)
+    if removed:
+        from src.db.database import forget_report_files   # при вызове: путь к БД берётся из APPDATA при импорте
+        forget_report_files(removed)
+    return len(removed)
+
+# --- Проверка: python -m src.pdf.report_cache ---
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["APPDATA"] = tmp
+        from src.db.database import init_db, add_print_history, get_print_history
+        init_db()
+        os.makedirs(reports_dir(), exist_ok=True)
+        vehicle = {"id": 7}
+        path = cached_report_path(vehicle, "a" * 64)
+        assert path == cached_report_path(vehicle, "a" * 64)
+        assert path != cached_report_path(vehicle, "b" * 64)
+        assert not use_cached_report(path)
+        now = time.time()
+        names = {}
+        for days, name in ((400, "old"), (10, "a"), (5, "b"), (1, "c")):
+            names[name] = cached_report_path(vehicle, name * 64)
+            with open(names[name], "wb") as f:
+                f.write(b"x" * 1000)
+            os.utime(names[name], (now - days * 24 * 3600,) * 2)
+        # Отчёт прежнего формата не вытесняется ни по возрасту, ни по размеру
+        legacy = os.path.join(reports_dir(), "report_20200101_120000_7.pdf")
+        with open(legacy, "wb") as f:
+            f.write(b"x" * 5000)
+        os.utime(legacy, (now - 1000 * 24 * 3600,) * 2)
+        add_print_history({"id": 7, "customer": "", "brand": "", "number": ""}, names["b"])
+        assert use_cached_report(names["a"])   # a — снова свежий
+        assert evict_reports(max_bytes=2500) == 2
+        left = sorted(os.listdir(reports_dir()))
+        assert left == sorted(os.path.basename(p) for p in (names["a"], names["c"], legacy)), left
+        entries = [e for e in get_print_history() if e["vehicle_id"] == 7]
+        assert [e["pdf_path"] for e in entries] == [None], entries
+        print("Кэш отчётов: проверка пройдена")
@@ -0,0 +1,23 @@
+from src.pdf.fonts import prewarm
+from src.pdf.report_generator import generate_pdf
+
+# --- Формирование PDF в процессе пула печати ---
+# Модуль не импортирует БД и Tk: на Windows процессы пула запускаются заново (spawn)
+# и загружают только то, что нужно для generate_pdf.
+# Отмена печати: счётчик отмен (multiprocessing.Value) общий для очереди и всех процессов
+# пула. Задание получает его значение на момент запуска и перед каждой строкой документа
+# сравнивает с текущим: изменилось — начатый документ прерывается PrintCancelled.
+
+_cancel_counter = None
+
+def init_worker(cancel_counter):
+    """Инициализатор процессов пула: счётчик отмен и заранее загруженные reportlab и шрифт"""
+    global _cancel_counter
+    _cancel_counter = cancel_counter
+    prewarm()
+
+def render(vehicle, lines, pdf_path, generation):
+    """Формирует документ задания; generation — значение счётчика отмен при запуске"""
+    return generate_pdf(
+        vehicle, lines, pdf_path=pdf_path, cancelled=lambda: _cancel_counter.value != generation
+    )
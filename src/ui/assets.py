@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+import threading
+from PIL import Image, ImageTk
+from src.utils.utils import resource_path
+
+# --- Общий кэш изображений интерфейса ---
+# Каждый файл декодируется один раз; уменьшенные копии (size) хранятся отдельно.
+# PhotoImage создаётся один раз на (файл, размер) и отдаётся всем страницам —
+# виджеты держат ссылку на общий объект, поэтому изображения не «утекают»
+# при перерисовке списков.
+# Уменьшенные копии сохраняются на диск (THUMBNAIL_DIR); ключ включает путь,
+# время изменения и размер исходного файла и целевой размер, поэтому изменённый
+# файл ресурса не подхватит устаревшую миниатюру.
+
+THUMBNAIL_DIR = os.path.join(os.getenv("APPDATA") or tempfile.gettempdir(), "Tandem", "thumbnails")
+RESAMPLE = Image.Resampling.LANCZOS
+
+class AssetCache:
+    def __init__(self, thumbnail_dir=THUMBNAIL_DIR):
+        self.thumbnail_dir = thumbnail_dir
+        self._images = {}   # (путь, размер) -> PIL.Image
+        self._photos = {}   # (путь, размер) -> ImageTk.PhotoImage
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    def image(self, relative_path, size=None):
+        """Декодированное изображение (PIL), при size — уменьшенное до (ширина, высота)"""
+        key = (relative_path, tuple(size) if size else None)
+        with self._lock:
+            image = self._images.get(key)
+        if image is not None:
+            return image
+        full_path = resource_path(relative_path)
+        if size:
+            image = self._load_thumbnail(full_path, key[1])
+        else:
+            with Image.open(full_path) as source:
+                source.load()
+                image = source.copy()
+        with self._lock:
+            return self._images.setdefault(key, image)
+
+    def photo(self, relative_path, size=None):
+        """
+        Общий PhotoImage для файла ресурса. Создаётся в главном потоке (нужен Tk).
+        Если файл не найден или не читается, исключение пробрасывается — страницы
+        в этом случае показывают текстовые кнопки.
+        """
+        key = (relative_path, tuple(size) if size else None)
+        photo = self._photos.get(key)
+        if photo is None:
+            photo = ImageTk.PhotoImage(self.image(relative_path, size))
+            self._photos[key] = photo
+        return photo
+
+    # ----- Миниатюры на диске -----
+    def _thumbnail_path(self, full_path, size):
+        stat = os.stat(full_path)
+        key = f"{os.path.abspath(full_path)}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}"
+        return os.path.join(self.thumbnail_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
+
+    def _load_thumbnail(self, full_path, size):
+        thumbnail_path = self._thumbnail_path(full_path, size)
+        try:
+            with Image.open(thumbnail_path) as cached:
+                cached.load()
+                self.disk_hits += 1
+                return cached.copy()
+        except (OSError, ValueError):
+            pass
+        self.disk_misses += 1
+        with Image.open(full_path) as source:
+            image = source.resize(size, RESAMPLE)
+        try:
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            # Запись во временный файл и замена: параллельный запуск не прочитает обрезанный PNG
+            tmp_path = f"{thumbnail_path}.{os.getpid()}.tmp"
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, thumbnail_path)
+        except OSError:
+            pass
+        return image
+
+    # ----- Статистика -----
+    def memory_usage(self):
+        """
+        Оценка занимаемой памяти: декодированные изображения (байт на пиксель по режиму)
+        и PhotoImage (Tk хранит 4 байта на пиксель).
+        """
+        with self._lock:
+            images = list(self._images.values())
+            photos = list(self._photos.values())
+        image_bytes = sum(image.width * image.height * len(image.getbands()) for image in images)
+        photo_bytes = sum(photo.width() * photo.height() * 4 for photo in photos)
+        return {
+            "images": len(images),
+            "image_bytes": image_bytes,
+            "photos": len(photos),
+            "photo_bytes": photo_bytes,
+            "total_bytes": image_bytes + photo_bytes,
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._photos.clear()
+
+# Один кэш на приложение
+assets = AssetCache()
+
+def get_photo(relative_path, size=None):
+    return assets.photo(relative_path, size)
+
+def get_image(relative_path, size=None):
+    return assets.image(relative_path, size)
+
+def asset_memory_usage():
+    return assets.memory_usage()
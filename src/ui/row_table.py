@@ -0,0 +1,114 @@
+import tkinter as tk
+import ttkbootstrap as ttk
+
+# --- Таблица строк ввода с пулом виджетов ---
+# Строка таблицы (номер, поля ввода, кнопка «X») создаётся один раз. Удалённая строка
+# не уничтожается, а убирается из grid (grid_remove) и попадает в пул; следующая
+# добавленная строка берётся из пула. Нумерация обновляется сменой текста метки,
+# без пересоздания виджетов. Удаление последней строки и добавление — O(1),
+# удаление из середины только переставляет последующие строки.
+# Привязки и валидация полей настраиваются один раз при создании виджета (setup_entry),
+# поэтому обработчики получают объект строки и читают её текущий индекс (row.index).
+
+class TableRow:
+    def __init__(self, label, entries, delete_button):
+        self.label = label
+        self.entries = entries
+        self.delete_button = delete_button
+        self.index = -1   # позиция в таблице; -1 — строка в пуле
+
+class RowTable:
+    def __init__(self, frame, entry_widths, setup_entry, on_delete, first_grid_row=1):
+        """
+        frame — контейнер с grid, строки выше first_grid_row заняты заголовками.
+        entry_widths — ширины полей (колонки 1..N); колонка 0 — номер, N+1 — кнопка удаления.
+        setup_entry(row, col, entry) — настройка поля при создании (привязки, валидация).
+        on_delete(row) — обработчик кнопки удаления строки.
+        """
+        self.frame = frame
+        self.entry_widths = entry_widths
+        self.setup_entry = setup_entry
+        self.on_delete = on_delete
+        self.first_grid_row = first_grid_row
+        self.rows = []      # показанные строки по порядку
+        self.entries = []   # поля показанных строк: entries[i] is rows[i].entries
+        self._pool = []     # скрытые строки для повторного использования
+        self.created = 0    # сколько строк создано за всё время (для проверки пула)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # ----- Добавление и удаление -----
+    def add(self):
+        row = self._pool.pop() if self._pool else self._create_row()
+        self.rows.append(row)
+        self.entries.append(row.entries)
+        self._place(row, len(self.rows) - 1)
+        return row
+
+    def delete(self, index):
+        row = self.rows.pop(index)
+        del self.entries[index]
+        self._hide(row)
+        for i in range(index, len(self.rows)):
+            self._place(self.rows[i], i)
+
+    def resize(self, count):
+        """Оставляет ровно count строк; лишние уходят в пул с конца таблицы"""
+        while len(self.rows) > count:
+            self.delete(len(self.rows) - 1)
+        while len(self.rows) < count:
+            self.add()
+
+    def load(self, values, minimum=1):
+        """
+        Заполнение таблицы за один проход: строк становится max(len(values), minimum),
+        поля строки получают значения по порядку, недостающие и None — пустую строку.
+        """
+        self.resize(max(len(values), minimum))
+        for i, row in enumerate(self.rows):
+            row_values = values[i] if i < len(values) else ()
+            for col, entry in enumerate(row.entries):
+                value = row_values[col] if col < len(row_values) else None
+                self.set_entry(entry, "" if value is None else value)
+
+    def clear(self, keep=1):
+        self.load([], minimum=keep)
+
+    @staticmethod
+    def set_entry(entry, value):
+        entry.delete(0, tk.END)
+        if value != "":
+            entry.insert(0, value)
+
+    # ----- Виджеты -----
+    def _create_row(self):
+        label = ttk.Label(self.frame, borderwidth=1, relief="solid", padding=5)
+        entries = [ttk.Entry(self.frame, width=width) for width in self.entry_widths]
+        delete_button = ttk.Button(self.frame, text="X", style="Delete.TButton", width=2)
+        row = TableRow(label, entries, delete_button)
+        delete_button.configure(command=lambda: self.on_delete(row))
+        for col, entry in enumerate(entries, 1):
+            self.setup_entry(row, col, entry)
+        self.created += 1
+        return row
+
+    def _place(self, row, index):
+        grid_row = self.first_grid_row + index
+        if row.index == index:
+            return
+        row.index = index
+        row.label.configure(text=str(index + 1))
+        row.label.grid(row=grid_row, column=0, sticky="nsew")
+        for col, entry in enumerate(row.entries, 1):
+            entry.grid(row=grid_row, column=col, sticky="nsew", padx=1, pady=1)
+        row.delete_button.grid(row=grid_row, column=len(row.entries) + 1, sticky="nsew", padx=1, pady=1)
+
+    def _hide(self, row):
+        row.index = -1
+        row.label.grid_remove()
+        for entry in row.entries:
+            entry.grid_remove()
+            entry.delete(0, tk.END)
+        row.delete_button.grid_remove()
+        self._pool.append(row)
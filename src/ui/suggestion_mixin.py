@@ -1,4 +1,91 @@
+import time
 import tkinter as tk
+from collections import deque
+from src.db.database import (
+    get_works, get_materials, get_catalog_field_values, get_catalog_generation, find_catalog_item,
+    get_line_usage_counts
+)
+from src.utils.suggestion_index import SuggestionIndex, DEFAULT_LIMIT as SUGGESTION_LIMIT
+
+# --- Подсказки: индекс по справочникам (src.utils.suggestion_index) ---
+# Индексы строятся в потоке БД (build_suggestion_indexes): при открытии страницы и после
+# сброса кэша справочников. Поиск в главном потоке идёт по последним готовым индексам,
+# пока новые не построены; до первой сборки подсказок нет.
+# Поле -> справочники и колонка, из которых берутся значения
+SUGGESTION_SOURCES = {
+    "work_name": (("works", "name"),),
+    "material_name": (("materials", "name"),),
+    "unit": (("works", "unit"), ("materials", "unit")),
+    "quantity": (("works", "quantity"), ("materials", "quantity")),
+    "price": (("works", "price"), ("materials", "price")),
+}
+# Частота использования названий в заказах: поле -> ключ get_line_usage_counts
+SUGGESTION_USAGE = {"work_name": "works", "material_name": "materials"}
+
+# Главный поток
+_suggestion_indexes = {}       # поле -> (значения справочников, по которым построен индекс, индекс)
+_suggestion_generation = None  # поколение кэша справочников, по которому построены индексы
+_suggestion_build_pending = False
+_session_uses = []             # [(поле, значение)] — подсказки, выбранные в этом сеансе
+# Поток БД
+_line_usage_counts = None
+
+def build_suggestion_indexes(previous_sources, session_uses):
+    """
+    Выполняется в потоке БД. Строит индексы полей, чьи значения справочников отличаются
+    от previous_sources (поле -> значения); частота — из заказов и session_uses.
+    Возвращает (поколение кэша справочников, {поле: (значения, индекс)}).
+    """
+    global _line_usage_counts
+    generation = get_catalog_generation()
+    built = {}
+    for field_type, columns in SUGGESTION_SOURCES.items():
+        sources = tuple(get_catalog_field_values(name, field) for name, field in columns)
+        if previous_sources.get(field_type) == sources:
+            continue
+        usage = {}
+        if field_type in SUGGESTION_USAGE:
+            if _line_usage_counts is None:
+                _line_usage_counts = get_line_usage_counts()
+            usage.update(_line_usage_counts[SUGGESTION_USAGE[field_type]])
+        for used_field, value in session_uses:
+            if used_field == field_type:
+                usage[value] = usage.get(value, 0) + 1
+        index = SuggestionIndex((value for values in sources for value in values), usage=usage)
+        index.prepare()
+        built[field_type] = (sources, index)
+    return generation, built
+
+def get_suggestions_for_field(field_type, text):
+    """До SUGGESTION_LIMIT подсказок: начало строки, начало слова, подстрока; частые — выше"""
+    entry = _suggestion_indexes.get(field_type)
+    if entry is None:
+        return []
+    return entry[1].search(text, SUGGESTION_LIMIT)
+
+def record_suggestion_use(field_type, value):
+    if field_type not in SUGGESTION_SOURCES:
+        return
+    _session_uses.append((field_type, value))
+    entry = _suggestion_indexes.get(field_type)
+    if entry is not None:
+        entry[1].record_use(value)
+
+# --- Всплывающий список подсказок ---
+# Одно окно подсказок на страницу: создаётся при первом показе, дальше только
+# показывается/скрывается, а содержимое списка заменяется на месте.
+# Поиск откладывается на SUGGESTION_DEBOUNCE_MS после последнего нажатия;
+# отложенный поиск, который обогнало новое нажатие, отменяется.
+SUGGESTION_DEBOUNCE_MS = 120
+SUGGESTION_BUDGET_MS = 5      # целевое время главного цикла на один поиск с отрисовкой
+SUGGESTION_STATS_SIZE = 200   # сколько последних замеров хранить
+SUGGESTION_HEIGHT = 150
+# Клавиши, которые не меняют текст и не должны запускать поиск
+NAVIGATION_KEYS = {
+    "Up", "Down", "Left", "Right", "Return", "KP_Enter", "Escape", "Tab", "ISO_Left_Tab",
+    "Home", "End", "Prior", "Next", "Shift_L", "Shift_R", "Control_L", "Control_R",
+    "Alt_L", "Alt_R", "Caps_Lock",
+}
 
 class SuggestionMixin:
     def bind_suggestion_events(self, entry, field_type, row, table_type):
@@ -8,7 +95,7 @@ class SuggestionMixin:
         entry.bind("<Return>", lambda e: self._on_suggestion_select(entry, field_type, row, table_type))
 
     def _suggestion_entry_down(self, entry, field_type, row, table_type):
-        if getattr(self, "suggestion_listbox", None):
+        if self._suggestions_visible():
             self.suggestion_listbox.focus_set()
             self.suggestion_listbox.selection_clear(0, tk.END)
             self.suggestion_listbox.selection_set(0)
@@ -20,38 +107,89 @@ class SuggestionMixin:
         if getattr(self, "_suppress_suggestions", False) and event.keysym == "Return":
             self._suppress_suggestions = False
             return
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        self.schedule_suggestions(entry, field_type, row, table_type)
+
+    # ----- Отложенный поиск -----
+    def schedule_suggestions(self, entry, field_type, row, table_type):
+        """Откладывает поиск до паузы во вводе; предыдущий отложенный поиск отменяется"""
+        self._cancel_pending_suggestions()
+        self._suggestion_seq = getattr(self, "_suggestion_seq", 0) + 1
+        seq = self._suggestion_seq
+        self._suggestion_after_id = self.root.after(
+            SUGGESTION_DEBOUNCE_MS,
+            lambda: self._run_suggestion_lookup(seq, entry, field_type, row, table_type),
+        )
+
+    def _cancel_pending_suggestions(self):
+        after_id = getattr(self, "_suggestion_after_id", None)
+        if after_id is not None:
+            try:
+                self.root.after_cancel(after_id)
+            except Exception:
+                pass
+            self._suggestion_after_id = None
+
+    def _run_suggestion_lookup(self, seq, entry, field_type, row, table_type):
+        self._suggestion_after_id = None
+        if seq != getattr(self, "_suggestion_seq", 0):
+            return  # после планирования было новое нажатие
+        start = time.perf_counter()
         self.show_suggestions(entry, field_type, row, table_type)
+        self._record_suggestion_latency((time.perf_counter() - start) * 1000)
 
     def show_suggestions(self, entry, field_type, row, table_type):
-        text = entry.get().lower().strip()
+        self.refresh_suggestion_indexes()
+        try:
+            if not entry.winfo_exists():
+                return
+            text = entry.get().lower().strip()
+        except tk.TclError:
+            return
         suggestions = self.get_suggestions_for_field(field_type, text)
-        self.hide_suggestions()
         if not suggestions:
+            self.hide_suggestions()
+            return
+
+        self._ensure_suggestion_popup()
+        self._suggestion_target = (entry, field_type, row, table_type)
+        listbox = self.suggestion_listbox
+        listbox.delete(0, tk.END)
+        listbox.insert(tk.END, *suggestions)
+        listbox.selection_set(0)
+        listbox.activate(0)
+        listbox.see(0)
+
+        entry_x = entry.winfo_rootx()
+        entry_y = entry.winfo_rooty() + entry.winfo_height()
+        entry_width = entry.winfo_width()
+        self.suggestion_toplevel.geometry(f"{entry_width}x{SUGGESTION_HEIGHT}+{entry_x}+{entry_y}")
+        if not self._suggestion_shown:
+            self.suggestion_toplevel.deiconify()
+            self._suggestion_shown = True
+        self.suggestion_toplevel.lift()
+
+    # ----- Окно подсказок (создаётся один раз) -----
+    def _ensure_suggestion_popup(self):
+        if getattr(self, "suggestion_toplevel", None) is not None:
             return
+        self._suggestion_target = None
+        self._suggestion_shown = False
 
         self.suggestion_toplevel = tk.Toplevel(self.root)
+        self.suggestion_toplevel.withdraw()
         self.suggestion_toplevel.overrideredirect(True)
-        self.suggestion_toplevel.lift()
         self.suggestion_toplevel.attributes("-topmost", True)
         self.suggestion_toplevel.transient(self.root)
 
         self.suggestion_listbox = tk.Listbox(self.suggestion_toplevel)
         self.suggestion_listbox.pack(fill=tk.BOTH, expand=True)
-        for s in suggestions:
-            self.suggestion_listbox.insert(tk.END, s)
-        self.suggestion_listbox.selection_set(0)
-        self.suggestion_listbox.activate(0)
-
-        entry_x = entry.winfo_rootx()
-        entry_y = entry.winfo_rooty() + entry.winfo_height()
-        entry_width = entry.winfo_width()
-        self.suggestion_toplevel.geometry(f"{entry_width}x150+{entry_x}+{entry_y}")
 
         # --- Контекстное меню
-        self.suggestion_listbox.bind("<Button-3>", lambda event: self._show_entry_context_menu(event, entry))
-        self.suggestion_listbox.bind("<Button-2>", lambda event: self._show_entry_context_menu(event, entry))
-        self.suggestion_toplevel.bind("<Button-3>", lambda event: self._show_entry_context_menu(event, entry))
-        self.suggestion_toplevel.bind("<Button-2>", lambda event: self._show_entry_context_menu(event, entry))
+        for widget in (self.suggestion_listbox, self.suggestion_toplevel):
+            widget.bind("<Button-3>", self._show_target_context_menu)
+            widget.bind("<Button-2>", self._show_target_context_menu)
 
         # --- SCROLL REDIRECT
         def redirect_scroll(event, direction=None):
@@ -74,15 +212,28 @@ class SuggestionMixin:
         self.suggestion_listbox.bind("<Button-4>", lambda e: redirect_scroll(e, -1))
         self.suggestion_listbox.bind("<Button-5>", lambda e: redirect_scroll(e, 1))
 
-        self.suggestion_listbox.bind("<Return>", lambda e: self._on_suggestion_select(entry, field_type, row, table_type))
+        self.suggestion_listbox.bind("<Return>", lambda e: self._on_target_select())
         self.suggestion_listbox.bind("<Escape>", lambda e: self.hide_suggestions())
-        self.suggestion_listbox.bind("<ButtonRelease-1>", lambda e: self._on_suggestion_select(entry, field_type, row, table_type))
+        self.suggestion_listbox.bind("<ButtonRelease-1>", lambda e: self._on_target_select())
         self.suggestion_listbox.bind("<Up>", lambda e: self._move_suggestion_selection(-1))
         self.suggestion_listbox.bind("<Down>", lambda e: self._move_suggestion_selection(1))
         self.suggestion_listbox.bind("<FocusOut>", lambda e: self.hide_suggestions())
 
-        self.root.bind("<Unmap>", self._on_root_unmap)
-        self.root.bind("<Map>", self._on_root_map)
+        self.root.bind("<Unmap>", self._on_root_unmap, add="+")
+        self.root.bind("<Map>", self._on_root_map, add="+")
+
+    def _suggestions_visible(self):
+        return getattr(self, "_suggestion_shown", False)
+
+    def _on_target_select(self):
+        target = getattr(self, "_suggestion_target", None)
+        if target is not None:
+            self._on_suggestion_select(*target)
+
+    def _show_target_context_menu(self, event):
+        target = getattr(self, "_suggestion_target", None)
+        if target is not None:
+            self._show_entry_context_menu(event, target[0])
 
     def _show_entry_context_menu(self, event, entry):
         self.hide_suggestions()
@@ -100,22 +251,24 @@ class SuggestionMixin:
         pass
 
     def _focus_suggestion_listbox(self):
-        if getattr(self, "suggestion_listbox", None):
+        if self._suggestions_visible():
             self.suggestion_listbox.focus_set()
 
     def hide_suggestions(self, event=None):
-        if getattr(self, "suggestion_toplevel", None):
-            try:
-                self.suggestion_toplevel.destroy()
-            except Exception:
-                pass
-            self.suggestion_toplevel = None
-            self.suggestion_listbox = None
+        self._cancel_pending_suggestions()
+        if not self._suggestions_visible():
+            return
+        try:
+            self.suggestion_toplevel.withdraw()
+        except Exception:
+            pass
+        self._suggestion_shown = False
+        self._suggestion_target = None
         if hasattr(self.root, 'event_generate'):
             self.root.event_generate("<<SuggestionClosed>>")
 
     def _on_suggestion_select(self, entry, field_type, row, table_type):
-        if self.suggestion_listbox is None:
+        if not self._suggestions_visible():
             return
         cur = self.suggestion_listbox.curselection()
         if cur:
@@ -123,12 +276,13 @@ class SuggestionMixin:
             entry.delete(0, tk.END)
             entry.insert(0, value)
             self.fill_row_by_suggestion(entry, field_type, value, row, table_type)
+            self.record_suggestion_use(field_type, value)
         self.hide_suggestions()
         entry.focus_set()
         self._suppress_suggestions = True
 
     def _move_suggestion_selection(self, direction):
-        if getattr(self, "suggestion_listbox", None):
+        if self._suggestions_visible():
             cur = self.suggestion_listbox.curselection()
             if cur:
                 idx = cur[0] + direction
@@ -142,23 +296,102 @@ class SuggestionMixin:
             self.suggestion_listbox.see(idx)
             return "break"
 
-    def fill_row_by_suggestion(self, entry, field_type, value, row, table_type):
+    # ----- Замеры времени главного цикла -----
+    def _record_suggestion_latency(self, elapsed_ms):
+        latencies = getattr(self, "_suggestion_latencies", None)
+        if latencies is None:
+            latencies = self._suggestion_latencies = deque(maxlen=SUGGESTION_STATS_SIZE)
+        latencies.append(elapsed_ms)
+
+    def get_suggestion_stats(self):
+        """
+        Время главного цикла на поиск и отрисовку подсказок по последним нажатиям:
+        {"count", "avg_ms", "p95_ms", "max_ms", "over_budget"} (over_budget — дольше SUGGESTION_BUDGET_MS).
+        """
+        latencies = sorted(getattr(self, "_suggestion_latencies", ()))
+        if not latencies:
+            return {"count": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "over_budget": 0}
+        return {
+            "count": len(latencies),
+            "avg_ms": sum(latencies) / len(latencies),
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "max_ms": latencies[-1],
+            "over_budget": sum(1 for value in latencies if value > SUGGESTION_BUDGET_MS),
+        }
+
+    # ----- Данные подсказок -----
+    def refresh_suggestion_indexes(self):
+        """
+        Если кэш справочников сбрасывался после сборки индексов, перестраивает их в потоке БД.
+        Проверка не обращается к БД — её можно делать на каждое нажатие.
+        """
+        global _suggestion_build_pending
+        if _suggestion_build_pending or _suggestion_generation == get_catalog_generation():
+            return
+        _suggestion_build_pending = True
+        uses_seen = len(_session_uses)
+        self.db.submit(
+            build_suggestion_indexes,
+            {field_type: entry[0] for field_type, entry in _suggestion_indexes.items()},
+            list(_session_uses),
+            on_done=lambda result: self._on_suggestion_indexes_built(result, uses_seen),
+            on_error=self._on_suggestion_indexes_error,
+        )
+
+    def _on_suggestion_indexes_built(self, result, uses_seen):
+        global _suggestion_build_pending, _suggestion_generation
+        _suggestion_build_pending = False
+        generation, built = result
+        for field_type, (sources, index) in built.items():
+            # Выбранное, пока индекс строился, в сборку не попало
+            for used_field, value in _session_uses[uses_seen:]:
+                if used_field == field_type:
+                    index.record_use(value)
+            _suggestion_indexes[field_type] = (sources, index)
+        _suggestion_generation = generation
+        self.refresh_suggestion_indexes()   # справочник успел измениться ещё раз
+
+    def _on_suggestion_indexes_error(self, error):
+        global _suggestion_build_pending, _suggestion_generation
+        _suggestion_build_pending = False
+        # Следующая попытка — после следующего сброса справочников, а не на каждое нажатие
+        _suggestion_generation = get_catalog_generation()
+        self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def get_works(self):
+        return get_works()
+
+    def get_materials(self):
+        return get_materials()
+
+    def get_suggestions_for_field(self, field_type, text):
+        return get_suggestions_for_field(field_type, text)
+
+    def record_suggestion_use(self, field_type, value):
+        record_suggestion_use(field_type, value)
+
+    def _suggestion_row_entries(self, table_type):
         if table_type == "vehicle_works":
-            items = self.get_works()
-            entries = self.work_entries
-            fill_map = {"unit": 1, "price": 3}
-        elif table_type == "vehicle_materials":
-            items = self.get_materials()
-            entries = self.parts_entries
-            fill_map = {"unit": 1, "price": 3}
-        else:
+            return getattr(self, "work_entries", [])
+        if table_type == "vehicle_materials":
+            # AddPage хранит строки материалов в parts_entries, ProcessesPage — в material_entries
+            return getattr(self, "parts_entries", None) or getattr(self, "material_entries", [])
+        return None
+
+    def fill_row_by_suggestion(self, entry, field_type, value, row, table_type):
+        catalog = {"vehicle_works": "works", "vehicle_materials": "materials"}.get(table_type)
+        entries = self._suggestion_row_entries(table_type)
+        if catalog is None or entries is None:
             return
+        fill_map = {"unit": 1, "price": 3}
+        # Строки из RowTable передаются объектом: берём их текущую позицию
+        row = getattr(row, "index", row)
         if not (0 <= row < len(entries)):
             return
-        for item in items:
-            if item["name"] == value:
-                for key, idx in fill_map.items():
-                    if len(entries[row]) > idx:
-                        entries[row][idx].delete(0, tk.END)
-                        entries[row][idx].insert(0, item.get(key, ""))
-                break
\ No newline at end of file
+        item = find_catalog_item(catalog, value)
+        if item is None:
+            return
+        for key, idx in fill_map.items():
+            if len(entries[row]) > idx:
+                entries[row][idx].delete(0, tk.END)
+                entries[row][idx].insert(0, item.get(key, ""))
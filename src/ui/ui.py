@@ -1,24 +1,24 @@
 import os
-import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from src.db.database import (
     init_db,
-    get_all_vehicles,
-    add_print_history,
-    get_materials_and_works,
-    get_vehicle_by_id,
+    close_connections,
+    close_thread_connection,
+    get_works,
+    get_materials,
 )
-from src.pdf.report_generator import generate_pdf
+from src.db.executor import DbExecutor
+from src.pdf.print_queue import PrintQueue, open_pdf
 from pages.add_page import AddPage
 from pages.results_page import ResultsPage
 from pages.history_page import HistoryPage
 from pages.processes import ProcessesPage
 from tkinter import messagebox
-from PIL import Image, ImageTk
 import tkinter as tk
-from src.utils.utils import resource_path
-import subprocess
+from src.ui.assets import get_photo
+
+BUSY_INDICATOR_DELAY_MS = 200  # короткие запросы не мигают индикатором
 
 class UI:
     def __init__(self):
@@ -29,10 +29,8 @@ class UI:
         self.current_canvas = None
 
         # Установка иконки окна
-        icon_path = resource_path(r"Tandem/assets/icon.png")
         try:
-            icon_image = Image.open(icon_path)
-            icon = ImageTk.PhotoImage(icon_image)
+            icon = get_photo(r"Tandem/assets/icon.png")
             self.root.iconphoto(True, icon)
             self.icon = icon
         except Exception:
@@ -46,16 +44,8 @@ class UI:
         self.logo_frame.pack(fill="x", pady=10)
         self.logo_frame.update()
 
-        logo_path = resource_path(r"Tandem/assets/logo.png")
-        logo_active_path = resource_path(r"Tandem/assets/logo_active.png")
-        try:
-            logo_image = Image.open(logo_path)
-            logo_active_image = Image.open(logo_active_path)
-            logo_width, logo_height = 190, 32
-            container_width, container_height = 200, 40
-        except Exception:
-            logo_width, logo_height = 190, 32
-            container_width, container_height = 200, 40
+        logo_width, logo_height = 190, 32
+        container_width, container_height = 200, 40
 
         logo_container = ttk.Frame(
             self.logo_frame,
@@ -68,8 +58,8 @@ class UI:
         logo_container.update()
 
         try:
-            self.logo_image = ImageTk.PhotoImage(logo_image)
-            self.logo_active_image = ImageTk.PhotoImage(logo_active_image)
+            self.logo_image = get_photo(r"Tandem/assets/logo.png")
+            self.logo_active_image = get_photo(r"Tandem/assets/logo_active.png")
 
             self.logo_label = ttk.Label(
                 logo_container,
@@ -100,9 +90,27 @@ class UI:
             ).pack(anchor="center")
 
         init_db()
+        # Все обращения страниц к БД идут через фоновый поток
+        self.db = DbExecutor(self.root)
+        self._busy_after_id = None
+        self.busy_label = tk.Label(
+            self.logo_frame, text="Загрузка…", background="#FFFFFF", foreground="gray"
+        )
+        self.db.add_busy_listener(self._on_db_busy)
+        # Справочники для подсказок загружаются заранее, пока строится интерфейс
+        self.db.submit(get_works)
+        self.db.submit(get_materials)
+
+        # Печать — через очередь print_jobs; ход печати — в строке состояния
+        self.printer = PrintQueue(self.root, self.db)
+        self.printer.add_listener(self._on_print_event)
+        self._printed_count = 0
+        self._history_refresh_id = None
 
         self.create_frames()
+        self.create_status_bar()
         self.show_results()
+        self.printer.start()
 
         # Прокрутка для Canvas
         self.root.bind_all("<MouseWheel>", self.on_mousewheel)
@@ -112,6 +120,10 @@ class UI:
         self.root.update()
         self.root.state("normal")
         self.root.mainloop()
+        self.printer.shutdown()
+        # Незавершённые записи выполняются до выхода; соединение потока БД закрывает сам поток
+        self.db.shutdown(finalizer=close_thread_connection)
+        close_connections()
 
     def configure_styles(self):
         self.style.configure(
@@ -166,6 +178,22 @@ class UI:
 
         self.current_vehicle_id = None
 
+    def _on_db_busy(self, busy):
+        if busy:
+            if self._busy_after_id is None:
+                self._busy_after_id = self.root.after(BUSY_INDICATOR_DELAY_MS, self._show_busy)
+            return
+        if self._busy_after_id is not None:
+            self.root.after_cancel(self._busy_after_id)
+            self._busy_after_id = None
+        self.root.configure(cursor="")
+        self.busy_label.place_forget()
+
+    def _show_busy(self):
+        self._busy_after_id = None
+        self.root.configure(cursor="watch")
+        self.busy_label.place(relx=1.0, x=-20, rely=0.5, anchor="e")
+
     def create_frames(self):
         self.main_frame = ttk.Frame(self.root, style="NoBorder.TFrame")
         self.main_frame.pack(fill="both", expand=True)
@@ -180,6 +208,67 @@ class UI:
         self.history_page = HistoryPage(self)
         self.processes_page = ProcessesPage(self)
 
+    def create_status_bar(self):
+        """Строка состояния печати: показывается, пока есть задания"""
+        self.status_bar = ttk.Frame(self.root, style="NoBorder.TFrame")
+        self.status_label = ttk.Label(self.status_bar, text="", style="Custom.TLabel")
+        self.status_label.pack(side=LEFT, padx=10, pady=4)
+        self.print_progress = ttk.Progressbar(self.status_bar, mode="determinate", length=240)
+        self.print_progress.pack(side=LEFT, padx=10, pady=4)
+        ttk.Button(
+            self.status_bar, text="Отмена", command=self.printer.cancel_pending
+        ).pack(side=LEFT, padx=10, pady=4)
+
+    def _on_print_event(self, event, data):
+        if event == "printed":
+            self._printed_count += len(data)
+            self._schedule_history_refresh()
+        elif event == "failed":
+            self._printed_count += 1
+            vehicle, error, in_batch = data
+            if not in_batch:   # ошибки пакета выводятся в его итоге
+                messagebox.showerror(
+                    "Ошибка", f"Не удалось создать PDF (заявка № {vehicle.get('contract_number', '')}): {error}"
+                )
+        elif event == "open":
+            self._open_printed(data)
+        self._update_status_bar()
+
+    def _update_status_bar(self):
+        pending = self.printer.queued + self.printer.running
+        if not pending:
+            self._printed_count = 0
+            self.status_bar.pack_forget()
+            return
+        if not self.status_bar.winfo_ismapped():
+            self.status_bar.pack(side=BOTTOM, fill="x", before=self.main_frame)
+        total = self._printed_count + pending
+        self.status_label.configure(
+            text=f"Печать: {self._printed_count} из {total} "
+                 f"(формируется: {self.printer.running}, в очереди: {self.printer.queued})"
+        )
+        self.print_progress.configure(maximum=total, value=self._printed_count)
+
+    def _schedule_history_refresh(self):
+        # Пакет из сотен документов обновляет историю один раз, а не на каждый файл
+        if self._history_refresh_id is None:
+            self._history_refresh_id = self.root.after(500, self._refresh_history)
+
+    def _refresh_history(self):
+        self._history_refresh_id = None
+        self.history_page.update_history()
+
+    def _open_printed(self, pdf_path):
+        try:
+            open_pdf(pdf_path)
+        except Exception as e:
+            messagebox.showwarning(
+                "Предупреждение",
+                f"Не удалось открыть PDF: {e}\n"
+                f"Файл сохранен по пути: {pdf_path}\n"
+                "Пожалуйста, откройте его вручную.",
+            )
+
     def on_mousewheel(self, event):
         if self.current_canvas and isinstance(self.current_canvas, tk.Canvas):
             self.current_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
@@ -197,7 +286,7 @@ class UI:
     def show_results(self):
         self.hide_all_frames()
         self.results_frame.pack(fill="both", expand=True)
-        self.results_page.update_results()
+        self.results_page.update_results(keep_position=True)
         self.results_page.set_active_button(None)
 
     def show_add(self, clear=True):
@@ -239,33 +328,29 @@ class UI:
         if hasattr(self.add_page, "load_vehicle"):
             self.add_page.load_vehicle(vehicle_id)
 
-    def print_vehicle(self, vehicle_id):
-        try:
-            vehicle = get_vehicle_by_id(vehicle_id)
-            if not vehicle:
-                messagebox.showerror("Ошибка", "Транспортное средство не найдено.")
-                return
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные ТС: {e}")
+    def print_vehicle(self, vehicle_id, open_when_done=True):
+        """Ставит заказ в очередь печати; готовый PDF открывается"""
+        self.printer.enqueue(
+            vehicle_id, open_when_done=open_when_done,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось поставить в очередь печати: {e}"),
+        )
+
+    def print_batch(self, vehicle_ids=None, date_from=None, date_to=None):
+        """Пакетная печать выбранных ТС или заказов за период"""
+        self.printer.enqueue_batch(
+            vehicle_ids, date_from, date_to,
+            on_done=self._on_batch_ready,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось поставить заказы в очередь: {e}"),
+        )
+
+    def _on_batch_ready(self, result):
+        if not result.total:
+            messagebox.showinfo("Информация", "Нет заказов для печати.")
             return
-        try:
-            materials_and_works = get_materials_and_works(vehicle_id)
-            pdf_path = generate_pdf(vehicle, materials_and_works)
-            add_print_history(vehicle, pdf_path)
-            try:
-                if sys.platform.startswith("win"):
-                    os.startfile(pdf_path)
-                elif sys.platform.startswith("darwin"):
-                    subprocess.run(["open", pdf_path])
-                else:
-                    subprocess.run(["xdg-open", pdf_path])
-            except Exception as e:
-                messagebox.showwarning(
-                    "Предупреждение",
-                    f"Не удалось открыть PDF: {e}\n"
-                    f"Файл сохранен по пути: {pdf_path}\n"
-                    "Пожалуйста, откройте его вручную.",
-                )
-            self.history_page.update_history()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось создать PDF: {e}")
\ No newline at end of file
+        summary = result.summary()
+        if result.printed:
+            summary += f"\nФайлы сохранены в папке: {os.path.dirname(result.printed[0][1])}"
+        if result.failed:
+            vehicle, error = result.failed[0]
+            summary += f"\nПервая ошибка (заявка № {vehicle.get('contract_number', '')}): {error}"
+        messagebox.showinfo("Пакетная печать", summary)
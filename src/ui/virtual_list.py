@@ -0,0 +1,164 @@
+import math
+
+# --- Виртуальный список для Canvas ---
+# Виджеты создаются только для видимых строк и небольшого запаса (overscan) сверху и снизу.
+# При прокрутке те же виджеты переставляются на новые позиции и заполняются данными
+# других строк, поэтому число виджетов не зависит от длины списка.
+# Данные запрашиваются по индексу (get_item) только для строк, попавших в окно;
+# on_near_end позволяет догружать следующую страницу, когда до конца осталось мало строк.
+# Если задан key, виджет закрепляется за ключом строки: при обновлении данных строка,
+# оставшаяся в окне, только переставляется (moved) или перезаполняется при изменении
+# (changed), а виджеты остальных строк не трогаются.
+
+DEFAULT_OVERSCAN = 3
+
+class VirtualList:
+    def __init__(self, canvas, scrollbar, row_height, create_row, update_row,
+                 overscan=DEFAULT_OVERSCAN, key=None):
+        """
+        canvas, scrollbar — уже размещённые виджеты; строки создаются как окна canvas.
+        create_row(parent) -> виджет строки; update_row(widget, item, index) — заполнение.
+        key(item) — постоянный ключ строки (например, id); без него ключом служит индекс.
+        """
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.row_height = row_height
+        self.create_row = create_row
+        self.update_row = update_row
+        self.overscan = overscan
+        self.key = key
+        self.count = 0
+        self.get_item = None
+        self.on_near_end = None
+        self._pool = []        # [(виджет, id окна на canvas)]
+        self._bound = {}       # позиция в пуле -> (индекс, ключ, данные) показанной строки
+        self.last_changes = {"added": 0, "removed": 0, "changed": 0, "moved": 0}
+        self._empty_text_id = None
+        self._width = 0
+        self._near_end_pending = False
+
+        self.canvas.configure(yscrollcommand=self._on_yscroll, yscrollincrement=max(1, row_height // 4))
+        self.scrollbar.configure(command=self.canvas.yview)
+        self.canvas.bind("<Configure>", self._on_configure, add="+")
+
+    # ----- Данные -----
+    def set_source(self, count, get_item, on_near_end=None, keep_position=False):
+        """
+        Новый источник данных. Виджеты строк с теми же ключами и данными не перезаполняются.
+        По умолчанию список прокручивается в начало.
+        """
+        self.get_item = get_item
+        self.on_near_end = on_near_end
+        if self.key is None:
+            self._bound = {}
+        self.set_count(count)
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+            self.render()
+
+    def set_count(self, count):
+        """Изменилось число строк (например, догружена страница); позиция прокрутки сохраняется"""
+        self.count = count
+        self.canvas.configure(scrollregion=(0, 0, self._width, count * self.row_height))
+        self.render()
+
+    def set_empty_text(self, text, **options):
+        if self._empty_text_id is not None:
+            self.canvas.delete(self._empty_text_id)
+            self._empty_text_id = None
+        if text:
+            self._empty_text_id = self.canvas.create_text(
+                max(self._width, 1) // 2, 30, text=text, anchor="n", **options
+            )
+
+    # ----- Отрисовка -----
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            for _, window_id in self._pool:
+                self.canvas.itemconfigure(window_id, width=event.width)
+            self.canvas.configure(scrollregion=(0, 0, self._width, self.count * self.row_height))
+            if self._empty_text_id is not None:
+                self.canvas.coords(self._empty_text_id, event.width // 2, 30)
+        self.render()
+
+    def visible_range(self):
+        """Индексы строк [first, last), для которых нужны виджеты"""
+        height = self.canvas.winfo_height()
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height) - self.overscan)
+        last = min(self.count, int(math.ceil((top + height) / self.row_height)) + self.overscan)
+        return first, max(first, last)
+
+    def render(self):
+        if self.get_item is None:
+            return
+        first, last = self.visible_range()
+        needed = last - first
+        while len(self._pool) < needed:
+            widget = self.create_row(self.canvas)
+            window_id = self.canvas.create_window(
+                0, -self.row_height, window=widget, anchor="nw",
+                width=self._width or None, height=self.row_height,
+            )
+            self._pool.append((widget, window_id))
+
+        changes = {"added": 0, "removed": 0, "changed": 0, "moved": 0}
+        # Сначала строки, чей ключ уже показан каким-то виджетом: виджет остаётся за ними
+        slot_by_key = {bound[1]: slot for slot, bound in self._bound.items() if bound is not None}
+        rows = []
+        claimed = set()
+        for index in range(first, last):
+            item = self.get_item(index)
+            key = self.key(item) if self.key is not None else index
+            slot = slot_by_key.get(key)
+            if slot is not None and slot in claimed:
+                slot = None
+            if slot is not None:
+                claimed.add(slot)
+            rows.append((index, key, item, slot))
+        # Остальным строкам — свободные виджеты
+        free = [slot for slot in range(len(self._pool)) if slot not in claimed]
+        for index, key, item, slot in rows:
+            if slot is None:
+                slot = free.pop()
+                bound = None
+            else:
+                bound = self._bound.get(slot)
+            widget, window_id = self._pool[slot]
+            if bound is None:
+                self.update_row(widget, item, index)
+                self.canvas.coords(window_id, 0, index * self.row_height)
+                changes["added"] += 1
+            else:
+                if bound[2] != item:
+                    self.update_row(widget, item, index)
+                    changes["changed"] += 1
+                if bound[0] != index:
+                    self.canvas.coords(window_id, 0, index * self.row_height)
+                    changes["moved"] += 1
+            self._bound[slot] = (index, key, item)
+        for slot in free:
+            if self._bound.get(slot) is not None:
+                self.canvas.coords(self._pool[slot][1], 0, -self.row_height * 2)
+                self._bound[slot] = None
+                changes["removed"] += 1
+        if any(changes.values()):
+            self.last_changes = changes
+
+        if self.on_near_end is not None and last >= self.count - self.overscan and not self._near_end_pending:
+            # Догрузка — вне текущей отрисовки, чтобы set_count не вызывался изнутри render
+            self._near_end_pending = True
+            self.canvas.after_idle(self._call_near_end)
+
+    def _call_near_end(self):
+        self._near_end_pending = False
+        if self.on_near_end is not None:
+            self.on_near_end()
+
+    def widget_count(self):
+        return len(self._pool)
@@ -0,0 +1,334 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+
+# --- Индекс подсказок автодополнения ---
+# Значения (названия работ/материалов, единицы, цены) индексируются один раз:
+#   - отсортированный список ключей — совпадения с начала строки (bisect);
+#   - отсортированный список «хвостов» от начала каждого слова — совпадения с начала слова;
+#   - триграммы -> множество значений — совпадения внутри слова.
+# Выдача ограничена limit и упорядочена: начало строки, начало слова, подстрока;
+# внутри группы — сначала часто используемые значения, затем по алфавиту.
+# Совпадения с начала строки и слова — непрерывный диапазон отсортированного списка.
+# Список разбит на блоки по _BLOCK_SIZE записей, каждый блок хранит свои записи,
+# упорядоченные по частоте (_UsageBlocks); лучшие limit значений диапазона — слияние
+# блоков, а не сортировка всего диапазона. Стоимость запроса зависит от limit и числа
+# блоков, а не от размера справочника или числа используемых значений.
+
+DEFAULT_LIMIT = 30
+_BULK_THRESHOLD = 64  # больше добавлений за раз — вставка без insort с одной сортировкой
+_DENSE_RATIO = 16  # кандидатов больше 1/16 справочника — выбираем проходом по алфавиту
+_BLOCK_SIZE = 64
+_MAX_CHAR = "\U0010ffff"
+_WORD_START_RE = re.compile(r"(?<!\w)\w")
+
+def normalize(text):
+    return str(text or "").strip().casefold()
+
+def _word_starts(key):
+    """Позиции начала слов, кроме нулевой (она покрыта совпадением с начала строки)"""
+    return [m.start() for m in _WORD_START_RE.finditer(key) if m.start() > 0]
+
+def _trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+class _UsageBlocks:
+    """
+    Порядок по частоте для отсортированного списка [(ключ, значение)]: блоки по
+    _BLOCK_SIZE записей, записи блока — по rank(значение). Блоки строятся при первом
+    запросе после изменения списка; изменение частоты значения пересортировывает
+    только его блоки (touch).
+    """
+
+    def __init__(self, items, rank):
+        self.items = items
+        self.rank = rank
+        self._blocks = None
+
+    def invalidate(self):
+        self._blocks = None
+
+    def _block(self, start):
+        return sorted(
+            self.rank(value) + (value,) for _, value in self.items[start:start + _BLOCK_SIZE]
+        )
+
+    def prepare(self):
+        if self._blocks is None:
+            self._blocks = [self._block(start) for start in range(0, len(self.items), _BLOCK_SIZE)]
+
+    def touch(self, item):
+        if self._blocks is None:
+            return
+        pos = bisect_left(self.items, item)
+        if pos < len(self.items) and self.items[pos] == item:
+            block = pos // _BLOCK_SIZE
+            self._blocks[block] = self._block(block * _BLOCK_SIZE)
+
+    def ranked(self, lo, hi):
+        """Значения items[lo:hi] в порядке rank (лениво: берётся столько, сколько нужно)"""
+        if hi - lo <= 2 * _BLOCK_SIZE:
+            return (entry[-1] for entry in sorted(self.rank(value) + (value,) for _, value in self.items[lo:hi]))
+        self.prepare()
+        first = -(-lo // _BLOCK_SIZE)
+        last = hi // _BLOCK_SIZE
+        # Неполные блоки по краям диапазона сортируются отдельно, полные берутся готовыми
+        edges = sorted(
+            self.rank(value) + (value,)
+            for _, value in self.items[lo:first * _BLOCK_SIZE] + self.items[last * _BLOCK_SIZE:hi]
+        )
+        merged = heapq.merge(edges, *self._blocks[first:last])
+        return (entry[-1] for entry in merged)
+
+class SuggestionIndex:
+    def __init__(self, values=(), usage=None):
+        self._keys = {}           # значение -> нормализованный ключ
+        self._prefixes = []       # [(ключ, значение)]
+        self._word_suffixes = []  # [(хвост ключа от начала слова, значение)]
+        self._grams = {}          # триграмма -> {значение}
+        self._short = set()       # значения короче трёх символов (без триграмм)
+        self._usage = {}          # значение -> число использований
+        for value, count in (usage or {}).items():
+            if count:
+                self._usage[value] = count
+        self._prefix_blocks = _UsageBlocks(self._prefixes, self._rank)
+        self._word_blocks = _UsageBlocks(self._word_suffixes, self._rank)
+        self.update(values)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, value):
+        return value in self._keys
+
+    def _rank(self, value):
+        """Порядок внутри группы выдачи: чаще используемые, затем по алфавиту"""
+        return (-self._usage.get(value, 0), self._keys[value])
+
+    # --- Изменение индекса ---
+    def update(self, values):
+        """Приводит индекс к набору values, добавляя и удаляя только изменившиеся значения"""
+        values = {value for value in values if normalize(value)}
+        for value in [value for value in self._keys if value not in values]:
+            self.remove(value)
+        added = [value for value in values if value not in self._keys]
+        if len(added) > _BULK_THRESHOLD:
+            # Массовое добавление: дописать в конец и отсортировать один раз
+            for value in added:
+                self._index(value, self._prefixes.append, self._word_suffixes.append)
+            self._prefixes.sort()
+            self._word_suffixes.sort()
+        else:
+            for value in added:
+                self.add(value)
+
+    def prepare(self):
+        """Строит блоки порядка по частоте заранее (например, в фоновом потоке)"""
+        self._prefix_blocks.prepare()
+        self._word_blocks.prepare()
+
+    def add(self, value):
+        if not normalize(value) or value in self._keys:
+            return
+        self._index(
+            value,
+            lambda item: insort(self._prefixes, item),
+            lambda item: insort(self._word_suffixes, item),
+        )
+
+    def _index(self, value, add_prefix, add_word_suffix):
+        key = normalize(value)
+        self._keys[value] = key
+        add_prefix((key, value))
+        for pos in _word_starts(key):
+            add_word_suffix((key[pos:], value))
+        if len(key) < 3:
+            self._short.add(value)
+        for gram in _trigrams(key):
+            self._grams.setdefault(gram, set()).add(value)
+        self._prefix_blocks.invalidate()
+        self._word_blocks.invalidate()
+
+    def remove(self, value):
+        key = self._keys.pop(value, None)
+        if key is None:
+            return
+        self._short.discard(value)
+        self._remove_sorted(self._prefixes, (key, value))
+        for pos in _word_starts(key):
+            self._remove_sorted(self._word_suffixes, (key[pos:], value))
+        for gram in _trigrams(key):
+            bucket = self._grams.get(gram)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del self._grams[gram]
+        self._prefix_blocks.invalidate()
+        self._word_blocks.invalidate()
+
+    @staticmethod
+    def _remove_sorted(items, item):
+        pos = bisect_left(items, item)
+        if pos < len(items) and items[pos] == item:
+            del items[pos]
+
+    def record_use(self, value, count=1):
+        """Учитывает выбор значения пользователем (влияет на порядок выдачи)"""
+        self._usage[value] = self._usage.get(value, 0) + count
+        key = self._keys.get(value)
+        if key is None:
+            return
+        self._prefix_blocks.touch((key, value))
+        for pos in _word_starts(key):
+            self._word_blocks.touch((key[pos:], value))
+
+    # --- Поиск ---
+    def search(self, text, limit=DEFAULT_LIMIT):
+        query = normalize(text)
+        result = []
+        seen = set()
+
+        def take(values):
+            for value in values:
+                if value not in seen:
+                    seen.add(value)
+                    result.append(value)
+                    if len(result) >= limit:
+                        return True
+            return False
+
+        if not query:
+            take(self._prefix_blocks.ranked(0, len(self._prefixes)))
+            return result
+        # Значения предыдущих групп встречаются снова — count с запасом на уже выданные
+        for matches in (self._prefix_matches, self._word_start_matches, self._substring_matches):
+            if take(matches(query, limit + len(result))):
+                return result
+        return result
+
+    def _prefix_matches(self, query, count):
+        lo = bisect_left(self._prefixes, (query,))
+        hi = bisect_left(self._prefixes, (query + _MAX_CHAR,), lo)
+        return self._prefix_blocks.ranked(lo, hi)
+
+    def _word_start_matches(self, query, count):
+        lo = bisect_left(self._word_suffixes, (query,))
+        hi = bisect_left(self._word_suffixes, (query + _MAX_CHAR,), lo)
+        return self._word_blocks.ranked(lo, hi)
+
+    def _substring_matches(self, query, count):
+        candidates = self._substring_candidates(query)
+        if len(candidates) * _DENSE_RATIO > len(self._prefixes):
+            # Совпадений много: по алфавитному списку они встречаются часто,
+            # первые count находятся без сортировки всех кандидатов (частота не учитывается —
+            # до этой группы доходит только запрос, почти не совпавший с началом слов)
+            return (value for key, value in self._prefixes if value in candidates and query in key)
+        return (
+            entry[-1]
+            for entry in heapq.nsmallest(
+                count,
+                (self._rank(value) + (value,) for value in candidates if query in self._keys[value]),
+            )
+        )
+
+    def _substring_candidates(self, query):
+        """Значения, которые могут содержать query (по триграммам)"""
+        if len(query) >= 3:
+            buckets = sorted((self._grams.get(gram, ()) for gram in _trigrams(query)), key=len)
+            if not buckets[0]:
+                return set()
+            return set(buckets[0]).intersection(*buckets[1:])
+        # Один-два символа: объединение триграмм, содержащих запрос, и короткие значения
+        candidates = {value for value in self._short if query in self._keys[value]}
+        for gram, bucket in self._grams.items():
+            if query in gram:
+                candidates |= bucket
+        return candidates
+
+# --- Бенчмарк: python -m src.utils.suggestion_index ---
+if __name__ == "__main__":
+    import gc
+    import random
+    import time
+
+    random.seed(7)
+    verbs = ["Замена", "Ремонт", "Диагностика", "Заправка", "Проверка", "Чистка", "Установка"]
+    parts = ["сальника", "компрессора", "конденсатора", "радиатора", "датчика", "шкива", "муфты", "фильтра"]
+    brands = ["Denso", "Sanden", "Valeo", "Thermo King", "Carrier", "Webasto"]
+
+    def make_items(count):
+        return [
+            f"{random.choice(verbs)} {random.choice(parts)} {random.choice(brands)} {i}"
+            for i in range(count)
+        ]
+
+    def linear(items, text):
+        # Прежний алгоритм: lower() каждого названия на каждый запрос, без ранжирования
+        text = text.lower()
+        return [name for name in items if not text or text in name.lower()]
+
+    def reference(index, text, limit=DEFAULT_LIMIT):
+        # Полный перебор с тем же порядком выдачи — для проверки
+        query = normalize(text)
+        def tier(key):
+            if key.startswith(query):
+                return 0
+            if any(key.startswith(query, pos) for pos in _word_starts(key)):
+                return 1
+            return 2
+        matches = [value for value, key in index._keys.items() if query in key]
+        return sorted(matches, key=lambda value: (tier(index._keys[value]),) + index._rank(value))[:limit]
+
+    queries = ["", "з", "зам", "замена сал", "denso", "ком", "king", "ессор", "123"]
+    checked = make_items(3000)
+    check_index = SuggestionIndex(checked, usage={name: random.randint(0, 20) for name in checked[:2500]})
+    for query in queries + ["сальника den", "ора ther", "zz"]:
+        if len(check_index._substring_candidates(normalize(query))) * _DENSE_RATIO > len(check_index):
+            continue   # плотная группа «подстрока» выдаётся по алфавиту, без учёта частоты
+        assert check_index.search(query) == reference(check_index, query), query
+    check_index.record_use(checked[2999], 100)
+    assert check_index.search("")[0] == checked[2999]
+
+    for size in (1000, 10000, 50000):
+        items = make_items(size)
+        for label, usage in (
+            ("без частот", {}),
+            ("частоты у 90%", {name: random.randint(1, 50) for name in items[: size * 9 // 10]}),
+        ):
+            start = time.perf_counter()
+            index = SuggestionIndex(items, usage=usage)
+            index.prepare()
+            build_ms = (time.perf_counter() - start) * 1000
+            # Без этого худший замер — полная сборка мусора по всем объектам процесса, а не поиск
+            gc.collect()
+            gc.freeze()
+
+            rounds = 50
+            start = time.perf_counter()
+            worst_ms = 0
+            for _ in range(rounds):
+                for query in queries:
+                    query_start = time.perf_counter()
+                    index.search(query)
+                    worst_ms = max(worst_ms, (time.perf_counter() - query_start) * 1000)
+            index_ms = (time.perf_counter() - start) * 1000 / (rounds * len(queries))
+
+            start = time.perf_counter()
+            index.record_use(items[3])
+            use_ms = (time.perf_counter() - start) * 1000
+
+            print(
+                f"{size:6d} значений, {label:13s}: построение {build_ms:8.1f} мс, запрос {index_ms:6.3f} мс "
+                f"(худший {worst_ms:6.3f} мс), выбор значения {use_ms:5.2f} мс"
+            )
+
+        start = time.perf_counter()
+        for _ in range(5):
+            for query in queries:
+                linear(items, query)
+        linear_ms = (time.perf_counter() - start) * 1000 / (5 * len(queries))
+
+        start = time.perf_counter()
+        index.update(items[100:] + make_items(100))
+        update_ms = (time.perf_counter() - start) * 1000
+        print(f"{size:6d} значений: линейный поиск {linear_ms:7.3f} мс, обновление ±100 {update_ms:6.1f} мс")
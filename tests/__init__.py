@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# src.db.database берёт путь к БД из APPDATA при импорте: тесты не должны трогать
+# рабочую базу пользователя, поэтому каталог подменяется до импорта модулей проекта
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="tandem-tests-")
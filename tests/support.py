@@ -0,0 +1,13 @@
+import os
+import tempfile
+from src.db import database as db
+from src.db.connection import ConnectionManager
+
+def fresh_database():
+    """Переключает src.db.database на новую пустую БД во временном каталоге и создаёт схему"""
+    db.close_connections()
+    path = os.path.join(tempfile.mkdtemp(prefix="tandem-db-", dir=os.environ["APPDATA"]), "database.db")
+    db._manager = ConnectionManager(path)
+    db.invalidate_catalog()
+    db.init_db()
+    return db
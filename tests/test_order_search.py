@@ -0,0 +1,100 @@
+import unittest
+from tests.support import fresh_database
+
+# Текст строк заказа в orders_fts (колонка lines) обновляется триггерами и пересобирается
+# перед COMMIT — поиск видит изменения строк, сделанные любой функцией записи
+
+def _work(name):
+    return {"work": name, "unit": "шт.", "quantity": "1", "price_per_unit": "100"}
+
+def _material(name):
+    return {"material": name, "unit": "шт.", "quantity": "2", "price_per_unit": "50"}
+
+class OrderSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.db = fresh_database()
+        self.vehicle = {
+            "contract_number": "Т-1", "date": "01.02.2025", "type": "Легковые",
+            "customer": "Иванов", "number": "А123ВС", "brand": "Газель",
+        }
+        self.vehicle_id = self.db.save_vehicle(self.vehicle, [_work("Диагностика")], [_material("Фреон")])
+
+    def tearDown(self):
+        self.db.close_connections()
+
+    def found(self, query):
+        return [row["id"] for row in self.db.search_orders(query)]
+
+    # В новой базе есть демонстрационные заказы — проверяется только заказ теста
+    def assertFound(self, query):
+        self.assertIn(self.vehicle_id, self.found(query), query)
+
+    def assertNotFound(self, query):
+        self.assertNotIn(self.vehicle_id, self.found(query), query)
+
+    def test_save_vehicle(self):
+        self.assertFound("диагностика")
+        self.assertFound("фреон")
+        self.db.save_vehicle(self.vehicle, [_work("Заправка кондиционера")], [])
+        self.assertFound("заправка")
+        self.assertNotFound("диагностика")
+        self.assertNotFound("фреон")
+
+    def test_save_vehicle_changes(self):
+        lines = self.db.get_materials_and_works(self.vehicle_id)
+        work = next(line for line in lines if line["work"])
+        material = next(line for line in lines if line["material"])
+        self.db.save_vehicle_changes(
+            self.vehicle, lines=[dict(work, work="Замена компрессора"), _material("Масло")],
+            deleted_line_ids=[material["id"]],
+        )
+        self.assertFound("компрессора")
+        self.assertFound("масло")
+        self.assertNotFound("диагностика")
+        self.assertNotFound("фреон")
+
+    def test_add_and_delete_line(self):
+        self.db.add_material_and_work(self.vehicle_id, "Ремень", "")
+        self.assertFound("ремень")
+        line = next(line for line in self.db.get_materials_and_works(self.vehicle_id) if line["material"] == "Ремень")
+        self.db.delete_material_and_work(line["id"])
+        self.assertNotFound("ремень")
+        self.assertFound("диагностика")
+
+    def test_delete_materials_and_works(self):
+        self.db.delete_materials_and_works(self.vehicle_id)
+        self.assertNotFound("диагностика")
+        self.assertFound("иванов")
+
+    def test_update_vehicle_keeps_lines(self):
+        self.db.update_vehicle(dict(self.vehicle, id=self.vehicle_id, customer="Петров"))
+        self.assertFound("петров")
+        self.assertFound("диагностика")
+
+    def test_delete_vehicle(self):
+        self.db.delete_vehicle(self.vehicle_id)
+        self.assertNotFound("диагностика")
+        self.assertNotFound("иванов")
+
+    def test_one_transaction_and_rollback(self):
+        with self.db.transaction():
+            self.db.add_material_and_work(self.vehicle_id, "Фильтр", "")
+            self.db.add_material_and_work(self.vehicle_id, "Датчик", "")
+        self.assertFound("фильтр")
+        self.assertFound("датчик")
+
+        class Rollback(Exception):
+            pass
+
+        try:
+            with self.db.transaction():
+                self.db.delete_materials_and_works(self.vehicle_id)
+                raise Rollback
+        except Rollback:
+            pass
+        self.assertFound("диагностика")
+        conn = self.db._manager.connection()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM orders_fts_dirty").fetchone()[0], 0)
+
+if __name__ == "__main__":
+    unittest.main()
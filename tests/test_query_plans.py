@@ -0,0 +1,44 @@
+import unittest
+from tests.support import fresh_database
+from src.db.query_plans import build_scenario, collect_statements, find_table_scans, seed_database
+
+class QueryPlansTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = fresh_database()
+        cls.conn = seed_database(cls.db)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close_connections()
+
+    def test_no_unexpected_scans(self):
+        statements = collect_statements(self.conn, build_scenario(self.db))
+        self.assertGreater(len(statements), 100)
+        violations = find_table_scans(self.conn, statements)
+        self.assertEqual(violations, [], "\n".join(f"{d} в {n}: {sql}" for n, d, sql in violations))
+
+    def test_missing_index_is_reported(self):
+        # Проверка действительно ловит регрессию: без индексов фильтр по типу — SCAN vehicles.
+        # Индексы удаляются в транзакции, которая затем откатывается
+        class Rollback(Exception):
+            pass
+
+        try:
+            with self.db.transaction():
+                for name in ("idx_vehicles_type", "idx_vehicles_type_customer", "idx_vehicles_type_contract"):
+                    self.conn.execute(f"DROP INDEX {name}")
+                statements = collect_statements(
+                    self.conn, [("query_vehicles", lambda: self.db.query_vehicles(type="Легковые"))]
+                )
+                violations = find_table_scans(self.conn, statements)
+                raise Rollback
+        except Rollback:
+            pass
+        self.assertEqual([(name, detail) for name, detail, _ in violations], [("query_vehicles", "SCAN vehicles")])
+        self.assertIn("idx_vehicles_type", {
+            row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        })
+
+if __name__ == "__main__":
+    unittest.main()